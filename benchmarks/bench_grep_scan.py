@@ -0,0 +1,109 @@
+"""
+Benchmark: five separate grep_* passes against a single scan_all() pass.
+
+Builds a synthetic relax/MD style pw.x output of the requested size (or uses
+an existing one) and reports the wall time of both approaches.
+
+    python benchmarks/bench_grep_scan.py --size-mb 2048
+    python benchmarks/bench_grep_scan.py --file /scratch/md_run.out
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from dftbridge.extractors.grep import dftbridge
+
+
+HEADER = """     bravais-lattice index     =            2
+     lattice parameter (alat)  =       5.4321  a.u.
+     number of atoms/cell      =     {natoms:8d}
+
+crystal axes: (cart. coord. in units of alat)
+   a(1) = (   0.500000   0.500000   0.000000 )
+   a(2) = (   0.000000   0.500000   0.500000 )
+   a(3) = (   0.500000   0.000000   0.500000 )
+
+"""
+
+
+def write_synthetic(path: str, size_mb: int, natoms: int = 64) -> None:
+    """Write a synthetic multi-step output of roughly ``size_mb`` megabytes."""
+    target = size_mb * 1024 * 1024
+    with open(path, "w") as fh:
+        fh.write(HEADER.format(natoms=natoms))
+        step = 0
+        while fh.tell() < target:
+            shift = 1.0e-6 * step
+            fh.write("ATOMIC_POSITIONS (alat units)\n")
+            for i in range(natoms):
+                fh.write("     %d     Si%d  tau(   %.6f   %.6f   %.6f )\n"
+                         % (i + 1, i + 1, 0.25 * i + shift, 0.25 * i, 0.25 * i - shift))
+            fh.write("\n     iteration # 1\n        total energy              =     %.8f Ry\n\n"
+                     % (-15.789 - shift))
+            fh.write("!    total energy              =     %.8f Ry\n\n" % (-15.789 - shift))
+            fh.write("Forces acting on atoms (Ry/au):\n")
+            for i in range(natoms):
+                fh.write("     atom %4d type  1   force = (   %.6f   %.6f   %.6f )\n"
+                         % (i + 1, shift, -shift, shift))
+            fh.write("\nTotal force =  %.6f Total SCF steps = 2\n\n" % shift)
+            step += 1
+
+
+def separate_passes(path: str) -> None:
+    extractor = dftbridge(path)
+    extractor.grep_numatoms()
+    extractor.grep_atomic_positions()
+    extractor.grep_totenergy()
+    extractor.grep_forces()
+    extractor.grep_lattice()
+
+
+def single_pass(path: str) -> None:
+    dftbridge(path).scan_all()
+
+
+def best_of(func, path: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--file", help="existing pw.x output to benchmark against")
+    parser.add_argument("--size-mb", type=int, default=256, help="size of the synthetic output")
+    parser.add_argument("--natoms", type=int, default=64, help="atoms per step in the synthetic output")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repetitions")
+    args = parser.parse_args()
+
+    path = args.file
+    cleanup = False
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".out")
+        os.close(fd)
+        cleanup = True
+        write_synthetic(path, args.size_mb, args.natoms)
+
+    try:
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        t_separate = best_of(separate_passes, path, args.repeat)
+        t_single = best_of(single_pass, path, args.repeat)
+    finally:
+        if cleanup:
+            os.remove(path)
+
+    print(f"file size        : {size_mb:10.1f} MB")
+    print(f"5 separate passes: {t_separate:10.3f} s  ({size_mb / t_separate:8.1f} MB/s)")
+    print(f"scan_all()       : {t_single:10.3f} s  ({size_mb / t_single:8.1f} MB/s)")
+    print(f"speedup          : {t_separate / t_single:10.2f} x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark: per-atom LAMMPS dump writing against the vectorized DumpWriter.
+
+    python benchmarks/bench_writer.py --natoms 2000 --frames 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from dftbridge.writer import DumpWriter
+
+
+def legacy_write(outFH, nFrames, iFrame, energy, box, types, coords, forces=None):
+    """The original QExpresso.write loop: one write call per atom (forces appended if given)."""
+    xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = box
+    outFH.write("ITEM: TIMESTEP energy, energy_weight, force_weight, nsims\n")
+    outFH.write("%-5d    %-.16f    1    1   %d\n" % (iFrame, energy, nFrames))
+    outFH.write("ITEM: NUMBER OF ATOMS\n")
+    outFH.write("%-10d\n" % len(coords))
+    outFH.write("ITEM: BOX BOUNDS xy xz yz pp pp pp\n")
+    outFH.write("%22.16f  %22.16f  %22.16f\n" % (xlo, xhi, xy))
+    outFH.write("%22.16f  %22.16f  %22.16f\n" % (ylo, yhi, xz))
+    outFH.write("%22.16f  %22.16f  %22.16f\n" % (zlo, zhi, yz))
+    if forces is None:
+        outFH.write("ITEM: ATOMS id type x y z\n")
+        for i in range(len(coords)):
+            outFH.write(
+                "%-5d  %-5d  %22.16f %22.16f %22.16f\n"
+                % (i + 1, types[i], coords[i, 0], coords[i, 1], coords[i, 2])
+            )
+        return
+    outFH.write("ITEM: ATOMS id type x y z fx fy fz\n")
+    for i in range(len(coords)):
+        outFH.write(
+            "%-5d  %-5d  %22.16f %22.16f %22.16f %22.16f %22.16f %22.16f\n"
+            % (i + 1, types[i], coords[i, 0], coords[i, 1], coords[i, 2],
+               forces[i, 0], forces[i, 1], forces[i, 2])
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--natoms", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--output", default=os.devnull, help="where to write the dumps")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    coords = rng.random((args.natoms, 3)) * 20.0
+    forces = rng.standard_normal((args.natoms, 3))
+    types = list(rng.integers(1, 4, args.natoms))
+    box = (0.0, 20.0, 0.0, 20.0, 0.0, 20.0, 0.5, 0.0, 0.0)
+
+    baselines = {}
+    for label, frame_forces in (("per-atom writes", None), ("per-atom + forces", forces)):
+        with open(args.output, "w") as fh:
+            start = time.perf_counter()
+            for iframe in range(args.frames):
+                legacy_write(fh, args.frames, iframe + 1, -100.0, box, types, coords, frame_forces)
+            baselines[label] = time.perf_counter() - start
+
+    # each DumpWriter layout is compared with the per-atom loop writing the same columns
+    timings = {}
+    for label, columns, baseline in (
+            ("DumpWriter", ("id", "type", "x", "y", "z"), "per-atom writes"),
+            ("DumpWriter + forces", ("id", "type", "x", "y", "z", "fx", "fy", "fz"),
+             "per-atom + forces")):
+        with open(args.output, "w") as fh:
+            writer = DumpWriter(fh, columns=columns)
+            start = time.perf_counter()
+            for iframe in range(args.frames):
+                writer.write_frame(iframe + 1, args.frames, -100.0, box, types, coords, forces)
+            timings[label] = (time.perf_counter() - start, baselines[baseline])
+
+    atoms = args.natoms * args.frames
+    for label, elapsed in baselines.items():
+        print(f"{label:22s}: {elapsed:8.3f} s  ({atoms / elapsed / 1e6:6.2f} M atoms/s)")
+    for label, (elapsed, baseline) in timings.items():
+        print(f"{label:22s}: {elapsed:8.3f} s  ({atoms / elapsed / 1e6:6.2f} M atoms/s)"
+              f"  x{baseline / elapsed:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+Benchmark suite: throughput and peak memory of the parsers and the dump writer/reader.
+
+Every case runs against synthetic pw.x outputs (see synthetic.py) for each
+requested calculation mode. Each repetition runs in a freshly spawned
+process with the on-disk parse cache switched off, so no repetition sees
+the results of another; the OS page cache is left warm. Reported per case:
+best wall time, MB/s of text read (or written), frames/s, and the peak
+resident set size of the measured call. Every module the cases use,
+pandas included, is imported before the timer starts.
+
+Import time is tracked as well: each module in IMPORT_MODULES is imported
+in a fresh interpreter, recording the time taken and whether pandas came
+along with it (the NumPy-only conversion path must never import it).
+
+Results are written as JSON; pass an earlier results file with --compare
+to flag cases that got slower or heavier between releases.
+
+    python benchmarks/run_benchmarks.py --natoms 256 --steps 400 --output results.json
+    python benchmarks/run_benchmarks.py --compare v0.1.0.json --output results.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+# the package loads pandas on first use; import it here so the measured calls
+# that need it (extract_all, LAMMPSDumpParser.parse) stay comparable with
+# results from releases that imported it eagerly
+import pandas  # noqa: F401
+
+# imported up front so no import time lands inside a measured call
+from dftbridge.core import LAMMPSDumpParser
+from dftbridge.extractors.base_extractor import BaseExtractor
+from dftbridge.extractors.grep import dftbridge
+from dftbridge.mash import QExpresso
+from dftbridge.writer import DumpWriter
+from synthetic import MODES, write_output
+
+
+class BenchExtractor(BaseExtractor):
+    """Smallest concrete BaseExtractor, every quantity taken from the memoized trajectory."""
+
+    def extract_coordinates(self):
+        return self.extract_trajectory().to_dataframe(-1)
+
+    def extract_lattice(self):
+        return self.extract_trajectory().cells[-1]
+
+    def extract_energies(self):
+        return {'total_energy': float(self.extract_trajectory().energies[-1])}
+
+    def get_calculation_type(self):
+        return 'benchmark'
+
+
+# Each case: setup(path, workdir) -> state (untimed), run(path, workdir, state) -> frames,
+# and the file whose size the MB/s figure refers to ('input' or 'dump').
+def _setup_none(path, workdir):
+    return None
+
+
+def _run_grep(path, workdir, state):
+    return len(dftbridge(path).scan_all()['energies'])
+
+
+def _run_qexpresso_read(path, workdir, state):
+    qe = QExpresso(inFile=path)
+    qe.read()
+    qe.fixCellMat()
+    return 1
+
+
+def _run_qexpresso_trajectory(path, workdir, state):
+    return len(QExpresso(inFile=path).readTrajectory())
+
+
+def _run_extract_all(path, workdir, state):
+    extractor = BenchExtractor(path)
+    extractor.extract_all()
+    return len(extractor.extract_trajectory())
+
+
+def _setup_dump_write(path, workdir):
+    return QExpresso(inFile=path).readTrajectory()
+
+
+def _run_dump_write(path, workdir, state):
+    with open(os.path.join(workdir, "bench.dump"), "w") as fh:
+        QExpresso(inFile=None).writeTrajectory(fh, state, len(state), 1, DumpWriter(fh))
+    return len(state)
+
+
+def _setup_dump_read(path, workdir):
+    traj = QExpresso(inFile=path).readTrajectory()
+    with open(os.path.join(workdir, "bench.dump"), "w") as fh:
+        QExpresso(inFile=None).writeTrajectory(fh, traj, len(traj), 1, DumpWriter(fh))
+
+
+def _run_dump_read(path, workdir, state):
+    parser = LAMMPSDumpParser(os.path.join(workdir, "bench.dump"))
+    parser.parse()
+    return len(parser)
+
+
+CASES = {
+    'grep.scan_all': (_setup_none, _run_grep, 'input'),
+    'mash.QExpresso.read': (_setup_none, _run_qexpresso_read, 'input'),
+    'mash.QExpresso.readTrajectory': (_setup_none, _run_qexpresso_trajectory, 'input'),
+    'BaseExtractor.extract_all': (_setup_none, _run_extract_all, 'input'),
+    'DumpWriter.write_frame': (_setup_dump_write, _run_dump_write, 'dump'),
+    'LAMMPSDumpParser.parse': (_setup_dump_read, _run_dump_read, 'dump'),
+}
+
+
+# Modules whose cold import time is tracked, the entry points of short-lived conversion jobs
+IMPORT_MODULES = ("dftbridge", "dftbridge.mash", "dftbridge.extractors.grep", "dftbridge.core")
+
+_IMPORT_PROBE = ("import sys, time; start = time.perf_counter(); import {module}; "
+                 "print(time.perf_counter() - start, 'pandas' in sys.modules)")
+
+
+def measure_imports(modules, repeat):
+    """
+    Best-of-``repeat`` cold import time of each module, every import in a new interpreter.
+
+    Returns:
+        List of records with 'module', 'seconds' and 'imports_pandas'.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    records = []
+    for module in modules:
+        timings = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE.format(module=module)],
+                                 capture_output=True, text=True, env=env, check=True).stdout
+            seconds, pandas = out.split()
+            timings.append(float(seconds))
+        record = {'module': module, 'seconds': min(timings), 'imports_pandas': pandas == "True"}
+        records.append(record)
+        print(f"import   {module:30s} {record['seconds'] * 1000:8.1f} ms"
+              f"{'  (imports pandas)' if record['imports_pandas'] else ''}", flush=True)
+    return records
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _reset_peak_rss() -> bool:
+    """Restart the peak RSS count from the current RSS (Linux only); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _measure(name, path, workdir):
+    """One repetition of one case; runs inside a spawned worker."""
+    setup, run, _ = CASES[name]
+    state = setup(path, workdir)
+    reset = _reset_peak_rss()
+    # the grep extractor reports missing quantities on stdout, keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        frames = run(path, workdir, state)
+        elapsed = time.perf_counter() - start
+    return elapsed, frames, _peak_rss(), reset
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(modes, cases, natoms, nspecies, nsteps, repeat, workdir):
+    """
+    Run every case against one synthetic output per mode.
+
+    Returns:
+        List of result records, one per (mode, case).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for mode in modes:
+        path = os.path.join(workdir, f"{mode}.out")
+        nframes = write_output(path, natoms, nspecies, nsteps, mode)
+        for name in cases:
+            timings = []
+            peaks = []
+            for _ in range(repeat):
+                with ctx.Pool(1) as pool:
+                    elapsed, frames, peak, reset = pool.apply(_measure, (name, path, workdir))
+                timings.append(elapsed)
+                peaks.append(peak)
+            measured = os.path.join(workdir, "bench.dump") if CASES[name][2] == 'dump' else path
+            nbytes = os.path.getsize(measured)
+            best = min(timings)
+            record = {
+                'mode': mode,
+                'case': name,
+                'natoms': natoms,
+                'species': nspecies,
+                'frames': frames,
+                'input_frames': nframes,
+                'bytes': nbytes,
+                'seconds': best,
+                'seconds_all': timings,
+                'mb_per_s': nbytes / (1024 * 1024) / best,
+                'frames_per_s': frames / best,
+                'peak_rss_mb': max(peaks) / (1024 * 1024),
+                # without a reset the peak includes setup, not just the measured call
+                'peak_rss_includes_setup': not reset,
+            }
+            results.append(record)
+            print(f"{mode:8s} {name:30s} {best:8.3f} s {record['mb_per_s']:9.1f} MB/s "
+                  f"{record['frames_per_s']:10.1f} frames/s {record['peak_rss_mb']:8.1f} MB peak",
+                  flush=True)
+            if os.path.exists(os.path.join(workdir, "bench.dump")):
+                os.remove(os.path.join(workdir, "bench.dump"))
+        os.remove(path)
+    return results
+
+
+def compare(results, imports, baseline, tolerance):
+    """
+    Print the cases that are slower or use more memory than in ``baseline``, and the
+    modules that import slower or newly import pandas.
+
+    Returns:
+        Number of regressions found.
+    """
+    previous = {(r['mode'], r['case']): r for r in baseline['results']}
+    regressions = 0
+    for record in results:
+        old = previous.get((record['mode'], record['case']))
+        if old is None:
+            continue
+        speed = record['mb_per_s'] / old['mb_per_s']
+        memory = record['peak_rss_mb'] / old['peak_rss_mb']
+        flag = speed < 1.0 - tolerance or memory > 1.0 + tolerance
+        regressions += flag
+        print(f"{'REGRESSION' if flag else 'ok':10s} {record['mode']:8s} {record['case']:30s} "
+              f"speed x{speed:5.2f}  peak RSS x{memory:5.2f}")
+
+    previous_imports = {r['module']: r for r in baseline.get('imports', ())}
+    for record in imports:
+        old = previous_imports.get(record['module'])
+        if old is None:
+            continue
+        slowdown = record['seconds'] / old['seconds']
+        # a module that newly pulls in pandas is a regression whatever the timing says
+        flag = slowdown > 1.0 + tolerance or (record['imports_pandas'] and not old['imports_pandas'])
+        regressions += flag
+        print(f"{'REGRESSION' if flag else 'ok':10s} {'import':8s} {record['module']:30s} "
+              f"time x{slowdown:5.2f}  pandas {record['imports_pandas']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--natoms", type=int, default=128)
+    parser.add_argument("--species", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=200, help="ionic steps per output (scf: 1)")
+    parser.add_argument("--mode", action="append", choices=MODES,
+                        help="calculation mode to benchmark, repeatable (default: all)")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="case to run, repeatable (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repetitions")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative slowdown / memory growth reported as a regression")
+    parser.add_argument("--no-imports", action="store_true", help="skip the import-time measurement")
+    parser.add_argument("--workdir", help="directory for the synthetic outputs (default: a temp dir)")
+    args = parser.parse_args()
+
+    # measure parsing, not reloading from the on-disk cache; spawned workers inherit this
+    os.environ["DFTBRIDGE_CACHE"] = "0"
+
+    imports = [] if args.no_imports else measure_imports(IMPORT_MODULES, args.repeat)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dftbridge-bench-")
+    try:
+        results = run_suite(args.mode or MODES, args.case or list(CASES), args.natoms,
+                            args.species, args.steps, args.repeat, workdir)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {'natoms': args.natoms, 'species': args.species, 'steps': args.steps,
+                   'repeat': args.repeat},
+        'results': results,
+        'imports': imports,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        if compare(results, imports, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Synthetic pw.x outputs for the benchmarks.
+
+Writes outputs laid out like real PWSCF runs (run header, crystal axes,
+'site n.' table, scf iterations, '!    total energy', forces, and for
+relax/vc-relax/md the per-step CELL_PARAMETERS / ATOMIC_POSITIONS cards),
+so every parser in the package reads them the way it reads production files.
+
+    python benchmarks/synthetic.py run.out --natoms 512 --species 3 --steps 200 --mode md
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from dftbridge.units import bohr2ang
+
+
+MODES = ("scf", "relax", "vc-relax", "md")
+ELEMENTS = ("Si", "O", "Al", "Ti", "Fe", "Cu", "Mo", "W", "C", "N", "H", "S", "Au")
+MASSES = (28.0855, 15.9994, 26.9815, 47.867, 55.845, 63.546, 95.94, 183.84,
+          12.011, 14.007, 1.008, 32.065, 196.967)
+
+ALAT = 10.2  # bohr
+SCF_ITERATIONS = 3
+
+HEADER = """
+     Program PWSCF v.7.2 starts on  1Jan2025 at  0:00:00
+
+     This program is part of the open-source Quantum ESPRESSO suite
+
+     bravais-lattice index     =            0
+     lattice parameter (alat)  =      {alat:.4f}  a.u.
+     unit-cell volume          =     {volume:.4f} (a.u.)^3
+     number of atoms/cell      =     {natoms:8d}
+     number of atomic types    =     {nspecies:8d}
+     number of electrons       =     {electrons:8.2f}
+     kinetic-energy cutoff     =      30.0000  Ry
+     charge density cutoff     =     240.0000  Ry
+     nstep                     =     {nstep:8d}
+
+     crystal axes: (cart. coord. in units of alat)
+               a(1) = ( {a[0][0]:10.6f} {a[0][1]:10.6f} {a[0][2]:10.6f} )
+               a(2) = ( {a[1][0]:10.6f} {a[1][1]:10.6f} {a[1][2]:10.6f} )
+               a(3) = ( {a[2][0]:10.6f} {a[2][1]:10.6f} {a[2][2]:10.6f} )
+
+     atomic species   valence    mass     pseudopotential
+{species_table}
+     Cartesian axes
+
+     site n.     atom                  positions (alat units)
+"""
+
+
+def _table(template: str, columns) -> str:
+    """Format one row per atom with a single % over a flat tuple, like DumpWriter does."""
+    rows = list(zip(*columns))
+    flat = tuple(value for row in rows for value in row)
+    return (template * len(rows)) % flat
+
+
+def _scf_step(rng: np.random.Generator, energy: float, natoms: int, types: np.ndarray) -> str:
+    """SCF iterations, converged energy, forces and total force of one ionic step."""
+    text = ["\n     Self-consistent Calculation\n"]
+    for it in range(1, SCF_ITERATIONS + 1):
+        text.append("\n     iteration #%3d     ecut=    30.00 Ry     beta= 0.70\n" % it)
+        text.append("     total energy              =   %14.8f Ry\n" % (energy + 10.0 ** -it))
+        text.append("     estimated scf accuracy    <   %14.8f Ry\n" % 10.0 ** (-it - 1))
+    text.append("\n     End of self-consistent calculation\n\n")
+    text.append("!    total energy              =   %14.8f Ry\n" % energy)
+    text.append("     estimated scf accuracy    <       0.00000080 Ry\n\n")
+    text.append("     convergence has been achieved in %3d iterations\n\n" % SCF_ITERATIONS)
+    forces = rng.normal(scale=1.0e-3, size=(natoms, 3))
+    text.append("     Forces acting on atoms (cartesian axes, Ry/au):\n\n")
+    text.append(_table("     atom %4d type %2d   force = %14.8f%14.8f%14.8f\n",
+                       (range(1, natoms + 1), types, forces[:, 0], forces[:, 1], forces[:, 2])))
+    text.append("\n     Total force = %12.6f     Total SCF correction =     0.000010\n"
+                % np.sqrt((forces ** 2).sum()))
+    return "".join(text)
+
+
+def _stress(rng: np.random.Generator) -> str:
+    stress = rng.normal(scale=1.0e-4, size=(3, 3))
+    stress = (stress + stress.T) / 2
+    kbar = stress * 147105.08
+    text = ["\n     Computing stress (Cartesian axis) and pressure\n\n"]
+    text.append("          total   stress  (Ry/bohr**3)                   (kbar)     P= %12.2f\n"
+                % (np.trace(kbar) / 3))
+    for row, row_kbar in zip(stress, kbar):
+        text.append("  %13.8f %13.8f %13.8f %12.2f %12.2f %12.2f\n" % (tuple(row) + tuple(row_kbar)))
+    return "".join(text)
+
+
+def _cards(cell: np.ndarray, symbols: np.ndarray, positions: np.ndarray, with_cell: bool) -> str:
+    text = []
+    if with_cell:
+        text.append("\nCELL_PARAMETERS (alat= %11.8f)\n" % ALAT)
+        for row in cell:
+            text.append("  %14.9f %14.9f %14.9f\n" % tuple(row))
+    text.append("\nATOMIC_POSITIONS (angstrom)\n")
+    text.append(_table("%-2s %19.10f %19.10f %19.10f\n",
+                       (symbols, positions[:, 0], positions[:, 1], positions[:, 2])))
+    text.append("\n\n")
+    return "".join(text)
+
+
+def write_output(path: str, natoms: int = 64, nspecies: int = 2, nsteps: int = 10,
+                 mode: str = "relax", seed: int = 0) -> int:
+    """
+    Write a synthetic pw.x output.
+
+    Args:
+        path: File to write.
+        natoms: Atoms in the cell.
+        nspecies: Number of distinct elements, at most len(ELEMENTS).
+        nsteps: Ionic steps; an scf run always has exactly one.
+        mode: One of MODES.
+        seed: Seed for the random geometry, energies and forces.
+
+    Returns:
+        Number of frames (converged ionic steps) in the output.
+
+    Raises:
+        ValueError: On an unknown mode or too many species.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+    if not 1 <= nspecies <= len(ELEMENTS):
+        raise ValueError(f"nspecies must be between 1 and {len(ELEMENTS)}")
+    if mode == "scf":
+        nsteps = 1
+
+    rng = np.random.default_rng(seed)
+    # cubic-ish cell sized to about 20 bohr^3 per atom, with a small shear
+    side = (20.0 * natoms) ** (1.0 / 3.0) / ALAT
+    axes = np.diag([side, side, side]) + np.array([[0.0, 0.0, 0.0],
+                                                   [0.05 * side, 0.0, 0.0],
+                                                   [0.02 * side, 0.03 * side, 0.0]])
+    type_index = np.arange(natoms) % nspecies
+    types = type_index + 1
+    symbols = np.array(ELEMENTS[:nspecies])[type_index]
+    fractional = rng.random((natoms, 3))
+
+    species_table = "".join("        %-2s            %5.2f   %10.5f     %-2s( 1.00)\n"
+                            % (ELEMENTS[i], 4.0, MASSES[i], ELEMENTS[i]) for i in range(nspecies))
+    sites = fractional @ axes
+    energy = -15.8 * natoms
+
+    with open(path, "w") as fh:
+        fh.write(HEADER.format(alat=ALAT, volume=np.linalg.det(axes) * ALAT ** 3, natoms=natoms,
+                               nspecies=nspecies, electrons=4.0 * natoms, nstep=nsteps,
+                               a=axes.tolist(), species_table=species_table))
+        fh.write(_table("     %5d           %-2s  tau(%5d) = ( %11.7f %11.7f %11.7f  )\n",
+                        (range(1, natoms + 1), symbols, range(1, natoms + 1),
+                         sites[:, 0], sites[:, 1], sites[:, 2])))
+        fh.write("\n     number of k points=     2\n")
+        if mode == "md":
+            fh.write("\n     Molecular Dynamics Calculation\n")
+
+        cell = axes.copy()
+        for step in range(nsteps):
+            fh.write(_scf_step(rng, energy, natoms, types))
+            if mode == "vc-relax":
+                fh.write(_stress(rng))
+            last = step == nsteps - 1
+            if mode == "scf":
+                break
+
+            # next geometry: small random displacements (and cell strain for vc-relax)
+            if mode == "vc-relax":
+                cell = cell @ (np.eye(3) + rng.normal(scale=2.0e-3, size=(3, 3)))
+            fractional = (fractional + rng.normal(scale=2.0e-3, size=fractional.shape)) % 1.0
+            positions = fractional @ cell * ALAT * bohr2ang
+            energy -= abs(rng.normal(scale=1.0e-3))
+
+            if mode == "md":
+                fh.write("\n     Entering Dynamics:    iteration = %5d\n" % (step + 1))
+                fh.write("     time      =   %10.4f pico-seconds\n" % ((step + 1) * 0.00097))
+                fh.write(_cards(cell, symbols, positions, False))
+                fh.write("     kinetic energy (Ekin) = %14.8f Ry\n" % abs(rng.normal(scale=0.01)))
+                fh.write("     temperature           = %14.8f K\n" % abs(rng.normal(300.0, 5.0)))
+            elif last:
+                # geometry printed after the final energy never forms a frame of its own
+                fh.write("\n     End of BFGS Geometry Optimization\n")
+                fh.write("\nBegin final coordinates\n")
+                fh.write(_cards(cell, symbols, positions, mode == "vc-relax"))
+                fh.write("End final coordinates\n")
+            else:
+                fh.write("\n     BFGS Geometry Optimization\n")
+                fh.write("     number of scf cycles    = %3d\n" % (step + 1))
+                fh.write("     number of bfgs steps    = %3d\n" % step)
+                fh.write(_cards(cell, symbols, positions, mode == "vc-relax"))
+
+        fh.write("\n     JOB DONE.\n")
+    return nsteps
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="output file to write")
+    parser.add_argument("--natoms", type=int, default=64)
+    parser.add_argument("--species", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--mode", choices=MODES, default="relax")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    frames = write_output(args.path, args.natoms, args.species, args.steps, args.mode, args.seed)
+    print(f"wrote {args.path}: {frames} frames of {args.natoms} atoms ({args.mode})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
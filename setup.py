@@ -32,6 +32,7 @@ setup(
     python_requires=">=3.7",
     install_requires=requirements,
     extras_require={
+        "zstd": ["zstandard>=0.15"],
         "dev": [
             "pytest>=6.0",
             "pytest-cov>=2.0",
@@ -1,19 +1,57 @@
 """
-psuedo-lammps: Parses and Extracts Quantum Esspresso DFT outputs and re-formats atomic system information into LAMMPS-style dump files and JSON files 
+psuedo-lammps: Parses and Extracts Quantum Esspresso DFT outputs and re-formats atomic system information into LAMMPS-style dump files and JSON files
+
+Importing the package loads nothing else: the extractors (and pandas behind
+them) and every submodule are imported on first attribute access, so a
+NumPy-only conversion such as ``python -m dftbridge.mash`` never pays for them.
 """
 
-from .base_extractor import BaseExtractor
-from .qe_scf_extractor import QESCFExtractor
-from .qe_relaxed_extractor import QERelaxedExtractor
-from .qe_relaxed_vc_extractor import QERelaxedVCExtractor
+import importlib
+from typing import TYPE_CHECKING, Any, List
 
 __author__ = "Andrew Trepagnier"
 __email__ = "andrew.trepagnier@icloud.com"
 
 
+# public name -> module it lives in, imported on first access
+_LAZY_ATTRIBUTES = {
+    'BaseExtractor': '.extractors.base_extractor',
+    'QESCFExtractor': '.extractors.qe_scf_extractor',
+    'QERelaxedExtractor': '.extractors.qe_relaxed_extractor',
+    'QERelaxedVCExtractor': '.extractors.qe_relaxed_vc_extractor',
+}
+
+_SUBMODULES = (
+    'blocks', 'cache', 'cell', 'compression', 'core', 'dedup', 'discovery', 'extractors', 'follow',
+    'frame_index', 'frames', 'mash', 'pipeline', 'qeio', 'sections', 'shards', 'species', 'stats',
+    'trajectory', 'units', 'utils', 'writer',
+)
+
 __all__ = [
     'BaseExtractor',
     'QESCFExtractor',
     'QERelaxedExtractor',
     'QERelaxedVCExtractor'
-] 
\ No newline at end of file
+]
+
+if TYPE_CHECKING:
+    from .extractors.base_extractor import BaseExtractor
+    from .extractors.qe_scf_extractor import QESCFExtractor
+    from .extractors.qe_relaxed_extractor import QERelaxedExtractor
+    from .extractors.qe_relaxed_vc_extractor import QERelaxedVCExtractor
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # cached on the module, later lookups no longer come through here
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_SUBMODULES))
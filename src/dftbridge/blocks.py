@@ -0,0 +1,191 @@
+"""
+Vectorized parsing of contiguous numeric blocks in QE outputs.
+
+A block is the run of N lines following a header such as ``site n.``,
+``ATOMIC_POSITIONS``, ``crystal axes:`` or ``Forces acting on atoms``. The
+whole block is cleaned with a few regex passes over the joined text, split
+once and converted to float64 in a single NumPy call, instead of splitting
+and converting every line in Python.
+"""
+
+import re
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from . import stats
+
+
+# Fortran prints '*****' when a value overflows its field width
+_OVERFLOW = re.compile(r"\*+")
+# Fortran double precision exponents, e.g. 1.0D-05
+_FORTRAN_EXP = re.compile(r"(?<=[0-9.])[dD](?=[+-]?\d)")
+# Fixed-width fields can run into each other, e.g. -0.123456-0.654321
+_GLUED_SIGN = re.compile(r"(?<=[0-9.])-(?=[0-9.])")
+_DELIMITERS = str.maketrans("()=", "   ")
+
+# Fields per line of the blocks pw.x prints, with '(', ')' and '=' as whitespace
+SITE_FIELDS = 7  # '1  Si  tau(  1) = ( x y z )'
+TAU_FIELDS = 6  # '1  Si1  tau( x y z )'
+CARD_FIELDS = 4  # 'Si  x  y  z', see position_card_rows
+AXIS_FIELDS = 5  # 'a(1) = ( x y z )'
+CELL_FIELDS = 3  # 'x  y  z'
+FORCE_FIELDS = 8  # 'atom 1 type 1 force = x y z'
+STRESS_FIELDS = 6  # 'Ry/bohr**3 x y z  kbar x y z'
+
+Block = Union[str, Sequence[str], "TokenTable"]
+
+
+class TokenTable:
+    """
+    Whitespace tokens of an N-line block, kept as one flat list.
+
+    Column ``c`` of the block is the stride slice ``tokens[c::width]``, so
+    picking columns never loops over rows in Python.
+    """
+
+    __slots__ = ("tokens", "nrows", "width")
+
+    def __init__(self, tokens: List[str], nrows: int):
+        self.tokens = tokens
+        self.nrows = nrows
+        self.width = len(tokens) // nrows if nrows else 0
+
+    def column(self, col: int) -> List[str]:
+        """Tokens of one column, negative indices count from the end of each line."""
+        if col < 0:
+            col += self.width
+        return self.tokens[col::self.width]
+
+
+def tokenize_block(block: Block, width: Optional[int] = None) -> TokenTable:
+    """
+    Split a block of N lines into a table of string tokens.
+
+    Parentheses and '=' are treated as whitespace, overflow fields become
+    'nan' and Fortran 'D' exponents are rewritten as 'E'. Values that ran
+    into each other ('0.123-0.456') are split apart whenever the lines do
+    not have the expected number of fields.
+
+    Args:
+        block: The block text, or its lines.
+        width: Expected number of fields per line; by default every line
+            just has to have as many as the first one.
+
+    Returns:
+        TokenTable: The tokens of the block.
+
+    Raises:
+        ValueError: If the lines do not all have the expected number of fields.
+    """
+    if isinstance(block, TokenTable):
+        return block
+    if isinstance(block, str):
+        lines = block.strip("\n").split("\n")
+    else:
+        lines = list(block)
+    nrows = len(lines)
+    if nrows == 0:
+        return TokenTable([], 0)
+
+    text = "\n".join(lines)
+    # the regex passes only run when their trigger character is present at all
+    if "*" in text:
+        text = _OVERFLOW.sub(" nan ", text)
+    if "D" in text or "d" in text:
+        text = _FORTRAN_EXP.sub("E", text)
+    rows = _split_rows(text, width)
+    if rows is None:
+        rows = _split_rows(_GLUED_SIGN.sub(" -", text), width)
+        if rows is None:
+            problem = ("differ in field count" if width is None
+                       else f"do not all have {width} fields")
+            raise ValueError(f"Ragged block: lines of a {nrows}-line block {problem}")
+    return TokenTable([token for row in rows for token in row], len(rows))
+
+
+def _split_rows(text: str, width: Optional[int]) -> Optional[List[List[str]]]:
+    # every line must have the expected number of fields, a matching total is not enough;
+    # line ends kept on the lines of a block only add blank rows, which are dropped
+    rows = [row for row in (line.split() for line in text.translate(_DELIMITERS).split("\n"))
+            if row]
+    if rows and width is None:
+        width = len(rows[0])
+    if any(len(row) != width for row in rows):
+        return None
+    return rows
+
+
+def position_card_rows(lines: Sequence[str]) -> List[str]:
+    """
+    'symbol x y z' of each line of an ATOMIC_POSITIONS input card.
+
+    Only some lines may carry the three if_pos flags, so every line is cut
+    to its first CARD_FIELDS fields, after splitting glued values apart on
+    the lines that have neither 4 nor 7 fields.
+    """
+    rows = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) not in (CARD_FIELDS, CARD_FIELDS + 3):
+            fields = _GLUED_SIGN.sub(" -", line).split()
+        rows.append(" ".join(fields[:CARD_FIELDS]))
+    return rows
+
+
+def parse_vector_block(block: Block, scale: float = 1.0, first_col: Optional[int] = None,
+                       ncols: int = 3, width: Optional[int] = None) -> np.ndarray:
+    """
+    Convert a block of N lines into an (N, ncols) float64 array.
+
+    Args:
+        block: The block text, its lines, or a table from tokenize_block().
+        scale: Factor applied to the whole array (unit conversion).
+        first_col: Column of the first value; by default the last ``ncols`` fields are used.
+        ncols: Number of values per line.
+        width: Expected number of fields per line, see tokenize_block().
+
+    Returns:
+        np.ndarray: (N, ncols) array of float64.
+    """
+    with stats.stage("parse") as stage:
+        table = tokenize_block(block, width)
+        stage.add(lines=table.nrows)
+        return _convert_columns(table, scale, first_col, ncols)
+
+
+def _convert_columns(table: TokenTable, scale: float, first_col: Optional[int],
+                     ncols: int) -> np.ndarray:
+    if table.nrows == 0:
+        return np.zeros((0, ncols), dtype=np.float64)
+    if first_col is None:
+        first_col = table.width - ncols
+
+    if first_col == 0 and ncols == table.width:
+        values = np.array(table.tokens, dtype=np.float64).reshape(table.nrows, ncols)
+    else:
+        # gather whole columns with stride slices, convert once, transpose back to rows
+        fields = []
+        for col in range(first_col, first_col + ncols):
+            fields.extend(table.column(col))
+        values = np.array(fields, dtype=np.float64).reshape(ncols, table.nrows).T
+    if scale != 1.0:
+        values *= scale
+    return np.ascontiguousarray(values)
+
+
+def parse_symbol_column(block: Block, col: int) -> List[str]:
+    """
+    Read the species column of a block, dropping numeric suffixes (Si1 -> Si).
+
+    Args:
+        block: The block text, its lines, or a table from tokenize_block().
+        col: Column holding the atom labels.
+
+    Returns:
+        List of element symbols, one per line.
+    """
+    table = tokenize_block(block)
+    if table.nrows == 0:
+        return []
+    return [label.rstrip("0123456789") for label in table.column(col)]
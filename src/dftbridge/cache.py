@@ -0,0 +1,308 @@
+"""
+On-disk cache of parsed outputs, reloaded through memory maps.
+
+Each parsed result is stored as a set of ``.npy`` arrays plus a
+``meta.json`` key in a per-output directory under the user cache directory
+(``$DFTBRIDGE_CACHE_DIR``, else ``$XDG_CACHE_HOME/dftbridge``, else
+``~/.cache/dftbridge``), so the directories holding the outputs are never
+written to. With ``DFTBRIDGE_CACHE=local`` the entries go next to the output
+instead, in ``<output>.dftbcache/<kind>/``. ``.npy`` rather than ``.npz`` is
+used because only plain ``.npy`` files can be opened with ``mmap_mode``, so a
+reload costs no parsing and no copying.
+
+A cache entry is valid while the output's absolute path, size and mtime and
+the PARSER_VERSION all match its key; anything else is treated as a miss.
+Set ``DFTBRIDGE_CACHE=0`` to disable the cache entirely.
+
+Arrays are never rewritten in place, since earlier results may still have
+them memory-mapped: a new entry goes to freshly named files, the key is
+switched over to them atomically, and the old files are unlinked (which
+leaves existing maps intact). The user cache directory is kept below
+``$DFTBRIDGE_CACHE_SIZE`` (default 2G) by dropping the least recently used
+entries; it can also be deleted at any time.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .shards import parse_size
+from .trajectory import Trajectory
+
+# Bump whenever a parser change alters what gets cached
+PARSER_VERSION = 2
+# Bump whenever the layout of an entry on disk changes
+FORMAT_VERSION = 2
+
+DEFAULT_SIZE_LIMIT = "2G"
+
+_SUFFIX = ".dftbcache"
+_META = "meta.json"
+_TRAJECTORY_ARRAYS = ("types", "positions", "forces", "energies", "cells", "source_index")
+# the user cache directory is checked against its size limit at most this often (seconds)
+_EVICT_INTERVAL = 60.0
+_last_evict = -_EVICT_INTERVAL
+
+
+def enabled() -> bool:
+    """False when the cache is switched off with DFTBRIDGE_CACHE=0."""
+    return os.environ.get("DFTBRIDGE_CACHE", "1") not in ("0", "false", "no", "off")
+
+
+def cache_root() -> str:
+    """User cache directory: $DFTBRIDGE_CACHE_DIR, else $XDG_CACHE_HOME/dftbridge, else ~/.cache/dftbridge."""
+    root = os.environ.get("DFTBRIDGE_CACHE_DIR")
+    if root:
+        return root
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "dftbridge")
+
+
+def cache_dir(file_path: str) -> str:
+    """
+    Directory holding the cache entries of ``file_path``.
+
+    Args:
+        file_path: Path to the parsed output.
+
+    Returns:
+        A per-file directory under ``cache_root()``, or ``<file_path>.dftbcache``
+        when DFTBRIDGE_CACHE=local.
+    """
+    if os.environ.get("DFTBRIDGE_CACHE") == "local":
+        return file_path + _SUFFIX
+    root = cache_root()
+    source = os.path.abspath(file_path)
+    digest = hashlib.sha1(source.encode()).hexdigest()[:16]
+    return os.path.join(root, f"{digest}-{os.path.basename(source)}{_SUFFIX}")
+
+
+def _key(file_path: str, kind: str) -> Dict[str, object]:
+    stat = os.stat(file_path)
+    return {
+        "source": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "version": PARSER_VERSION,
+        "format": FORMAT_VERSION,
+        "kind": kind,
+    }
+
+
+def load(file_path: str, kind: str) -> Optional[Dict[str, object]]:
+    """
+    Memory-map the cached arrays of one kind of parsed result.
+
+    Args:
+        file_path: Path to the parsed output.
+        kind: Name of the cached result, e.g. 'trajectory'.
+
+    Returns:
+        Dictionary of read-only memory-mapped arrays plus the entry's extra
+        metadata under 'meta', or None on a miss.
+    """
+    if not enabled():
+        return None
+    entry = os.path.join(cache_dir(file_path), kind)
+    meta_path = os.path.join(entry, _META)
+    try:
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get("key") != _key(file_path, kind):
+            return None
+        arrays: Dict[str, object] = {
+            name: np.load(os.path.join(entry, filename), mmap_mode="r")
+            for name, filename in meta["arrays"].items()
+        }
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+    # the key's mtime marks the entry as recently used for eviction
+    try:
+        os.utime(meta_path)
+    except OSError:
+        pass
+    arrays["meta"] = meta.get("extra", {})
+    return arrays
+
+
+def save(file_path: str, kind: str, arrays: Dict[str, np.ndarray],
+         extra: Optional[Dict[str, object]] = None) -> bool:
+    """
+    Store parsed arrays for ``file_path``.
+
+    The arrays are written to new files first and the key is replaced last,
+    so an interrupted write leaves the previous entry (or a miss) rather than
+    a corrupt one, and files mapped by earlier loads are never overwritten.
+    Failures (e.g. a read-only directory) are not errors, the result simply
+    is not cached.
+
+    Args:
+        file_path: Path to the parsed output.
+        kind: Name of the cached result.
+        arrays: Arrays to store, by name.
+        extra: Small JSON-serializable metadata stored with the key.
+
+    Returns:
+        True if the entry was written.
+    """
+    if not enabled():
+        return False
+    entry = os.path.join(cache_dir(file_path), kind)
+    written: List[str] = []
+    try:
+        key = _key(file_path, kind)
+        os.makedirs(entry, exist_ok=True)
+        files = {}
+        for name, array in sorted(arrays.items()):
+            fd, path = tempfile.mkstemp(prefix=name + "-", suffix=".npy", dir=entry)
+            written.append(path)
+            with os.fdopen(fd, "wb") as fh:
+                np.save(fh, np.asarray(array))
+            files[name] = os.path.basename(path)
+        fd, tmp_path = tempfile.mkstemp(prefix=_META + "-", suffix=".tmp", dir=entry)
+        written.append(tmp_path)
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"key": key, "arrays": files, "extra": extra or {}}, fh)
+        os.replace(tmp_path, os.path.join(entry, _META))
+    except OSError:
+        for path in written:
+            _unlink(path)
+        return False
+    # files of the replaced entry; unlinking them leaves any existing maps intact
+    keep = set(files.values()) | {_META}
+    for name in os.listdir(entry):
+        if name.endswith(".npy") and name not in keep:
+            _unlink(os.path.join(entry, name))
+    if os.environ.get("DFTBRIDGE_CACHE") != "local":
+        _maybe_evict()
+    return True
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def size_limit() -> int:
+    """Size limit of the user cache directory in bytes, from $DFTBRIDGE_CACHE_SIZE (e.g. '500M')."""
+    return parse_size(os.environ.get("DFTBRIDGE_CACHE_SIZE") or DEFAULT_SIZE_LIMIT)
+
+
+def _entries(root: str) -> List[Tuple[float, int, str]]:
+    """(last use, bytes, directory) of every entry under the cache root."""
+    entries = []
+    try:
+        sources = [item.path for item in os.scandir(root)
+                   if item.name.endswith(_SUFFIX) and item.is_dir()]
+    except OSError:
+        return entries
+    for source in sources:
+        try:
+            kinds = [item.path for item in os.scandir(source) if item.is_dir()]
+        except OSError:
+            continue
+        for entry in kinds:
+            try:
+                files = list(os.scandir(entry))
+                used = max((item.stat().st_mtime for item in files), default=0.0)
+                size = sum(item.stat().st_size for item in files if item.is_file())
+            except OSError:
+                continue
+            entries.append((used, size, entry))
+    return entries
+
+
+def evict(limit: Optional[int] = None) -> int:
+    """
+    Drop the least recently used entries until the user cache directory fits ``limit``.
+
+    Args:
+        limit: Size limit in bytes; ``size_limit()`` when None, 0 empties the cache.
+
+    Returns:
+        Number of entries removed.
+    """
+    limit = size_limit() if limit is None else limit
+    entries = sorted(_entries(cache_root()))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, entry in entries:
+        if total <= limit:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(entry))
+        except OSError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _maybe_evict():
+    global _last_evict
+    now = time.monotonic()
+    if now - _last_evict < _EVICT_INTERVAL:
+        return
+    _last_evict = now
+    try:
+        evict()
+    except ValueError:
+        pass
+
+
+def load_trajectory(file_path: str) -> Optional[Trajectory]:
+    """
+    The cached Trajectory of ``file_path`` backed by memory maps, or None on a miss.
+
+    Args:
+        file_path: Path to the parsed output.
+    """
+    arrays = load(file_path, "trajectory")
+    if arrays is None:
+        return None
+    return Trajectory.from_arrays(
+        arrays["meta"]["type_names"],
+        **{name: arrays[name] for name in _TRAJECTORY_ARRAYS},
+    )
+
+
+def save_trajectory(file_path: str, traj: Trajectory) -> bool:
+    """
+    Cache a parsed Trajectory of ``file_path``.
+
+    Args:
+        file_path: Path to the parsed output.
+        traj: The trajectory parsed from it.
+
+    Returns:
+        True if the entry was written.
+    """
+    arrays = {name: getattr(traj, name) for name in _TRAJECTORY_ARRAYS}
+    return save(file_path, "trajectory", arrays, {"type_names": traj.type_names})
+
+
+def cached_trajectory(file_path: str, parse: Callable[[], Trajectory]) -> Trajectory:
+    """
+    Load the Trajectory of ``file_path`` from the cache, parsing and caching it on a miss.
+
+    Args:
+        file_path: Path to the output.
+        parse: Called without arguments to parse the output on a miss.
+
+    Returns:
+        Trajectory: Memory-mapped on a hit, freshly parsed otherwise.
+    """
+    traj = load_trajectory(file_path)
+    if traj is None:
+        traj = parse()
+        save_trajectory(file_path, traj)
+    return traj
@@ -0,0 +1,159 @@
+"""
+Batched reduction of triclinic cells to the LAMMPS restricted form.
+
+LAMMPS wants the first lattice vector along x and the second in the xy
+plane, i.e. a lower-triangular cell matrix
+
+    [[lx,  0,  0],
+     [xy, ly,  0],
+     [xz, yz, lz]]
+
+``reduce_cells`` converts a whole (F, 3, 3) stack of cells at once and
+rotates the matching (F, N, 3) positions and forces into the new frame with
+one batched matrix product, instead of doing scalar work per frame.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class ReducedCells(NamedTuple):
+    """
+    Result of ``reduce_cells``; every array has the frame as its leading axis.
+
+    Attributes:
+        cells: (F, 3, 3) restricted cells (lower triangular).
+        rotation: (F, 3, 3) matrices taking row vectors from the original to the restricted frame.
+        bounds: (F, 9) box rows in ``writer.Box`` order: xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz.
+        positions: (F, N, 3) positions in the restricted frame, or None.
+        forces: (F, N, 3) forces in the restricted frame, or None.
+    """
+    cells: np.ndarray
+    rotation: np.ndarray
+    bounds: np.ndarray
+    positions: Optional[np.ndarray]
+    forces: Optional[np.ndarray]
+
+    @property
+    def tilts(self) -> np.ndarray:
+        """(F, 3) tilt factors xy, xz, yz."""
+        return self.bounds[:, 6:9]
+
+
+def _angle(u: np.ndarray, v: np.ndarray, lu: np.ndarray, lv: np.ndarray) -> np.ndarray:
+    """Angle between matching rows of two (F, 3) vector stacks."""
+    return np.arccos(np.einsum("fi,fi->f", u, v) / (lu * lv))
+
+
+def restrict_cells(cells: np.ndarray) -> np.ndarray:
+    """
+    LAMMPS restricted form of every cell in a stack.
+
+    Args:
+        cells: (F, 3, 3) cells, one lattice vector per row (a single (3, 3) cell is accepted too).
+
+    Returns:
+        np.ndarray: (F, 3, 3) lower-triangular cells with the same lengths and angles.
+    """
+    cells = np.asarray(cells, dtype=np.float64).reshape(-1, 3, 3)
+    a, b, c = cells[:, 0], cells[:, 1], cells[:, 2]
+    la = np.linalg.norm(a, axis=1)
+    lb = np.linalg.norm(b, axis=1)
+    lc = np.linalg.norm(c, axis=1)
+    cos_alpha = np.cos(_angle(b, c, lb, lc))
+    cos_beta = np.cos(_angle(a, c, la, lc))
+    gamma = _angle(a, b, la, lb)
+    cos_gamma, sin_gamma = np.cos(gamma), np.sin(gamma)
+
+    restricted = np.zeros_like(cells)
+    restricted[:, 0, 0] = la
+    restricted[:, 1, 0] = lb * cos_gamma
+    restricted[:, 1, 1] = lb * sin_gamma
+    restricted[:, 2, 0] = lc * cos_beta
+    restricted[:, 2, 1] = lc * (cos_alpha - cos_beta * cos_gamma) / sin_gamma
+    restricted[:, 2, 2] = lc * np.sqrt(
+        1 + 2 * cos_alpha * cos_beta * cos_gamma
+        - cos_alpha ** 2 - cos_beta ** 2 - cos_gamma ** 2
+    ) / sin_gamma
+    return restricted
+
+
+def box_bounds(restricted: np.ndarray) -> np.ndarray:
+    """
+    LAMMPS bounding-box rows of restricted cells.
+
+    Args:
+        restricted: (F, 3, 3) cells from ``restrict_cells``.
+
+    Returns:
+        np.ndarray: (F, 9) rows of xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz.
+    """
+    xy = restricted[:, 1, 0]
+    xz = restricted[:, 2, 0]
+    yz = restricted[:, 2, 1]
+    zero = np.zeros_like(xy)
+    xtilts = np.stack([zero, xy, xz, xy + xz])
+    ytilts = np.stack([zero, yz])
+
+    bounds = np.empty((len(restricted), 9), dtype=np.float64)
+    bounds[:, 0] = xtilts.min(axis=0)
+    bounds[:, 1] = restricted[:, 0, 0] + xtilts.max(axis=0)
+    bounds[:, 2] = ytilts.min(axis=0)
+    bounds[:, 3] = restricted[:, 1, 1] + ytilts.max(axis=0)
+    bounds[:, 4] = 0.0
+    bounds[:, 5] = restricted[:, 2, 2]
+    bounds[:, 6] = xy
+    bounds[:, 7] = xz
+    bounds[:, 8] = yz
+    return bounds
+
+
+def wrap_positions(restricted: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Wrap positions back into their periodic cell.
+
+    Args:
+        restricted: (F, 3, 3) cells the positions are expressed in.
+        positions: (F, N, 3) Cartesian positions.
+
+    Returns:
+        np.ndarray: (F, N, 3) positions whose fractional coordinates lie in [0, 1).
+    """
+    fractional = positions @ np.linalg.inv(restricted)
+    fractional -= np.floor(fractional)
+    # -1e-17 wraps to exactly 1.0 in floating point, which is outside [0, 1)
+    fractional[fractional >= 1.0] = 0.0
+    return fractional @ restricted
+
+
+def reduce_cells(cells: np.ndarray, positions: Optional[np.ndarray] = None,
+                 forces: Optional[np.ndarray] = None, wrap: bool = False) -> ReducedCells:
+    """
+    Reduce a stack of cells and carry positions and forces into the restricted frame.
+
+    The restricted cell keeps every length and angle, so the map between the
+    two frames is a rotation (a rotoreflection for left-handed cells). It is
+    applied to all frames with one batched matrix product.
+
+    Args:
+        cells: (F, 3, 3) cells, one lattice vector per row.
+        positions: (F, N, 3) Cartesian positions in the frame of ``cells``.
+        forces: (F, N, 3) forces in the frame of ``cells``; NaN rows stay NaN.
+        wrap: Also wrap the positions into the cell so no atom lies outside the box.
+
+    Returns:
+        ReducedCells: Restricted cells, rotations, box bounds and transformed vectors.
+    """
+    cells = np.asarray(cells, dtype=np.float64).reshape(-1, 3, 3)
+    restricted = restrict_cells(cells)
+    # row vectors: r' = r @ R with R = cells^-1 @ restricted
+    rotation = np.linalg.solve(cells, restricted)
+
+    if positions is not None:
+        positions = np.asarray(positions, dtype=np.float64) @ rotation
+        if wrap:
+            positions = wrap_positions(restricted, positions)
+    if forces is not None:
+        forces = np.asarray(forces, dtype=np.float64) @ rotation
+    return ReducedCells(restricted, rotation, box_bounds(restricted), positions, forces)
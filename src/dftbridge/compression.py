@@ -0,0 +1,134 @@
+"""
+Streaming access to compressed QE outputs (.gz, .xz, .bz2, .zst).
+
+Compressed files are decompressed on the fly in chunks as they are read;
+a full decompressed copy is never written to disk or held in memory.
+Plain files are opened as usual, so readers can call ``open_binary`` /
+``open_text`` on any path.
+
+Zstandard support needs the optional ``zstandard`` package
+(``pip install dftbridge[zstd]``); gzip, xz and bzip2 use the standard library.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+from typing import BinaryIO, Iterator, TextIO
+
+# Suffixes that are decompressed transparently
+COMPRESSED_SUFFIXES = (".gz", ".xz", ".bz2", ".zst")
+
+# Bytes handed to the decompressor per read
+CHUNK_SIZE = 1 << 20
+
+
+def is_compressed(file_path: str) -> bool:
+    """True if ``file_path`` has one of the COMPRESSED_SUFFIXES."""
+    return str(file_path).endswith(COMPRESSED_SUFFIXES)
+
+
+def strip_suffix(file_path: str) -> str:
+    """The path without its compression suffix ('run.out.gz' -> 'run.out')."""
+    file_path = str(file_path)
+    for suffix in COMPRESSED_SUFFIXES:
+        if file_path.endswith(suffix):
+            return file_path[:-len(suffix)]
+    return file_path
+
+
+def has_suffix(file_path: str, suffix: str) -> bool:
+    """True if ``file_path`` ends with ``suffix``, compressed or not ('a.out.xz' has '.out')."""
+    return strip_suffix(file_path).endswith(suffix)
+
+
+def _open_zstd(file_path: str) -> BinaryIO:
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            f"Reading {file_path} needs the optional 'zstandard' package "
+            "(pip install zstandard)"
+        ) from None
+    raw = open(file_path, "rb")
+    reader = zstandard.ZstdDecompressor().stream_reader(raw, read_size=CHUNK_SIZE,
+                                                         closefd=True)
+    return io.BufferedReader(reader, buffer_size=CHUNK_SIZE)
+
+
+def open_binary(file_path: str) -> BinaryIO:
+    """
+    Open a possibly compressed file for streaming binary reads.
+
+    Args:
+        file_path: Path to a plain or compressed file.
+
+    Returns:
+        A readable binary file object yielding the decompressed bytes.
+
+    Raises:
+        ImportError: If a .zst file is opened without ``zstandard`` installed.
+    """
+    file_path = os.fspath(file_path)
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rb")
+    if file_path.endswith(".xz"):
+        return lzma.open(file_path, "rb")
+    if file_path.endswith(".bz2"):
+        return bz2.open(file_path, "rb")
+    if file_path.endswith(".zst"):
+        return _open_zstd(file_path)
+    return open(file_path, "rb")
+
+
+def open_text(file_path: str, encoding: str = "utf-8") -> TextIO:
+    """
+    Open a possibly compressed file for streaming text reads.
+
+    Undecodable bytes are replaced rather than raising, as QE outputs
+    occasionally contain stray non-UTF-8 characters.
+
+    Args:
+        file_path: Path to a plain or compressed file.
+        encoding: Text encoding.
+
+    Returns:
+        A text file object over the decompressed contents.
+    """
+    if not is_compressed(file_path):
+        return open(file_path, "r", encoding=encoding, errors="replace")
+    return io.TextIOWrapper(open_binary(file_path), encoding=encoding, errors="replace")
+
+
+def iter_chunks(file_path: str, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the decompressed contents of a file in chunks of at most ``size`` bytes."""
+    with open_binary(file_path) as fh:
+        while True:
+            chunk = fh.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def count_occurrences(file_path: str, needle: bytes, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Count the occurrences of ``needle`` in a possibly compressed file, chunk by chunk.
+
+    Args:
+        file_path: Path to a plain or compressed file.
+        needle: Byte string to count.
+        chunk_size: Decompressed bytes examined per step.
+
+    Returns:
+        Number of non-overlapping occurrences.
+    """
+    count = 0
+    tail = b""
+    keep = len(needle) - 1
+    for chunk in iter_chunks(file_path, chunk_size):
+        data = tail + chunk
+        count += data.count(needle)
+        # keep just enough bytes to catch a needle split across chunks (too few for a full match)
+        tail = data[-keep:] if keep else b""
+    return count
@@ -2,40 +2,42 @@
 Core functionality for psuedo-lammps package.
 """
 
-from typing import Any, Dict, List, Optional, Union
-import pandas as pd
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 import numpy as np
+import io
 import os
+import re
 import sys
 
+from . import stats
+from .blocks import (CARD_FIELDS, CELL_FIELDS, TAU_FIELDS, parse_symbol_column,
+                     parse_vector_block, position_card_rows, tokenize_block)
+from .compression import is_compressed, open_binary, open_text
+from .qeio import MappedOutput, grep_stripped
+from .sections import SectionIndex
+from .species import element_table
+
+# pandas is only imported by the methods that build DataFrames
+if TYPE_CHECKING:
+    import pandas as pd
+
 class qe2lammps:
 
     def __init__(self, inFile, lmpstyle):
         self.inFile = inFile
         self.lmpstyle = lmpstyle  # Allows users to select what style lammps dump file format they would like
-        self.lines = []  # Initialize as empty list
+        self.mapped = None  # MappedOutput over inFile, set by extractdata()
+        self._lines = None  # Decoded lazily, only if something asks for every line
+        self._sections = None  # SectionIndex over the map, built on first use
         self.coordinates_data = None
         self.energies_data = None
         self.lattice_data = None
         self.format = self._detect_format()  # Auto-detect input format
         
-        # Only include common elements you'll actually encounter
-        # You can add more as needed for your specific use cases
-        self.common_elements = {
-            'H': {'number': 1, 'mass': 1.008},
-            'C': {'number': 6, 'mass': 12.011},
-            'N': {'number': 7, 'mass': 14.007},
-            'O': {'number': 8, 'mass': 15.999},
-            'Si': {'number': 14, 'mass': 28.085},
-            'S': {'number': 16, 'mass': 32.065},
-            'Fe': {'number': 26, 'mass': 55.845},
-            'Cu': {'number': 29, 'mass': 63.546},
-            'Au': {'number': 79, 'mass': 196.967},
-            'Al': {'number': 13, 'mass': 26.982},
-            'Ti': {'number': 22, 'mass': 47.867},
-            'Mo': {'number': 42, 'mass': 95.94},
-            'W': {'number': 74, 'mass': 183.84}
-        }
+        # Number and mass of every element, keyed by symbol
+        self.common_elements = element_table()
 
     def _detect_format(self):
         """Auto-detect the DFT input format based on file content"""
@@ -52,9 +54,53 @@ class qe2lammps:
                 clean_lines.append(partitioned[0])
         return clean_lines
 
+    @property
+    def lines(self):
+        """Comment-stripped lines of the whole file, decoded from the map on first access"""
+        if self._lines is None:
+            if self.mapped is not None:
+                self._lines = self.remove_comments([line.strip() for line in self.mapped.lines()])
+            elif is_compressed(self.inFile):
+                with open_text(self.inFile) as fh:
+                    self._lines = self.remove_comments([line.strip() for line in fh])
+            else:
+                return []
+        return self._lines
+
+    @lines.setter
+    def lines(self, value):
+        self._lines = value
+
+    @property
+    def sections(self):
+        """Spans of every ATOMIC_POSITIONS/CELL_PARAMETERS/... section, indexed in one pass"""
+        if self._sections is None:
+            if is_compressed(self.inFile):
+                # Compressed inputs are streamed once, only the last block of each section is kept
+                with open_binary(self.inFile) as fh:
+                    self._sections = SectionIndex.from_stream(
+                        fh, reopen=lambda: open_binary(self.inFile))
+                return self._sections
+            if self.mapped is None:
+                self.mapped = MappedOutput(self.inFile)
+            self._sections = SectionIndex(self.mapped)
+        return self._sections
+
+    @staticmethod
+    def _card_units(header):
+        """Unit keyword of a card header such as 'ATOMIC_POSITIONS (alat units)' or 'CELL_PARAMETERS {bohr}'"""
+        fields = header.split()
+        if len(fields) < 2:
+            return 'alat'
+        return fields[1].strip('(){}=')
+
     def find_section(self, pattern):
         """Find lines matching a pattern (pattern from MINpuT)"""
-        import re
+        if self._lines is None:
+            # Byte-level search over the map (or the decompressed stream), only hits get decoded
+            hits = grep_stripped(pattern, self.mapped, self.inFile, self.remove_comments)
+            if hits is not None:
+                return hits
         matches = []
         for line in self.lines:
             if re.search(pattern, line):
@@ -62,22 +108,31 @@ class qe2lammps:
         return matches
 
     def extractdata(self):
-        """Read the entire file and store all lines, then process the data."""
-        # Step 1: Read all lines from the file
-        with open(self.inFile, "r") as filehandler:
-            for line in filehandler:
-                self.lines.append(line.strip())  
-        
-        # Step 2: Remove comments
-        self.lines = self.remove_comments(self.lines)
+        """Map the file, then process the data straight from the mapped bytes."""
+        # Step 1: Memory-map the file instead of reading every line into a list
+        # (compressed inputs stay unmapped and are streamed by each reader)
+        # Every step is timed as its own stage inside a stats.collect() block
+        with stats.stage("read") as stage:
+            if self.mapped is not None:
+                self.mapped.close()
+                self.mapped = None
+            if not is_compressed(self.inFile):
+                self.mapped = MappedOutput(self.inFile)
+                stage.add(bytes=self.mapped.size)
+            self._lines = None
+            self._sections = None
         
-        # Step 3: Process the complete file data
-        self.coordinates()  # Extract coordinate data
-        self.energies()     # Extract energy data
-        self.lattice()      # Extract lattice data
+        # Step 2: Process the complete file data
+        with stats.stage("coordinates"):
+            self.coordinates()  # Extract coordinate data
+        with stats.stage("energies"):
+            self.energies()     # Extract energy data
+        with stats.stage("lattice"):
+            self.lattice()      # Extract lattice data
         
-        # Step 4: Convert to LAMMPS format
-        return self.convert_to_lammps()
+        # Step 3: Convert to LAMMPS format
+        with stats.stage("convert"):
+            return self.convert_to_lammps()
     
     def coordinates(self):
         """Extract coordinate data from the stored lines."""
@@ -104,19 +159,37 @@ class qe2lammps:
 
     def _parse_pwscf_coordinates(self):
         """Parse ATOMIC_POSITIONS section from Quantum Espresso input"""
-        coord_section = self.find_section("ATOMIC_POSITIONS")
+        coord_section = self.sections.block('atomic_positions')
         if coord_section:
-            # Parse the coordinate section
-            # Store in self.coordinates_data
-            pass
+            # The block is sliced straight out of the map, last occurrence wins
+            if coord_section[0].split()[0].isdigit():
+                # '1  Si1  tau( x y z )' output layout
+                table = tokenize_block(coord_section, TAU_FIELDS)
+                elements = parse_symbol_column(table, 1)
+                positions = parse_vector_block(table)
+            else:
+                # 'Si  x  y  z  [if_pos]' input card, the if_pos flags are optional per line
+                table = tokenize_block(position_card_rows(coord_section), CARD_FIELDS)
+                elements = parse_symbol_column(table, 0)
+                positions = parse_vector_block(table, first_col=1)
+            import pandas as pd
+
+            self.coordinates_data = pd.DataFrame({
+                'element': elements,
+                'x': positions[:, 0],
+                'y': positions[:, 1],
+                'z': positions[:, 2],
+            })
+            self.coordinates_data.attrs['units'] = self._card_units(
+                self.sections.header_line('atomic_positions'))
 
     def _parse_pwscf_lattice(self):
         """Parse CELL_PARAMETERS section from Quantum Espresso input"""
-        lattice_section = self.find_section("CELL_PARAMETERS")
+        lattice_section = self.sections.block('cell_parameters')
         if lattice_section:
-            # Parse the lattice section
-            # Store in self.lattice_data
-            pass
+            # Values as printed; the unit keyword of the card is kept next to them
+            self.lattice_data = parse_vector_block(lattice_section[:3], width=CELL_FIELDS)
+            self.lattice_units = self._card_units(self.sections.header_line('cell_parameters'))
 
     def _parse_vasp_coordinates(self):
         """Parse atomic positions from VASP POSCAR format"""
@@ -142,16 +215,72 @@ def parse_lammps_dump(file_path: str) -> pd.DataFrame:
         file_path: Path to the LAMMPS dump file.
         
     Returns:
-        pd.DataFrame: Parsed LAMMPS dump data.
+        pd.DataFrame: Parsed LAMMPS dump data, one row per atom per timestep.
+    """
+    return LAMMPSDumpParser(file_path).parse()
+
+
+def _parse_dump_frame(chunk: bytes) -> pd.DataFrame:
     """
-    # TODO: Implement LAMMPS dump file parsing
-    # This is a placeholder implementation
-    return pd.DataFrame()
+    Parse the text of one dump frame (from its ITEM: TIMESTEP line on).
+
+    The TIMESTEP value, the extra TIMESTEP fields written by mash
+    (energy, energy_weight, force_weight, nsims) and the box bounds are
+    stored in ``DataFrame.attrs``.
+    """
+    attrs: Dict[str, Any] = {}
+    natoms = 0
+    columns: List[str] = []
+    pos = 0
+    while pos < len(chunk):
+        end = chunk.find(b"\n", pos)
+        end = len(chunk) if end == -1 else end
+        line = chunk[pos:end].decode()
+        pos = end + 1
+        if line.startswith("ITEM: ATOMS"):
+            columns = line.split()[2:]
+            break
+        if line.startswith("ITEM: TIMESTEP"):
+            labels = [label.strip() for label in line[len("ITEM: TIMESTEP"):].split(",") if label.strip()]
+            end = chunk.find(b"\n", pos)
+            values = chunk[pos:end].split()
+            pos = end + 1
+            attrs["timestep"] = int(values[0])
+            for label, value in zip(labels, values[1:]):
+                attrs[label] = float(value)
+        elif line.startswith("ITEM: NUMBER OF ATOMS"):
+            end = chunk.find(b"\n", pos)
+            natoms = int(chunk[pos:end])
+            pos = end + 1
+        elif line.startswith("ITEM: BOX BOUNDS"):
+            rows = []
+            for _ in range(3):
+                end = chunk.find(b"\n", pos)
+                rows.append([float(v) for v in chunk[pos:end].split()])
+                pos = end + 1
+            attrs["box_bounds"] = np.array(rows)
+            attrs["box_style"] = line[len("ITEM: BOX BOUNDS"):].split()
+
+    import pandas as pd
+
+    if not columns or natoms == 0:
+        frame = pd.DataFrame(columns=columns)
+    else:
+        # the whole atom block goes through the pandas C parser in one call
+        frame = pd.read_csv(io.BytesIO(chunk[pos:]), sep=r"\s+", header=None, names=columns,
+                            nrows=natoms, engine="c")
+    frame.attrs.update(attrs)
+    return frame
 
 
 class LAMMPSDumpParser:
     """
     A parser for LAMMPS dump files.
+
+    Opening the parser only indexes the byte offset of every
+    ``ITEM: TIMESTEP`` header (a byte-level search, atom lines are never
+    parsed). Individual timesteps are then read by seeking straight to their
+    frame.
     """
     
     def __init__(self, file_path: str):
@@ -163,16 +292,62 @@ class LAMMPSDumpParser:
         """
         self.file_path = file_path
         self.data = None
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.timesteps = np.zeros(0, dtype=np.int64)
+        self.size = 0
+        if os.path.exists(file_path):
+            self._build_index()
+
+    def _build_index(self):
+        """Record the byte offset and timestep value of every frame."""
+        offsets = []
+        timesteps = []
+        with MappedOutput(self.file_path) as mapped:
+            for offset in mapped.iter_find(b"ITEM: TIMESTEP"):
+                value = mapped.lines_after(offset, 1)
+                offsets.append(offset)
+                timesteps.append(int(value[0].split()[0]) if value else 0)
+            self.size = mapped.size
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.timesteps = np.array(timesteps, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _read_chunk(self, k: int) -> bytes:
+        start = int(self.offsets[k])
+        end = int(self.offsets[k + 1]) if k + 1 < len(self.offsets) else self.size
+        with open(self.file_path, "rb") as fh:
+            fh.seek(start)
+            return fh.read(end - start)
+
+    def get_frame(self, k: int) -> pd.DataFrame:
+        """
+        Read the k-th frame of the file.
+
+        Args:
+            k: Frame number, starting at 0.
+
+        Returns:
+            pd.DataFrame: Atom data of the frame, metadata in ``attrs``.
+        """
+        return _parse_dump_frame(self._read_chunk(k))
     
     def parse(self) -> pd.DataFrame:
         """
         Parse the LAMMPS dump file.
         
         Returns:
-            pd.DataFrame: Parsed LAMMPS dump data.
+            pd.DataFrame: Parsed LAMMPS dump data, with a 'timestep' column.
         """
-        # TODO: Implement parsing logic
-        self.data = pd.DataFrame()
+        import pandas as pd
+
+        frames = []
+        for k in range(len(self.offsets)):
+            frame = self.get_frame(k)
+            frame.insert(0, "timestep", int(self.timesteps[k]))
+            frames.append(frame)
+        self.data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         return self.data
     
     def get_timesteps(self) -> List[int]:
@@ -182,8 +357,7 @@ class LAMMPSDumpParser:
         Returns:
             List of timestep numbers.
         """
-        # TODO: Implement timestep extraction
-        return []
+        return self.timesteps.tolist()
     
     def get_atoms_at_timestep(self, timestep: int) -> pd.DataFrame:
         """
@@ -193,7 +367,11 @@ class LAMMPSDumpParser:
             timestep: The timestep to extract data for.
             
         Returns:
-            pd.DataFrame: Atom data for the specified timestep.
+            pd.DataFrame: Atom data for the specified timestep, empty if it is not in the file.
         """
-        # TODO: Implement timestep-specific data extraction
-        return pd.DataFrame() 
\ No newline at end of file
+        matches = np.flatnonzero(self.timesteps == timestep)
+        if len(matches) == 0:
+            import pandas as pd
+
+            return pd.DataFrame()
+        return self.get_frame(int(matches[0]))
@@ -0,0 +1,175 @@
+"""
+Hash-indexed deduplication of configurations.
+
+Pooled batches often hold the same configuration more than once: restarted
+jobs repeat their last ionic steps, and copied run directories repeat whole
+outputs. Every frame gets a canonical hash of its species, cell and
+positions, and a frame whose hash is already in the index is dropped before
+it is written.
+
+The hash does not depend on how the configuration was written down:
+
+* the cell is taken in its LAMMPS restricted form, so rotated copies of a
+  cell hash alike;
+* positions enter as fractional coordinates folded into [0, 1), so wrapped
+  and unwrapped copies hash alike;
+* atoms are sorted by species and coordinates, so the atom order does not
+  matter.
+
+Lengths are rounded onto a grid of ``tol`` Angstrom first, so two frames
+that differ by less than ``tol`` usually hash alike; near-duplicates that
+straddle a grid line do not, the index only ever drops exact matches of the
+rounded form. A translated origin or a different choice of lattice vectors
+gives a different hash.
+
+The index can be kept in a file, so later batches are deduplicated against
+every earlier one: a one-line header followed by the 16-byte digests.
+"""
+
+import hashlib
+import os
+from typing import Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .cell import restrict_cells
+
+INDEX_VERSION = 1
+
+DEFAULT_TOL = 1.0e-4
+
+DIGEST_SIZE = 16
+
+
+def frame_hashes(species: Sequence[str], cells: np.ndarray, positions: np.ndarray,
+                 tol: float = DEFAULT_TOL) -> List[bytes]:
+    """
+    Canonical digest of every frame of a stack.
+
+    Args:
+        species: Element of every atom, shared by all frames.
+        cells: (F, 3, 3) cells in Angstrom, one lattice vector per row; a frame
+            with a NaN cell is hashed on its rounded Cartesian positions.
+        positions: (F, N, 3) Cartesian positions in Angstrom, in the frame of ``cells``.
+        tol: Rounding grid in Angstrom.
+
+    Returns:
+        List of F digests of DIGEST_SIZE bytes.
+    """
+    if tol <= 0:
+        raise ValueError("Deduplication tolerance must be positive")
+    positions = np.asarray(positions, dtype=np.float64)
+    positions = positions.reshape(-1, len(species), 3)
+    cells = np.asarray(cells, dtype=np.float64).reshape(-1, 3, 3)
+    names, codes = np.unique(np.asarray(species, dtype=str), return_inverse=True)
+    counts = np.bincount(codes, minlength=len(names))
+    composition = ",".join("%s:%d" % pair for pair in zip(names.tolist(), counts.tolist()))
+
+    periodic = np.isfinite(cells).all(axis=(1, 2))
+    grid = np.empty(positions.shape, dtype=np.int64)
+    cell_grid = np.zeros(cells.shape, dtype=np.int64)
+    if periodic.any():
+        restricted = restrict_cells(cells[periodic])
+        fractional = np.linalg.solve(np.swapaxes(cells[periodic], 1, 2),
+                                     np.swapaxes(positions[periodic], 1, 2))
+        fractional = np.swapaxes(fractional, 1, 2)
+        # one bin per tol along each lattice vector, periodic so x = 0 and x = 1 coincide
+        bins = np.maximum(1, np.rint(np.linalg.norm(restricted, axis=2) / tol)).astype(np.int64)
+        grid[periodic] = np.mod(np.rint(fractional * bins[:, None, :]).astype(np.int64),
+                                bins[:, None, :])
+        cell_grid[periodic] = np.rint(restricted / tol).astype(np.int64)
+    if not periodic.all():
+        grid[~periodic] = np.rint(positions[~periodic] / tol).astype(np.int64)
+
+    # canonical atom order: species first, then the rounded coordinates
+    keys = (grid[..., 2], grid[..., 1], grid[..., 0],
+            np.broadcast_to(codes, grid.shape[:2]))
+    order = np.lexsort(keys, axis=-1)
+    grid = np.take_along_axis(grid, order[..., None], axis=1)
+
+    prefix = ("%s;%g;" % (composition, tol)).encode()
+    digests = []
+    for k in range(len(grid)):
+        digest = hashlib.blake2b(prefix, digest_size=DIGEST_SIZE)
+        digest.update(b"P" if periodic[k] else b"N")
+        digest.update(cell_grid[k].tobytes())
+        digest.update(grid[k].tobytes())
+        digests.append(digest.digest())
+    return digests
+
+
+class HashIndex:
+    """
+    Set of frame digests, optionally kept in a file across runs.
+
+    Digests added since the last ``save`` are appended to the file; the file
+    is not locked, so runs sharing one index file should not overlap.
+    """
+
+    def __init__(self, path: Optional[str] = None, tol: float = DEFAULT_TOL):
+        """
+        Load the digests of an existing index file.
+
+        Args:
+            path: Index file; kept in memory only when None. A missing file starts empty.
+            tol: Rounding grid of the digests, must match the one the file was built with.
+
+        Raises:
+            ValueError: If the file is not an index, or was built with another version or tol.
+        """
+        self.path = path
+        self.tol = tol
+        self._seen: Set[bytes] = set()
+        self._pending: List[bytes] = []
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def _header(self) -> bytes:
+        return ("dftbridge-dedup %d %r\n" % (INDEX_VERSION, float(self.tol))).encode()
+
+    def _load(self, path: str):
+        with open(path, "rb") as fh:
+            data = fh.read()
+        header, _, records = data.partition(b"\n")
+        fields = header.split()
+        if len(fields) != 3 or fields[0] != b"dftbridge-dedup":
+            raise ValueError(f"Not a dedup index: {path}")
+        if int(fields[1]) != INDEX_VERSION or float(fields[2]) != float(self.tol):
+            raise ValueError(f"Dedup index {path} was built with version {int(fields[1])} "
+                             f"and tol {float(fields[2])}, not {INDEX_VERSION} and {self.tol}")
+        # a partial record left by an interrupted append is ignored
+        end = len(records) - len(records) % DIGEST_SIZE
+        self._seen.update(records[i:i + DIGEST_SIZE] for i in range(0, end, DIGEST_SIZE))
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._seen
+
+    def add(self, digest: bytes) -> bool:
+        """Add a digest; True if it was new, False if it is a duplicate."""
+        if digest in self._seen:
+            return False
+        self._seen.add(digest)
+        self._pending.append(digest)
+        return True
+
+    def filter(self, digests: Iterable[bytes]) -> np.ndarray:
+        """
+        Add a run of digests, e.g. the frames of one trajectory.
+
+        Returns:
+            np.ndarray: Boolean mask, True for the first occurrence of each new digest.
+        """
+        return np.array([self.add(digest) for digest in digests], dtype=bool)
+
+    def save(self):
+        """Append the digests added since the last save to the index file, if there is one."""
+        if self.path is None or not self._pending:
+            return
+        with open(self.path, "ab") as fh:
+            if fh.tell() == 0:
+                fh.write(self._header())
+            fh.write(b"".join(self._pending))
+        self._pending = []
@@ -0,0 +1,235 @@
+"""
+Recursive discovery of pw.x outputs and LAMMPS dumps in large directory trees.
+
+The tree is walked breadth first with ``os.scandir``; the directories of
+each level are listed concurrently, which is what hides the per-call
+latency of a parallel filesystem. Candidate files (matched by suffix,
+compressed or not) have their first bytes sniffed concurrently as well, so
+stray files such as ``slurm-1234.out`` are left out.
+
+Results can be kept in a JSON manifest keyed on each directory's mtime.
+Adding, removing or renaming an entry changes the mtime of its directory,
+so a repeat scan only stats the directories and re-lists the ones that
+changed; within those, only files not seen before are sniffed. Edits inside
+an existing file do not change its directory's mtime and are not picked up
+by the manifest. The one exception are files rejected while still shorter
+than the sniffed header (e.g. a job output that was just created): they are
+kept as 'pending' with their size, and sniffed again by any later scan that
+finds the size changed.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .cache import _SUFFIX as _CACHE_SUFFIX
+from .compression import has_suffix, open_binary
+
+MANIFEST_VERSION = 2
+
+# Bytes read from the start of a file when sniffing its header
+SNIFF_BYTES = 8192
+
+Sniffer = Callable[[str], bool]
+
+
+def _head(file_path: str, size: int = SNIFF_BYTES) -> bytes:
+    with open_binary(file_path) as fh:
+        return fh.read(size)
+
+
+def is_qe_output(file_path: str) -> bool:
+    """True if the file (plain or compressed) starts like a pw.x output."""
+    try:
+        return b"Program PWSCF" in _head(file_path)
+    except (OSError, EOFError, ValueError, ImportError):
+        return False
+
+
+def is_lammps_dump(file_path: str) -> bool:
+    """True if the file (plain or compressed) starts with an 'ITEM: TIMESTEP' line."""
+    try:
+        return _head(file_path, 64).lstrip().startswith(b"ITEM: TIMESTEP")
+    except (OSError, EOFError, ValueError, ImportError):
+        return False
+
+
+SNIFFERS: Dict[str, Sniffer] = {
+    'qe': is_qe_output,
+    'lammps': is_lammps_dump,
+}
+
+
+def sniff_files(paths: Sequence[str], sniffer: Sniffer, jobs: int = 16) -> List[bool]:
+    """
+    Run ``sniffer`` over many files concurrently.
+
+    Args:
+        paths: Files to check.
+        sniffer: Predicate reading the start of one file.
+        jobs: Number of threads; sniffing is I/O bound.
+
+    Returns:
+        One result per path, in the order of ``paths``.
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        return [sniffer(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        return list(pool.map(sniffer, paths))
+
+
+def _list_dir(path: str, suffixes: Tuple[str, ...]) -> Tuple[int, List[str], List[str]]:
+    """mtime, matching file names and subdirectory names of one directory (empty if unreadable)."""
+    files = []
+    dirs = []
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # parse cache directories hold no outputs
+                        if not entry.name.endswith(_CACHE_SUFFIX):
+                            dirs.append(entry.name)
+                    elif any(has_suffix(entry.name, suffix) for suffix in suffixes):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        return -1, [], []
+    return mtime_ns, sorted(files), sorted(dirs)
+
+
+def _stat_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _size(path: str) -> int:
+    """Size of a file on disk, -1 if it cannot be stat'ed."""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return -1
+
+
+def discover(root: str = ".", suffixes: Union[str, Sequence[str]] = ".out",
+             sniffer: Optional[Union[str, Sniffer]] = "qe", manifest: Optional[str] = None,
+             jobs: int = 16) -> List[str]:
+    """
+    Find every matching file below ``root``.
+
+    Args:
+        root: Top of the tree.
+        suffixes: File suffix(es) to match; '.out' also matches 'run.out.gz' etc.
+        sniffer: Name in SNIFFERS, a predicate on the path, or None to accept
+            every suffix match without opening it.
+        manifest: JSON file to reuse and update between scans; None scans from scratch.
+        jobs: Threads used to list directories and sniff files.
+
+    Returns:
+        Sorted, normalized paths of the matching files (``root`` joined with the path below it).
+    """
+    if isinstance(suffixes, str):
+        suffixes = (suffixes,)
+    suffixes = tuple(suffixes)
+    if isinstance(sniffer, str):
+        sniffer_name: Optional[str] = sniffer
+        sniffer = SNIFFERS[sniffer]
+    else:
+        sniffer_name = None if sniffer is None else getattr(sniffer, "__name__", repr(sniffer))
+
+    settings = {'version': MANIFEST_VERSION, 'root': os.path.abspath(root),
+                'suffixes': list(suffixes), 'sniffer': sniffer_name}
+    previous: Dict[str, dict] = {}
+    if manifest is not None and os.path.exists(manifest):
+        try:
+            with open(manifest) as fh:
+                stored = json.load(fh)
+            if {key: stored.get(key) for key in settings} == settings:
+                previous = stored['dirs']
+        except (OSError, ValueError, KeyError):
+            previous = {}
+
+    current: Dict[str, dict] = {}
+    level = [os.curdir]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while level:
+            paths = [os.path.join(root, rel) for rel in level]
+            mtimes = list(pool.map(_stat_mtime, paths))
+            changed = [i for i, rel in enumerate(level)
+                       if mtimes[i] is not None
+                       and previous.get(rel, {}).get('mtime_ns') != mtimes[i]]
+            listings = dict(zip(changed, pool.map(lambda i: _list_dir(paths[i], suffixes), changed)))
+
+            # sniff the new files of every changed directory, and the pending files of
+            # every directory of this level, in one concurrent batch
+            accepted: Dict[int, List[str]] = {}
+            skipped: Dict[int, List[str]] = {}
+            pending: Dict[int, Dict[str, int]] = {}
+            candidates = []
+            for i, rel in enumerate(level):
+                if mtimes[i] is None:
+                    continue
+                known = previous.get(rel, {})
+                accepted[i], skipped[i], pending[i] = [], [], {}
+                seen_ok = set(known.get('files', ()))
+                seen_bad = set(known.get('skipped', ()))
+                seen_short = known.get('pending', {})
+                if i in listings:
+                    names = listings[i][1]
+                else:
+                    names = sorted(seen_ok | seen_bad | set(seen_short))
+                for name in names:
+                    if name in seen_ok:
+                        accepted[i].append(name)
+                    elif name in seen_bad:
+                        skipped[i].append(name)
+                    elif name in seen_short and \
+                            _size(os.path.join(paths[i], name)) == seen_short[name]:
+                        pending[i][name] = seen_short[name]
+                    else:
+                        candidates.append((i, name))
+            if sniffer is not None and candidates:
+                keep = list(pool.map(sniffer, [os.path.join(paths[i], name)
+                                               for i, name in candidates]))
+            else:
+                keep = [True] * len(candidates)
+            for (i, name), ok in zip(candidates, keep):
+                if ok:
+                    accepted[i].append(name)
+                    continue
+                size = _size(os.path.join(paths[i], name))
+                if size < SNIFF_BYTES:
+                    # may still be a job that has not written its header yet
+                    pending[i][name] = size
+                else:
+                    skipped[i].append(name)
+
+            next_level = []
+            for i, rel in enumerate(level):
+                if mtimes[i] is None:
+                    continue
+                dirs = listings[i][2] if i in listings else previous[rel]['dirs']
+                mtime_ns = listings[i][0] if i in listings else previous[rel]['mtime_ns']
+                entry = {'mtime_ns': mtime_ns, 'files': sorted(accepted[i]),
+                         'skipped': sorted(skipped[i]),
+                         'pending': dict(sorted(pending[i].items())), 'dirs': dirs}
+                current[rel] = entry
+                next_level.extend(os.path.normpath(os.path.join(rel, name))
+                                  for name in entry['dirs'])
+            level = next_level
+
+    if manifest is not None:
+        # rewritten in place: replacing the file would change the mtime of its directory
+        # and have that directory listed again on every scan (a torn write just means a full rescan)
+        with open(manifest, "w") as fh:
+            json.dump(dict(settings, dirs=current), fh)
+
+    found = []
+    for rel, entry in current.items():
+        found.extend(os.path.normpath(os.path.join(root, rel, name)) for name in entry['files'])
+    return sorted(found)
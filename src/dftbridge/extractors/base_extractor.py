@@ -2,17 +2,83 @@
 Base class for DFT output extractors.
 """
 
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Any, Tuple
+import functools
 import json
-import pandas as pd
+import os
+import re
 import numpy as np
 
+from .. import stats
+from ..cache import cached_trajectory, load_trajectory
+from ..compression import is_compressed, open_binary, open_text
+from ..frame_index import read_frames
+from ..frames import Frame, iter_frames
+from ..qeio import MappedOutput, grep_stripped
+from ..sections import SectionIndex
+from ..species import element_table
+from ..trajectory import Trajectory
+
+# extractors hand out DataFrames, but pandas is only imported once one is built
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Extraction methods whose results are cached per file version; subclass
+# implementations are wrapped automatically (see BaseExtractor.__init_subclass__)
+MEMOIZED_METHODS = (
+    'extract_coordinates',
+    'extract_lattice',
+    'extract_energies',
+    'extract_system_info',
+    'extract_trajectory',
+)
+
+
+def memoized(method: Callable) -> Callable:
+    """
+    Cache an extractor method's result, keyed on its arguments.
+
+    The cache belongs to the extractor instance and is dropped as soon as the
+    file's identity (path, size, mtime) changes. Cached values are returned
+    as-is, so callers must copy them before modifying them.
+    """
+    if getattr(method, '_memoized', False):
+        return method
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._check_file_identity()
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key in self._cache:
+            self.cache_hits += 1
+            return self._cache[key]
+        self.cache_misses += 1
+        value = method(self, *args, **kwargs)
+        self._cache[key] = value
+        return value
+
+    wrapper._memoized = True
+    return wrapper
+
 
 class BaseExtractor(ABC):
     """
     Abstract base class for extracting data from DFT output files.
+
+    Every method listed in MEMOIZED_METHODS is computed once per version of
+    the file and then served from a per-instance cache; ``cache_info()``
+    reports how often that happened.
     """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in MEMOIZED_METHODS:
+            if name in cls.__dict__:
+                setattr(cls, name, memoized(cls.__dict__[name]))
     
     def __init__(self, file_path: str):
         """
@@ -22,32 +88,84 @@ class BaseExtractor(ABC):
             file_path: Path to the DFT output file
         """
         self.file_path = file_path
-        self.lines = []
+        self.mapped: Optional[MappedOutput] = None
+        self._lines: Optional[List[str]] = None
+        self._sections: Optional[SectionIndex] = None
         self.metadata = {}
         self.system_info = {}
+
+        # memoized extraction results, valid for the file version in _identity
+        self._cache: Dict[tuple, Any] = {}
+        self._identity: Optional[Tuple[str, int, int]] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
         
-        # Common elements for LAMMPS conversion
-        self.common_elements = {
-            'H': {'number': 1, 'mass': 1.008},
-            'C': {'number': 6, 'mass': 12.011},
-            'N': {'number': 7, 'mass': 14.007},
-            'O': {'number': 8, 'mass': 15.999},
-            'Si': {'number': 14, 'mass': 28.085},
-            'S': {'number': 16, 'mass': 32.065},
-            'Fe': {'number': 26, 'mass': 55.845},
-            'Cu': {'number': 29, 'mass': 63.546},
-            'Au': {'number': 79, 'mass': 196.967},
-            'Al': {'number': 13, 'mass': 26.982},
-            'Ti': {'number': 22, 'mass': 47.867},
-            'Mo': {'number': 42, 'mass': 95.94},
-            'W': {'number': 74, 'mass': 183.84}
-        }
+        # Number and mass of every element for LAMMPS conversion
+        self.common_elements = element_table()
     
     def read_file(self):
-        """Read the entire file into memory."""
-        with open(self.file_path, 'r') as f:
-            self.lines = [line.strip() for line in f.readlines()]
-        self.lines = self.remove_comments(self.lines)
+        """
+        Memory-map the file; lines are only decoded for the sections that get parsed.
+
+        Compressed files (.gz, .xz, .bz2, .zst) cannot be mapped; they are left
+        unmapped and every reader streams them instead.
+        """
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        self._lines = None
+        self._sections = None
+        if not is_compressed(self.file_path):
+            self.mapped = MappedOutput(self.file_path)
+
+    def _file_identity(self) -> Tuple[str, int, int]:
+        """Path, size and mtime (ns) of the file as it is on disk now."""
+        stat = os.stat(self.file_path)
+        return (os.path.abspath(self.file_path), stat.st_size, stat.st_mtime_ns)
+
+    def _check_file_identity(self):
+        """Drop cached results (and the stale mapping) if the file changed since they were computed."""
+        identity = self._file_identity()
+        if identity == self._identity:
+            return
+        if self._identity is not None:
+            self._cache.clear()
+            self._lines = None
+            self._sections = None
+            if self.mapped is not None:
+                self.read_file()
+        self._identity = identity
+
+    def cache_info(self) -> Dict[str, int]:
+        """
+        Report cache usage.
+
+        Returns:
+            Dictionary with 'hits', 'misses' and 'size' (number of cached results).
+        """
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'size': len(self._cache)}
+
+    def clear_cache(self):
+        """Forget every cached result; the counters are kept."""
+        self._cache.clear()
+        self._identity = None
+
+    @property
+    def lines(self) -> List[str]:
+        """All comment-stripped lines, decoded from the mapped file on first access."""
+        if self._lines is None:
+            if self.mapped is not None:
+                self._lines = self.remove_comments([line.strip() for line in self.mapped.lines()])
+            elif is_compressed(self.file_path):
+                with open_text(self.file_path) as fh:
+                    self._lines = self.remove_comments([line.strip() for line in fh])
+            else:
+                return []
+        return self._lines
+
+    @lines.setter
+    def lines(self, value: List[str]):
+        self._lines = value
     
     def remove_comments(self, lines: List[str], comment_char: str = '#') -> List[str]:
         """Remove comments from input lines."""
@@ -58,15 +176,111 @@ class BaseExtractor(ABC):
                 clean_lines.append(partitioned[0])
         return clean_lines
     
+    @property
+    def sections(self) -> SectionIndex:
+        """
+        Spans of the ATOMIC_POSITIONS, CELL_PARAMETERS, crystal axes, forces and stress sections.
+
+        Built in one pass over the mapped file on first access, so block parsers
+        can slice their block with ``self.sections.block(name)`` instead of
+        rescanning lines.
+        """
+        if self._sections is None:
+            if is_compressed(self.file_path):
+                with open_binary(self.file_path) as fh:
+                    self._sections = SectionIndex.from_stream(
+                        fh, reopen=lambda: open_binary(self.file_path))
+                return self._sections
+            if self.mapped is None:
+                self.read_file()
+            self._sections = SectionIndex(self.mapped)
+        return self._sections
+
     def find_section(self, pattern: str) -> List[str]:
-        """Find lines matching a pattern."""
-        import re
+        """
+        Find lines matching a pattern.
+
+        The pattern is matched against the same stripped, comment-free lines as
+        ``self.lines``, whichever way the file is read. Patterns without
+        anchors or whitespace are searched on the raw file first, and only the
+        lines that hit are decoded.
+        """
+        if self._lines is None:
+            hits = grep_stripped(pattern, self.mapped, self.file_path, self.remove_comments)
+            if hits is not None:
+                return hits
         matches = []
         for line in self.lines:
             if re.search(pattern, line):
                 matches.append(line)
         return matches
     
+    def iter_frames(self, start: Optional[int] = None, stop: Optional[int] = None) -> Iterator[Frame]:
+        """
+        Stream the file one ionic step at a time.
+
+        Without bounds the file is read front to back. With ``start``/``stop``
+        the frame-offset sidecar (``<file>.idx``) is used to seek straight to the
+        requested frames, so the cost is proportional to the frames read.
+        Compressed files are always streamed, skipping frames outside the range.
+        If the file's trajectory is in the on-disk parse cache, the frames come
+        from its memory maps instead.
+
+        Args:
+            start: First frame to read.
+            stop: One past the last frame to read.
+
+        Returns:
+            Iterator over Frame objects; only the current frame is held in memory.
+        """
+        cached = load_trajectory(self.file_path)
+        if cached is not None:
+            return iter(cached[start:stop])
+        if start is None and stop is None:
+            return iter_frames(self.file_path)
+        return read_frames(self.file_path, start or 0, stop)
+
+    def get_frame(self, k: int) -> Frame:
+        """
+        Read frame ``k`` through the frame-offset sidecar.
+
+        Args:
+            k: Frame number, negative values count from the end.
+
+        Returns:
+            Frame: The requested ionic step.
+
+        Raises:
+            IndexError: If there is no frame ``k``.
+        """
+        cached = load_trajectory(self.file_path)
+        if cached is not None:
+            return cached[k]
+        for frame in read_frames(self.file_path, k, k + 1 if k != -1 else None):
+            return frame
+        raise IndexError(f"frame {k} out of range")
+
+    @memoized
+    def extract_trajectory(self, start: Optional[int] = None,
+                           stop: Optional[int] = None) -> Trajectory:
+        """
+        Collect the ionic steps into one columnar Trajectory.
+
+        The full trajectory is stored in the on-disk parse cache, so later
+        calls (from any process) memory-map it instead of parsing the file.
+
+        Args:
+            start: First frame to read.
+            stop: One past the last frame to read.
+
+        Returns:
+            Trajectory: Positions, forces, energies and cells stacked frame-major.
+        """
+        if start is None and stop is None:
+            return cached_trajectory(self.file_path,
+                                     lambda: Trajectory.from_frames(iter_frames(self.file_path)))
+        return Trajectory.from_frames(self.iter_frames(start, stop))
+    
     @abstractmethod
     def extract_coordinates(self) -> pd.DataFrame:
         """Extract atomic coordinates."""
@@ -82,12 +296,14 @@ class BaseExtractor(ABC):
         """Extract energy information."""
         pass
     
+    @memoized
     def extract_system_info(self) -> Dict[str, Any]:
         """Extract general system information."""
+        coordinates = self.extract_coordinates()
         return {
             'calculation_type': self.get_calculation_type(),
-            'number_of_atoms': len(self.extract_coordinates()),
-            'elements_present': list(self.extract_coordinates()['element'].unique()),
+            'number_of_atoms': len(coordinates),
+            'elements_present': list(coordinates['element'].unique()),
             'lattice_volume': np.linalg.det(self.extract_lattice())
         }
     
@@ -109,14 +325,25 @@ class BaseExtractor(ABC):
             json.dump(data, f, indent=2, default=str)
     
     def extract_all(self) -> Dict[str, Any]:
-        """Extract all available data from the file."""
-        self.read_file()
-        
-        coordinates = self.extract_coordinates()
-        lattice = self.extract_lattice()
-        energies = self.extract_energies()
-        system_info = self.extract_system_info()
-        
+        """
+        Extract all available data from the file.
+
+        Each step is timed as its own stage when a ``stats.collect()`` block is active.
+        """
+        with stats.stage("read") as stage:
+            self.read_file()
+            stage.add(bytes=self.mapped.size if self.mapped is not None else 0)
+
+        with stats.stage("coordinates") as stage:
+            coordinates = self.extract_coordinates()
+            stage.add(lines=len(coordinates))
+        with stats.stage("lattice"):
+            lattice = self.extract_lattice()
+        with stats.stage("energies"):
+            energies = self.extract_energies()
+        with stats.stage("system_info"):
+            system_info = self.extract_system_info()
+
         return {
             'coordinates': coordinates,
             'lattice': lattice,
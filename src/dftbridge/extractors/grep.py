@@ -4,16 +4,40 @@ import re
 import numpy as np
 from typing import Optional
 
+from .. import cache, stats
+from ..blocks import FORCE_FIELDS, TAU_FIELDS, parse_vector_block
+from ..compression import open_text
+from ..units import ryau2evang
+
+# precompiled once so scan_all() never recompiles per line
+_INT = re.compile(r'\d+')
+_FLOAT = re.compile(r'-?\d+\.\d+')
+
+
+def _flush_positions(block: list, poslist: list) -> None:
+    """ converts a finished block of tau(...) lines in one vectorized call and empties it """
+    if block:
+        poslist.extend(parse_vector_block(block, width=TAU_FIELDS).tolist())
+        block.clear()
+
+
+def _flush_forces(block: list, forcelist: list) -> None:
+    """ converts a finished 'Forces acting on atoms' block, Ry/Bohr -> eV/Angstrom over the whole array """
+    if block:
+        forces = parse_vector_block(block, scale=ryau2evang, width=FORCE_FIELDS)
+        forcelist.extend(forces.tolist())
+        block.clear()
+
 class dftbridge:
 
     def __init__(self, QEfilepath):
         self.QEfile = QEfilepath
-        self.numatoms = Optional[int] = None
+        self.numatoms: Optional[int] = None
 
     """ grep-style functions that read the DFT outputs for text patterns(ATOMIC_POSITION, Total energy, Total force) and saves in list """
 
     def grep_numatoms(self) -> int:
-        for line in open(self.QEfile, "r"):
+        for line in open_text(self.QEfile):
             if re.search("number of atoms/cell", line):
                 numbers = re.findall(r'\d+', line) # Extract the number from the line if the pattern was found in that line
                 if numbers:
@@ -28,7 +52,7 @@ class dftbridge:
         full_position_list = []
         timestep_x_positions = []
         postions_found = False
-        for line_number, line in enumerate(open(self.QEfile, "r"), start=1):
+        for line_number, line in enumerate(open_text(self.QEfile), start=1):
             if re.search("ATOMIC_POSITIONS", line):
         
                 for atom in self.numatoms:
@@ -43,23 +67,22 @@ class dftbridge:
         found_positions = False
         reading_coordinates = False
 
-        for line in open(self.QEfile, "r"):
+        block = []
+
+        for line in open_text(self.QEfile):
             if re.search("ATOMIC_POSITIONS", line): # Check if we found the ATOMIC_POSITIONS line
+                _flush_positions(block, poslist)
                 found_positions = True
                 reading_coordinates = True
                 continue
             # for eachAtom in numatoms:
-                if reading_coordinates and line.strip(): # If we're reading coordinates, extract numbers from the line
-                    tau_match = re.search(r'tau\(\s*([^)]+)\)', line) # Look specifically for numbers inside tau(...)
-                    if tau_match:
-                        tau_content = tau_match.group(1)
-                        
-                        numbers = re.findall(r'-?\d+\.\d+', tau_content)
-                        if len(numbers) >= 3:
-                            coords = [float(num) for num in numbers[:3]] 
-                            poslist.append(coords)
-                    elif not line.strip().startswith('!'):
-                        reading_coordinates = False
+            if reading_coordinates and line.strip(): # If we're reading coordinates, collect the tau(...) lines of this block
+                if "tau(" in line:
+                    block.append(line)
+                elif not line.strip().startswith('!'):
+                    reading_coordinates = False
+                    _flush_positions(block, poslist) # whole block -> (N,3) in one go
+        _flush_positions(block, poslist)
 
         if not found_positions:
             print(f"grep failed to find ATOMIC_POSITIONS in {self.QEfile}")
@@ -69,7 +92,7 @@ class dftbridge:
     def grep_totenergy(self) -> list:
         energylist = []
         foundPattern = False
-        for line in open(self.QEfile, "r"):
+        for line in open_text(self.QEfile):
             
             if line.startswith("!") and re.search("total energy", line):
                 numbers = re.findall(r'-?\d+\.\d+', line)
@@ -83,7 +106,7 @@ class dftbridge:
     def grep_forces(self) -> list:
         forcelist = []
         foundPattern = False
-        for line in open(self.QEfile, "r"):
+        for line in open_text(self.QEfile):
             if re.search("Total force", line):
                 numbers = re.findall(r'-?\d+\.\d+', line) # Extract the numbers directly from the line
                 if numbers:
@@ -93,10 +116,32 @@ class dftbridge:
             print(f"grep failed to find force in {self.QEfile}")
         return forcelist
     
+    def grep_atomic_forces(self) -> list:
+        """ per-atom forces of every step in eV/Angstrom, one [fx, fy, fz] per atom (like grep_atomic_positions).
+        Only the total forces are kept, not the contributions QE may print after them """
+        forcelist = []
+        block = []
+        reading_forces = False
+        for line in open_text(self.QEfile):
+            stripped = line.strip()
+            if stripped.startswith("Forces acting on atoms"):
+                _flush_forces(block, forcelist)
+                reading_forces = True
+            elif reading_forces:
+                if "force =" in stripped:
+                    block.append(stripped)
+                elif stripped or block: # blank lines only end the block once it started
+                    reading_forces = False
+                    _flush_forces(block, forcelist)
+        _flush_forces(block, forcelist)
+        if not forcelist:
+            print(f"grep failed to find atomic forces in {self.QEfile}")
+        return forcelist
+
     def grep_lattice(self) -> list:
         latlist = []
         foundPattern = False
-        for line in open(self.QEfile, "r"):
+        for line in open_text(self.QEfile):
             if re.search("lattice parameter", line):
                 val = re.findall(r'-?\d+.\d+', line)
                 if val:
@@ -105,11 +150,133 @@ class dftbridge:
         if not foundPattern:
             print(f"grep failed to find lattice parameter in {self.QEfile}")
         return latlist
+
+    def scan_all(self) -> dict:
+        """ single pass version of every grep_* function above. The result is kept in the on-disk
+        parse cache (see cache.py), so calling it again on an unchanged file skips the text entirely """
+        cached = cache.load(self.QEfile, "grep")
+        if cached is not None:
+            numatoms = int(cached['numatoms'])
+            if numatoms:
+                self.numatoms = numatoms
+            return {
+                'numatoms': numatoms,
+                'positions': cached['positions'].tolist(),
+                'energies': cached['energies'].tolist(),
+                'forces': cached['forces'].tolist(),
+                'atomic_forces': cached['atomic_forces'].tolist(),
+                'lattice': cached['lattice'].tolist(),
+            }
+
+        result = self._scan_text()
+        cache.save(self.QEfile, "grep", {
+            'numatoms': np.array(result['numatoms']),
+            'positions': np.array(result['positions'], dtype=np.float64).reshape(-1, 3),
+            'energies': np.array(result['energies'], dtype=np.float64),
+            'forces': np.array(result['forces'], dtype=np.float64),
+            'atomic_forces': np.array(result['atomic_forces'], dtype=np.float64).reshape(-1, 3),
+            'lattice': np.array(result['lattice'], dtype=np.float64),
+        })
+        return result
+
+    def _scan_text(self) -> dict:
+        """ the actual text pass behind scan_all(). Each line is dispatched on its first character
+        and a startswith() check, so the regexes only ever run on lines that already matched """
+        numatoms = None
+        poslist = []
+        energylist = []
+        forcelist = []
+        atomforces = []
+        latlist = []
+        block = []
+        force_block = []
+        reading_coordinates = False
+        reading_forces = False
+
+        with stats.stage("scan") as stage, open_text(self.QEfile) as fh:
+            nlines = 0
+            for nlines, line in enumerate(fh, 1):
+                stripped = line.lstrip()
+
+                if reading_coordinates and stripped:
+                    if "tau(" in stripped:
+                        block.append(stripped)
+                        continue
+                    if not stripped.startswith('!'):
+                        reading_coordinates = False
+                        _flush_positions(block, poslist)
+
+                if reading_forces:
+                    # the (N,3) force block is collected here and converted in one call when it ends
+                    if "force =" in stripped:
+                        force_block.append(stripped)
+                        continue
+                    if stripped or force_block:
+                        reading_forces = False
+                        _flush_forces(force_block, atomforces)
+                    else:
+                        continue
+
+                first = stripped[:1]
+                if first == "!":
+                    if "total energy" in stripped:
+                        numbers = _FLOAT.findall(stripped)
+                        if numbers:
+                            energylist.append(float(numbers[0]))
+                elif first == "A":
+                    if stripped.startswith("ATOMIC_POSITIONS"):
+                        _flush_positions(block, poslist)
+                        reading_coordinates = True
+                elif first == "F":
+                    if stripped.startswith("Forces acting on atoms"):
+                        _flush_forces(force_block, atomforces)
+                        reading_forces = True
+                elif first == "T":
+                    if stripped.startswith("Total force"):
+                        numbers = _FLOAT.findall(stripped)
+                        if numbers:
+                            forcelist.append(float(numbers[0]))
+                elif first == "l":
+                    if stripped.startswith("lattice parameter"):
+                        val = _FLOAT.findall(stripped)
+                        if val:
+                            latlist.append(float(val[0]))
+                elif first == "n":
+                    if numatoms is None and stripped.startswith("number of atoms/cell"):
+                        numbers = _INT.findall(stripped)
+                        if numbers:
+                            numatoms = int(numbers[0])
+            stage.add(bytes=os.path.getsize(self.QEfile), lines=nlines, frames=len(energylist))
+        _flush_positions(block, poslist)
+        _flush_forces(force_block, atomforces)
+
+        if numatoms is None:
+            print(f"grep failed to find number of atoms in {self.QEfile}")
+        else:
+            self.numatoms = numatoms
+        if not poslist:
+            print(f"grep failed to find ATOMIC_POSITIONS in {self.QEfile}")
+        if not energylist:
+            print(f"grep failed to find energies in {self.QEfile}")
+        if not forcelist:
+            print(f"grep failed to find force in {self.QEfile}")
+        if not latlist:
+            print(f"grep failed to find lattice parameter in {self.QEfile}")
+
+        return {
+            'numatoms': numatoms if numatoms is not None else 0,
+            'positions': poslist,
+            'energies': energylist,
+            'forces': forcelist,
+            'atomic_forces': atomforces,
+            'lattice': latlist,
+        }
     
 if __name__ == "__main__":
     yttrium = dftbridge("/Users/andrewtrepagnier/Forks/psuedo-lammps/tests/qe_dft_example.txt")
 
     print("Number of atoms:", yttrium.grep_numatoms())
+    #print("Everything in one pass:", yttrium.scan_all())
     #print(np.shape(yttrium.grep_atomic_positions()))
     #print(f"The atomic positions at 9th timestep is {yttrium.grep_atomic_positions()[8]}")
     #print("Atomic positions:", yttrium.grep_atomic_positions())
@@ -0,0 +1,36 @@
+"""
+Extractor for Quantum ESPRESSO relax outputs.
+"""
+
+from typing import Dict
+
+from .qe_scf_extractor import QESCFExtractor
+
+
+class QERelaxedExtractor(QESCFExtractor):
+    """
+    Fixed-cell pw.x relaxations.
+
+    Coordinates, cell and energy describe the last converged ionic step;
+    ``extract_trajectory`` has every step of the relaxation.
+    """
+
+    def extract_energies(self) -> Dict[str, float]:
+        """
+        Energies of the relaxation.
+
+        Returns:
+            Dictionary with 'total_energy' (last step), 'initial_energy' (first step)
+            and 'relaxation_energy' (their difference), all in eV, and 'ionic_steps'.
+        """
+        energies = self._require_frames().energies
+        return {
+            'total_energy': float(energies[-1]),
+            'initial_energy': float(energies[0]),
+            'relaxation_energy': float(energies[-1] - energies[0]),
+            'ionic_steps': len(energies),
+        }
+
+    def get_calculation_type(self) -> str:
+        """Return the type of calculation."""
+        return 'relax'
@@ -0,0 +1,138 @@
+"""
+Extractor for Quantum ESPRESSO vc-relax outputs.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict
+
+import numpy as np
+
+from .. import cache, stats
+from ..frames import iter_frames
+from ..species import assign_types
+from .base_extractor import memoized
+from .qe_relaxed_extractor import QERelaxedExtractor
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Per-step arrays returned by extract_steps, all stacked with the step as leading axis
+STEP_ARRAYS = ('energies', 'cells', 'positions', 'forces', 'stress', 'pressure')
+
+
+class QERelaxedVCExtractor(QERelaxedExtractor):
+    """
+    Variable-cell pw.x relaxations.
+
+    The cell changes every step, so besides positions and energy each step's
+    CELL_PARAMETERS, stress tensor and pressure are collected. The output is
+    streamed once with only the current step in memory; the stacked arrays
+    are kept in the on-disk parse cache.
+    """
+
+    @memoized
+    def extract_steps(self) -> Dict[str, Any]:
+        """
+        Every converged ionic step of the relaxation, in one pass.
+
+        Returns:
+            Dictionary with 'species' (element of every atom) and the STEP_ARRAYS:
+            'energies' (S,) in eV, 'cells' (S, 3, 3) and 'positions' (S, N, 3) in
+            Angstrom, 'forces' (S, N, 3) in eV/Angstrom, 'stress' (S, 3, 3) and
+            'pressure' (S,) in bar. Quantities a step did not print are NaN.
+        """
+        cached = cache.load(self.file_path, "vc-relax")
+        if cached is not None:
+            steps: Dict[str, Any] = {name: cached[name] for name in STEP_ARRAYS}
+            steps['species'] = list(cached['meta']['species'])
+            return steps
+
+        collected: Dict[str, list] = {name: [] for name in STEP_ARRAYS}
+        species: list = []
+        with stats.stage("scan") as stage:
+            for frame in iter_frames(self.file_path):
+                species = frame.species
+                natoms = frame.natoms
+                collected['energies'].append(frame.energy)
+                collected['cells'].append(frame.cell)
+                collected['positions'].append(frame.positions)
+                collected['forces'].append(frame.forces if frame.forces is not None
+                                           else np.full((natoms, 3), np.nan))
+                collected['stress'].append(frame.stress if frame.stress is not None
+                                           else np.full((3, 3), np.nan))
+                collected['pressure'].append(np.nan if frame.pressure is None else frame.pressure)
+            stage.add(frames=len(collected['energies']))
+
+        natoms = len(species)
+        shapes = {'energies': (0,), 'cells': (0, 3, 3), 'positions': (0, natoms, 3),
+                  'forces': (0, natoms, 3), 'stress': (0, 3, 3), 'pressure': (0,)}
+        steps = {name: np.array(values, dtype=np.float64) if values
+                 else np.zeros(shapes[name], dtype=np.float64)
+                 for name, values in collected.items()}
+        cache.save(self.file_path, "vc-relax", steps, extra={'species': list(species)})
+        steps['species'] = list(species)
+        return steps
+
+    def extract_coordinates(self) -> pd.DataFrame:
+        """
+        Positions and forces of the last ionic step, in its own cell.
+
+        Returns:
+            pd.DataFrame: One row per atom with 'id', 'type', 'element', 'x', 'y', 'z', 'fx', 'fy', 'fz'.
+        """
+        import pandas as pd
+
+        steps = self._require_steps()
+        types = assign_types(steps['species'])[1]
+        positions = steps['positions'][-1]
+        forces = steps['forces'][-1]
+        return pd.DataFrame({
+            'id': np.arange(1, len(types) + 1),
+            'type': types,
+            'element': steps['species'],
+            'x': positions[:, 0],
+            'y': positions[:, 1],
+            'z': positions[:, 2],
+            'fx': forces[:, 0],
+            'fy': forces[:, 1],
+            'fz': forces[:, 2],
+        })
+
+    def extract_lattice(self) -> np.ndarray:
+        """
+        Relaxed cell, i.e. the cell of the last ionic step.
+
+        Returns:
+            np.ndarray: (3, 3) cell matrix in Angstrom, one lattice vector per row.
+        """
+        return np.array(self._require_steps()['cells'][-1])
+
+    def extract_energies(self) -> Dict[str, float]:
+        """
+        Energies and final pressure of the relaxation.
+
+        Returns:
+            Dictionary with the keys of QERelaxedExtractor.extract_energies plus
+            'pressure' of the last step in bar (NaN if it printed none).
+        """
+        steps = self._require_steps()
+        energies = steps['energies']
+        return {
+            'total_energy': float(energies[-1]),
+            'initial_energy': float(energies[0]),
+            'relaxation_energy': float(energies[-1] - energies[0]),
+            'ionic_steps': len(energies),
+            'pressure': float(steps['pressure'][-1]),
+        }
+
+    def get_calculation_type(self) -> str:
+        """Return the type of calculation."""
+        return 'vc-relax'
+
+    def _require_steps(self) -> Dict[str, Any]:
+        steps = self.extract_steps()
+        if len(steps['energies']) == 0:
+            raise ValueError(f"No converged ionic step found in {self.file_path}")
+        return steps
@@ -0,0 +1,66 @@
+"""
+Extractor for Quantum ESPRESSO scf outputs.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict
+
+import numpy as np
+
+from ..trajectory import Trajectory
+from .base_extractor import BaseExtractor
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class QESCFExtractor(BaseExtractor):
+    """
+    Single-point pw.x calculations.
+
+    Every quantity comes from the memoized, on-disk cached trajectory, so the
+    output is parsed at most once however many of them are asked for.
+    Values are in LAMMPS metal units (eV, Angstrom, eV/Angstrom).
+    """
+
+    def extract_coordinates(self) -> pd.DataFrame:
+        """
+        Positions and forces of the last ionic step.
+
+        Returns:
+            pd.DataFrame: One row per atom with 'id', 'type', 'element', 'x', 'y', 'z', 'fx', 'fy', 'fz'.
+
+        Raises:
+            ValueError: If the output holds no converged step.
+        """
+        trajectory = self._require_frames()
+        return trajectory.to_dataframe(-1).drop(columns='frame')
+
+    def extract_lattice(self) -> np.ndarray:
+        """
+        Cell of the last ionic step.
+
+        Returns:
+            np.ndarray: (3, 3) cell matrix in Angstrom, one lattice vector per row.
+        """
+        return np.array(self._require_frames().cells[-1])
+
+    def extract_energies(self) -> Dict[str, float]:
+        """
+        Total energy of the calculation.
+
+        Returns:
+            Dictionary with 'total_energy' in eV.
+        """
+        return {'total_energy': float(self._require_frames().energies[-1])}
+
+    def get_calculation_type(self) -> str:
+        """Return the type of calculation."""
+        return 'scf'
+
+    def _require_frames(self) -> Trajectory:
+        trajectory = self.extract_trajectory()
+        if len(trajectory) == 0:
+            raise ValueError(f"No converged ionic step found in {self.file_path}")
+        return trajectory
@@ -0,0 +1,187 @@
+"""
+Incremental (tail-follow) parsing of pw.x outputs that are still being written.
+
+A ``Follower`` remembers the byte offset where its last complete frame
+ended, together with the offsets of the header lines that frame depends on
+(alat, number of atoms, cell and positions blocks). Each ``poll`` is a
+single ``os.stat`` when the file has not changed; otherwise only the bytes
+after that offset are scanned and the newly completed frames are returned.
+
+A frame counts as complete once the next geometry block has started, or the
+job has printed 'JOB DONE.'. Whatever follows the last complete frame,
+including a half-written line or block, is scanned again on the next poll.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from .compression import is_compressed
+from .frame_index import _feed, _fingerprint
+from .frames import OFFSET_FIELDS, Frame, FrameScanner, LineSource
+
+# pw.x prints this as the very last line of a run that ended normally
+JOB_DONE = b"JOB DONE."
+
+_CELL = OFFSET_FIELDS.index("cell")
+_POSITIONS = OFFSET_FIELDS.index("positions")
+_END = OFFSET_FIELDS.index("end")
+
+_TAIL_CHUNK = 1 << 16
+
+
+def _complete_end(fh, start: int, size: int) -> int:
+    """Offset just past the last newline in [start, size), or ``start`` if there is none."""
+    end = size
+    while end > start:
+        chunk_start = max(start, end - _TAIL_CHUNK)
+        fh.seek(chunk_start)
+        newline = fh.read(end - chunk_start).rfind(b"\n")
+        if newline >= 0:
+            return chunk_start + newline + 1
+        end = chunk_start
+    return start
+
+
+class _BoundedLines:
+    """Reads lines of a file up to a fixed end offset, noting whether 'JOB DONE.' went by."""
+
+    def __init__(self, fh, end: int):
+        self.fh = fh
+        self.end = end
+        self.job_done = False
+
+    def readline(self) -> bytes:
+        remaining = self.end - self.fh.tell()
+        if remaining <= 0:
+            return b""
+        line = self.fh.readline(remaining)
+        if JOB_DONE in line:
+            self.job_done = True
+        return line
+
+
+class Follower:
+    """
+    Yields the ionic steps of a growing pw.x output as they are completed.
+
+    Attributes:
+        file_path: The output being followed.
+        offset: End of the last frame returned; everything before it is done.
+        count: Number of frames returned so far.
+        done: True once the job's final frame has been returned.
+    """
+
+    def __init__(self, file_path: str, state: Optional[Dict[str, int]] = None):
+        """
+        Start following ``file_path``.
+
+        Args:
+            file_path: Path to the pw.x output.
+            state: A dictionary from ``state()`` to resume a previous session; it
+                is ignored if the file no longer matches it.
+
+        Raises:
+            ValueError: If the output is compressed (it cannot still be growing).
+        """
+        if is_compressed(file_path):
+            raise ValueError(f"Cannot follow compressed output {file_path}")
+        self.file_path = file_path
+        self.reset()
+        if state:
+            self._restore(state)
+
+    def reset(self):
+        """Forget all progress, e.g. because the output was truncated or replaced."""
+        self.offset = 0
+        self.count = 0
+        self.done = False
+        # header lines the next frame may still depend on, -1 if not seen yet
+        self.header = {"alat": -1, "natoms": -1, "cell": -1, "positions": -1}
+        self._stat = (-1, -1)
+
+    def state(self) -> Dict[str, int]:
+        """
+        Progress as a JSON-serializable dictionary.
+
+        Returns:
+            Dictionary accepted by the ``state`` argument of the constructor.
+        """
+        state = {"offset": self.offset, "count": self.count, "done": int(self.done)}
+        state.update(self.header)
+        state["fingerprint"] = _fingerprint(self.file_path, self.offset) if self.offset else 0
+        return state
+
+    def _restore(self, state: Dict[str, int]):
+        try:
+            size = os.stat(self.file_path).st_size
+        except OSError:
+            return
+        offset = int(state.get("offset", 0))
+        if offset > size or (offset and _fingerprint(self.file_path, offset) != state.get("fingerprint")):
+            return
+        self.offset = offset
+        self.count = int(state.get("count", 0))
+        self.done = bool(state.get("done", 0))
+        for key in self.header:
+            self.header[key] = int(state.get(key, -1))
+
+    def _scanner(self, fh) -> FrameScanner:
+        """A scanner positioned at ``offset`` with the header blocks in effect re-read."""
+        scanner = FrameScanner()
+        # alat and natoms first: the cell and positions blocks are scaled/sized with them
+        for key in ("alat", "natoms", "cell", "positions"):
+            if self.header[key] >= 0:
+                _feed(scanner, fh, self.header[key])
+        scanner.count = self.count
+        scanner.frame_start = self.offset
+        return scanner
+
+    def poll(self, final: bool = False) -> List[Frame]:
+        """
+        Parse whatever frames were completed since the last poll.
+
+        Args:
+            final: Treat the last complete line as the end of the job, so the
+                last frame is returned even without 'JOB DONE.' (for jobs that
+                were killed; never for jobs that may still be writing).
+
+        Returns:
+            List of new frames, in file order; empty if nothing changed.
+        """
+        if self.done:
+            return []
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return []
+        if (stat.st_size, stat.st_mtime_ns) == self._stat and not final:
+            return []
+        if stat.st_size < self.offset:
+            self.reset()
+        self._stat = (stat.st_size, stat.st_mtime_ns)
+
+        with open(self.file_path, "rb") as fh:
+            scanner = self._scanner(fh)
+            # never hand a line to the scanner before its newline has been written,
+            # not even for a killed job: its last line may have been cut anywhere
+            end = _complete_end(fh, self.offset, stat.st_size)
+            # the new bytes are streamed line by line, never read into memory as a whole
+            fh.seek(self.offset)
+            source = _BoundedLines(fh, end)
+            lines = LineSource(source, self.offset)
+            frames = list(scanner.scan(lines))
+            if final or source.job_done:
+                frames.extend(scanner.finish(lines.offset))
+                self.done = True
+
+        if frames:
+            last = frames[-1].offsets
+            self.offset = last[_END]
+            self.count = scanner.count
+            self.header["cell"] = last[_CELL]
+            self.header["positions"] = last[_POSITIONS]
+            # lines after the last frame are scanned again next time, do not point past it
+            for key, offset in (("alat", scanner.alat_offset), ("natoms", scanner.natoms_offset)):
+                if 0 <= offset < self.offset:
+                    self.header[key] = offset
+        return frames
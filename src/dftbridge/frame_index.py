@@ -0,0 +1,306 @@
+"""
+Persistent byte-offset index for random access into pw.x outputs.
+
+The index records, for every ionic step, the byte offsets of the frame and
+of each of its blocks (see ``frames.OFFSET_FIELDS``). It is stored next to
+the output as ``<output>.idx``, a flat little-endian int64 array::
+
+    [MAGIC, VERSION, size, mtime_ns, fingerprint, alat_offset, natoms_offset,
+     nframes, nfields, frame 0 offsets..., frame 1 offsets..., ...]
+
+Compressed outputs cannot be seeked into cheaply, so they are not indexed;
+``read_frames`` streams them and skips the frames before ``start`` instead.
+
+The sidecar is reused while the output's size and mtime are unchanged,
+extended from the last complete frame when the output has grown (and the
+already indexed bytes still fingerprint the same), and rebuilt from scratch
+otherwise.
+"""
+
+import itertools
+import os
+import tempfile
+import zlib
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from .compression import is_compressed
+from .frames import OFFSET_FIELDS, Frame, FrameScanner, LineSource, iter_frames
+
+MAGIC = 0x5844494246544644  # b"DFTBFIDX" read as little-endian int64
+VERSION = 2
+_HEADER = 9
+_FINGERPRINT_HEAD = 4096
+_FINGERPRINT_TAIL = 256
+_NFIELDS = len(OFFSET_FIELDS)
+_START, _CELL, _POSITIONS, _ENERGY, _FORCES, _STRESS, _END = range(_NFIELDS)
+
+
+def _fingerprint(file_path: str, size: int) -> int:
+    """CRC of the first and last few bytes of the first ``size`` bytes of a file."""
+    with open(file_path, "rb") as fh:
+        head = fh.read(min(size, _FINGERPRINT_HEAD))
+        fh.seek(max(0, size - _FINGERPRINT_TAIL))
+        tail = fh.read(min(size, _FINGERPRINT_TAIL))
+    return zlib.crc32(tail, zlib.crc32(head))
+
+
+def _feed(scanner: FrameScanner, fh, offset: int):
+    """Seek to a header line and let the scanner read that one block."""
+    fh.seek(offset)
+    lines = LineSource(fh, offset)
+    for item in lines:
+        for _ in scanner.dispatch(item[0], item[1], lines):
+            pass
+        break
+
+
+class FrameIndex:
+    """
+    Byte offsets of every ionic step in a pw.x output.
+
+    Use ``FrameIndex.open(path)`` to load the sidecar, extending or rebuilding
+    it as needed, then read any frame with ``read_frame`` / ``read_frames``
+    without touching the rest of the file.
+    """
+
+    def __init__(self, file_path: str, index_path: Optional[str] = None):
+        """
+        Create an empty index for ``file_path``.
+
+        Args:
+            file_path: Path to the pw.x output.
+            index_path: Where the sidecar lives; defaults to ``<file_path>.idx``.
+        """
+        self.file_path = file_path
+        self.index_path = index_path or file_path + ".idx"
+        self.size = 0
+        self.mtime_ns = 0
+        self.fingerprint = 0
+        self.alat_offset = -1
+        self.natoms_offset = -1
+        self.offsets = np.zeros((0, _NFIELDS), dtype=np.int64)
+
+    @classmethod
+    def open(cls, file_path: str, index_path: Optional[str] = None,
+             save: bool = True) -> "FrameIndex":
+        """
+        Load the index of ``file_path``, bringing it up to date with the file.
+
+        Args:
+            file_path: Path to the pw.x output.
+            index_path: Sidecar location; defaults to ``<file_path>.idx``.
+            save: Write the sidecar back if it had to be built or extended; if
+                that fails the returned index is still usable.
+
+        Returns:
+            FrameIndex: An index that matches the current file.
+
+        Raises:
+            ValueError: If the output is compressed.
+        """
+        if is_compressed(file_path):
+            raise ValueError(f"Cannot index compressed output {file_path}, stream it instead")
+        index = cls(file_path, index_path)
+        stat = os.stat(file_path)
+        loaded = index._load()
+
+        if loaded and index.size == stat.st_size and index.mtime_ns == stat.st_mtime_ns:
+            return index
+
+        if (loaded and index.size < stat.st_size
+                and index.fingerprint == _fingerprint(file_path, index.size)):
+            index.extend()
+        else:
+            index.build()
+        if save:
+            index.save()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _load(self) -> bool:
+        """Read the sidecar; returns False if it is missing or unreadable."""
+        try:
+            raw = np.fromfile(self.index_path, dtype="<i8")
+        except (OSError, ValueError):
+            return False
+        if len(raw) < _HEADER or raw[0] != MAGIC or raw[1] != VERSION:
+            return False
+        nframes, nfields = int(raw[7]), int(raw[8])
+        if nfields != _NFIELDS or len(raw) != _HEADER + nframes * nfields:
+            return False
+        self.size, self.mtime_ns, self.fingerprint = int(raw[2]), int(raw[3]), int(raw[4])
+        self.alat_offset, self.natoms_offset = int(raw[5]), int(raw[6])
+        self.offsets = raw[_HEADER:].reshape(nframes, nfields).astype(np.int64)
+        return True
+
+    def save(self) -> bool:
+        """
+        Write the sidecar next to the output.
+
+        Returns:
+            True if it was written; False if it could not be (e.g. a read-only
+            archive directory), in which case the index just stays in memory.
+        """
+        header = np.array([MAGIC, VERSION, self.size, self.mtime_ns, self.fingerprint,
+                           self.alat_offset, self.natoms_offset, len(self.offsets), _NFIELDS],
+                          dtype="<i8")
+        # a temp file of its own, so processes indexing the same output do not collide
+        directory, name = os.path.split(self.index_path)
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory or ".")
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(header.tobytes())
+                fh.write(self.offsets.astype("<i8").tobytes())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def build(self):
+        """Index the whole output from the start."""
+        self.offsets = np.zeros((0, _NFIELDS), dtype=np.int64)
+        self.alat_offset = -1
+        self.natoms_offset = -1
+        self._scan(FrameScanner(parse=False), 0)
+
+    def extend(self):
+        """
+        Index only what was appended since the last build.
+
+        Frames that were closed by the end of the file may have been
+        incomplete at the time, so they are dropped and rescanned.
+        """
+        complete = self.offsets[self.offsets[:, _END] < self.size]
+        if len(complete) == 0:
+            self.build()
+            return
+
+        # resume right where the last complete frame ended, with its blocks still in effect
+        scanner = FrameScanner(parse=False)
+        last = complete[-1]
+        scanner.count = len(complete)
+        scanner.cell_offset = int(last[_CELL])
+        scanner.positions_offset = int(last[_POSITIONS])
+        scanner.alat_offset = self.alat_offset
+        scanner.natoms_offset = self.natoms_offset
+        scanner.frame_start = int(last[_END])
+        with open(self.file_path, "rb") as fh:
+            self._restore_header(scanner, fh)
+        self.offsets = complete
+        self._scan(scanner, int(last[_END]))
+
+    def _restore_header(self, scanner: FrameScanner, fh):
+        """Re-read the alat and natoms lines a resumed scan depends on."""
+        for offset in (self.alat_offset, self.natoms_offset):
+            if offset >= 0:
+                _feed(scanner, fh, offset)
+
+    def _scan(self, scanner: FrameScanner, start: int):
+        stat = os.stat(self.file_path)
+        rows: List[tuple] = []
+        with open(self.file_path, "rb") as fh:
+            fh.seek(start)
+            lines = LineSource(fh, start)
+            for frame in scanner.scan(lines):
+                rows.append(frame.offsets)
+            for frame in scanner.finish(lines.offset):
+                rows.append(frame.offsets)
+            size = lines.offset
+        if rows:
+            self.offsets = np.vstack([self.offsets, np.array(rows, dtype=np.int64)])
+        self.alat_offset = scanner.alat_offset
+        self.natoms_offset = scanner.natoms_offset
+        self.size = size
+        self.mtime_ns = stat.st_mtime_ns
+        self.fingerprint = _fingerprint(self.file_path, size)
+
+    def frame_offsets(self, k: int) -> dict:
+        """
+        Byte offsets of frame ``k``.
+
+        Args:
+            k: Frame number, negative values count from the end.
+
+        Returns:
+            Dictionary keyed by OFFSET_FIELDS.
+        """
+        return dict(zip(OFFSET_FIELDS, (int(v) for v in self.offsets[k])))
+
+    def read_frame(self, k: int) -> Frame:
+        """
+        Parse frame ``k`` by seeking straight to its blocks.
+
+        Args:
+            k: Frame number, negative values count from the end.
+
+        Returns:
+            Frame: The parsed frame.
+
+        Raises:
+            IndexError: If there is no frame ``k``.
+        """
+        for frame in self.read_frames(k, k + 1 if k != -1 else None):
+            return frame
+        raise IndexError(f"frame {k} out of range")
+
+    def read_frames(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Frame]:
+        """
+        Parse frames ``start`` to ``stop`` (exclusive), touching only their blocks.
+
+        Args:
+            start: First frame to read.
+            stop: One past the last frame to read; defaults to the last frame.
+
+        Yields:
+            Frame: Each requested frame, in order.
+        """
+        scanner = FrameScanner()
+        with open(self.file_path, "rb") as fh:
+            self._restore_header(scanner, fh)
+            for k in range(len(self.offsets))[start:stop]:
+                row = self.offsets[k]
+                for field in (_CELL, _POSITIONS, _ENERGY, _FORCES, _STRESS):
+                    offset = int(row[field])
+                    if offset >= 0:
+                        _feed(scanner, fh, offset)
+                scanner.count = k
+                scanner.frame_start = int(row[_START])
+                # a step whose positions block was cut is indexed but never emitted
+                yield from scanner.finish(int(row[_END]))
+
+
+def read_frames(file_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Frame]:
+    """
+    Frames ``start`` to ``stop`` of an output, through the index when possible.
+
+    Plain outputs seek straight to the frames via ``FrameIndex``. Compressed
+    outputs are streamed and the frames outside the range are skipped (with
+    negative bounds the frames are counted in a first pass).
+
+    Args:
+        file_path: Path to the pw.x output.
+        start: First frame to read, negative values count from the end.
+        stop: One past the last frame to read; defaults to the last frame.
+
+    Yields:
+        Frame: Each requested frame, in order.
+    """
+    if not is_compressed(file_path):
+        yield from FrameIndex.open(file_path).read_frames(start, stop)
+        return
+    if start < 0 or (stop is not None and stop < 0):
+        frames = range(sum(1 for _ in iter_frames(file_path)))[start:stop]
+        start, stop = frames.start, frames.stop
+    yield from itertools.islice(iter_frames(file_path), start, stop)
@@ -0,0 +1,381 @@
+"""
+Streaming per-ionic-step reader for pw.x outputs.
+
+``iter_frames`` walks the output once and yields one ``Frame`` per
+converged ionic step (scf, relax, vc-relax and md runs alike), so only the
+current frame is ever held in memory. Lines are checked as raw bytes and
+only the blocks that get parsed are decoded.
+"""
+
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from . import stats
+from .blocks import (AXIS_FIELDS, CARD_FIELDS, CELL_FIELDS, FORCE_FIELDS, SITE_FIELDS,
+                     STRESS_FIELDS, TAU_FIELDS, parse_symbol_column, parse_vector_block,
+                     position_card_rows, tokenize_block)
+from .compression import open_binary
+from .units import bohr2ang, kbar2bar, ry2ev, ryau2evang
+
+
+# Byte offsets recorded for every frame, in this order. 'cell' and
+# 'positions' point at the header line of the block in effect for the frame
+# (which may lie before 'start' when it was printed once in the run header);
+# 'forces' and 'stress' are -1 when the step printed none. The frame's own text is [start, end).
+OFFSET_FIELDS = ("start", "cell", "positions", "energy", "forces", "stress", "end")
+
+
+class Frame:
+    """
+    One ionic step, in LAMMPS metal units (eV, Angstrom, eV/Angstrom, bar).
+
+    Attributes:
+        index: Position of the frame in its output file, starting at 0.
+        energy: Total energy in eV.
+        cell: (3, 3) cell matrix, one lattice vector per row.
+        species: Element symbol of every atom.
+        positions: (N, 3) Cartesian positions.
+        forces: (N, 3) forces, or None if the step printed none.
+        offsets: Byte offsets of the frame's blocks, see OFFSET_FIELDS.
+        stress: (3, 3) stress tensor, or None if the step printed none.
+        pressure: Pressure (P= of the stress block), or None.
+    """
+
+    __slots__ = ("index", "energy", "cell", "species", "positions", "forces", "offsets",
+                 "stress", "pressure")
+
+    def __init__(self, index: int, energy: float, cell: np.ndarray, species: List[str],
+                 positions: np.ndarray, forces: Optional[np.ndarray] = None,
+                 offsets: Optional[Tuple[int, ...]] = None, stress: Optional[np.ndarray] = None,
+                 pressure: Optional[float] = None):
+        self.index = index
+        self.energy = energy
+        self.cell = cell
+        self.species = species
+        self.positions = positions
+        self.forces = forces
+        self.offsets = offsets
+        self.stress = stress
+        self.pressure = pressure
+
+    @property
+    def natoms(self) -> int:
+        """Number of atoms in the frame."""
+        return len(self.species)
+
+    def __repr__(self) -> str:
+        return f"Frame(index={self.index}, natoms={self.natoms}, energy={self.energy})"
+
+
+class LineSource:
+    """
+    Line iterator over a binary file that tracks byte offsets.
+
+    Yields ``(offset, line)`` pairs and allows one line of push-back so block
+    readers can stop at a line that belongs to the next block.
+    """
+
+    def __init__(self, fh: BinaryIO, offset: int = 0):
+        self.fh = fh
+        self.offset = offset
+        self.lines = 0
+        self._held: Optional[Tuple[int, bytes]] = None
+
+    def __iter__(self) -> "LineSource":
+        return self
+
+    def __next__(self) -> Tuple[int, bytes]:
+        if self._held is not None:
+            item, self._held = self._held, None
+            return item
+        line = self.fh.readline()
+        if not line:
+            raise StopIteration
+        start = self.offset
+        self.offset += len(line)
+        self.lines += 1
+        return start, line
+
+    def push(self, item: Tuple[int, bytes]):
+        """Hand a line back so the next read returns it again."""
+        self._held = item
+
+
+def _units(header: bytes) -> str:
+    """Unit keyword of a card header such as 'ATOMIC_POSITIONS (angstrom)'."""
+    lowered = header.lower()
+    for unit in (b"crystal", b"bohr", b"angstrom"):
+        if unit in lowered:
+            return unit.decode()
+    return "alat"
+
+
+class FrameScanner:
+    """
+    State machine that turns the lines of a pw.x output into frames.
+
+    A frame is complete once its '!    total energy' line has been seen and
+    the next geometry (ATOMIC_POSITIONS, CELL_PARAMETERS or a new 'site n.'
+    table) starts, or the output ends. Geometry printed after the last energy
+    (e.g. relax 'final coordinates') therefore never becomes a frame of its own.
+
+    With ``parse=False`` the numeric blocks are skipped rather than converted
+    and the yielded frames only carry their energy and byte offsets, which is
+    all the offset index needs.
+    """
+
+    def __init__(self, parse: bool = True):
+        self.parse = parse
+        self.alat: Optional[float] = None
+        self.natoms: Optional[int] = None
+        self.cell: Optional[np.ndarray] = None
+        self.species: List[str] = []
+        self.positions: Optional[np.ndarray] = None
+        self.energy: Optional[float] = None
+        self.forces: Optional[np.ndarray] = None
+        self.stress: Optional[np.ndarray] = None
+        self.pressure: Optional[float] = None
+        self.count = 0
+        # byte offsets of the header lines currently in effect
+        self.alat_offset = -1
+        self.natoms_offset = -1
+        self.cell_offset = -1
+        self.positions_offset = -1
+        self.energy_offset = -1
+        self.forces_offset = -1
+        self.stress_offset = -1
+        self.frame_start = 0
+
+    def scan(self, lines: LineSource) -> Iterator[Frame]:
+        """
+        Consume ``lines`` and yield every frame completed along the way.
+
+        Args:
+            lines: Source of ``(offset, line)`` pairs.
+
+        Yields:
+            Frame: Each completed ionic step.
+        """
+        for offset, line in lines:
+            yield from self.dispatch(offset, line, lines)
+
+    def dispatch(self, offset: int, line: bytes, lines: LineSource) -> Iterator[Frame]:
+        """
+        Handle one line, reading the block that follows it from ``lines`` if it is a header.
+
+        Args:
+            offset: Byte offset of ``line``.
+            line: The raw line.
+            lines: Source the rest of a block is read from.
+
+        Yields:
+            Frame: The previous frame, if this line closes it.
+        """
+        text = line.lstrip()
+        first = text[:1]
+        if not first:
+            return
+        if first == b"!":
+            if text.startswith(b"!    total energy"):
+                self.energy = float(text.split(b"=")[1].split()[0]) * ry2ev
+                self.energy_offset = offset
+        elif first == b"A":
+            if text.startswith(b"ATOMIC_POSITIONS"):
+                yield from self._emit(offset)
+                self.positions_offset = offset
+                self._read_positions_card(text, lines)
+        elif first == b"C":
+            if text.startswith(b"CELL_PARAMETERS"):
+                yield from self._emit(offset)
+                self.cell_offset = offset
+                self._read_cell_card(text, lines)
+        elif first == b"F":
+            if text.startswith(b"Forces acting on atoms"):
+                self.forces_offset = offset
+                self._read_forces(lines)
+        elif first == b"c":
+            if text.startswith(b"crystal axes:"):
+                self.cell_offset = offset
+                self._read_crystal_axes(lines)
+        elif first == b"l":
+            if text.startswith(b"lattice parameter (alat)"):
+                self.alat = float(text.split(b"=")[1].split()[0])
+                self.alat_offset = offset
+        elif first == b"n":
+            if text.startswith(b"number of atoms/cell"):
+                self.natoms = int(text.split(b"=")[1].split()[0])
+                self.natoms_offset = offset
+        elif first == b"s":
+            if text.startswith(b"site n."):
+                yield from self._emit(offset)
+                self.positions_offset = offset
+                self._read_sites(text, lines)
+        elif first == b"t":
+            # 'total   stress  (Ry/bohr**3)  (kbar)  P= ...'
+            if text.startswith(b"total") and b"stress" in text[:16]:
+                self.stress_offset = offset
+                self._read_stress(text, lines)
+
+    def finish(self, end: int) -> Iterator[Frame]:
+        """
+        Yield the last frame once the output has ended.
+
+        Args:
+            end: Byte offset of the end of the output.
+        """
+        yield from self._emit(end)
+
+    def _emit(self, end: int) -> Iterator[Frame]:
+        if self.energy is None or self.positions_offset < 0:
+            return
+        offsets = (self.frame_start, self.cell_offset, self.positions_offset,
+                   self.energy_offset, self.forces_offset, self.stress_offset, end)
+        frame = Frame(self.count, self.energy, self.cell, self.species,
+                      self.positions, self.forces, offsets, self.stress, self.pressure)
+        # a step whose positions were cut keeps its number but is not emitted
+        complete = not self.parse or self.positions is not None
+        self.count += 1
+        self.energy = None
+        self.forces = None
+        self.stress = None
+        self.pressure = None
+        self.forces_offset = -1
+        self.stress_offset = -1
+        self.frame_start = end
+        if complete:
+            yield frame
+
+    def _alat_scale(self) -> float:
+        if self.alat is None:
+            raise RuntimeError("Positions in alat units found before 'lattice parameter (alat)'")
+        return self.alat * bohr2ang
+
+    def _take(self, lines: LineSource, count: Optional[int], marker: Optional[bytes] = None) -> str:
+        """
+        Read the block that follows a header and decode it in one go.
+
+        Leading blank lines are skipped. The block ends after ``count`` lines,
+        at a blank line, or at the first line not containing ``marker``. A
+        sized block also ends at a line without its newline, which only the
+        cut end of a killed job's output can have.
+        """
+        block: List[bytes] = []
+        for item in lines:
+            line = item[1]
+            if not line.strip():
+                if block:
+                    break
+                continue
+            if marker is not None and marker not in line:
+                lines.push(item)
+                break
+            if count is not None and not line.endswith(b"\n"):
+                break
+            block.append(line)
+            if count is not None and len(block) == count:
+                break
+        if not self.parse:
+            return ""
+        return b"".join(block).decode(errors="replace")
+
+    def _complete(self, block: str) -> bool:
+        """False if a block read with ``natoms`` as its size came up short."""
+        return self.natoms is None or block.count("\n") == self.natoms
+
+    def _to_cartesian(self, coords: np.ndarray, units: str) -> np.ndarray:
+        if units == "crystal":
+            return coords @ self.cell
+        if units == "bohr":
+            coords *= bohr2ang
+        elif units == "alat":
+            coords *= self._alat_scale()
+        return coords
+
+    def _read_positions_card(self, header: bytes, lines: LineSource):
+        block = self._take(lines, self.natoms)
+        if not block:
+            return
+        if not self._complete(block):
+            # a cut block; the step it belongs to is dropped rather than emitted with it
+            self.positions = None
+            return
+        if block.split(None, 1)[0].isdigit():
+            # '1  Si1  tau( x y z )' style, values are the last three fields
+            table = tokenize_block(block, TAU_FIELDS)
+            self.species = parse_symbol_column(table, 1)
+            coords = parse_vector_block(table)
+        else:
+            # 'Si  x  y  z  [if_pos]' style input card; only some rows may carry the
+            # if_pos flags, so every row is cut to the symbol and the three values
+            table = tokenize_block(position_card_rows(block.splitlines()), CARD_FIELDS)
+            self.species = parse_symbol_column(table, 0)
+            coords = parse_vector_block(table, first_col=1)
+        self.positions = self._to_cartesian(coords, _units(header))
+
+    def _read_sites(self, header: bytes, lines: LineSource):
+        block = self._take(lines, None)
+        if not block:
+            return
+        table = tokenize_block(block, SITE_FIELDS)
+        self.species = parse_symbol_column(table, 1)
+        coords = parse_vector_block(table)
+        units = "crystal" if b"cryst" in header else "alat"
+        self.positions = self._to_cartesian(coords, units)
+
+    def _read_crystal_axes(self, lines: LineSource):
+        block = self._take(lines, 3)
+        if block:
+            self.cell = parse_vector_block(block, scale=self._alat_scale(), width=AXIS_FIELDS)
+
+    def _read_cell_card(self, header: bytes, lines: LineSource):
+        block = self._take(lines, 3)
+        if not block:
+            return
+        units = _units(header)
+        if units == "bohr":
+            scale = bohr2ang
+        elif units == "angstrom":
+            scale = 1.0
+        elif b"=" in header:
+            # 'CELL_PARAMETERS (alat= 10.20000000)' carries its own alat
+            scale = float(header.split(b"=")[1].split(b")")[0]) * bohr2ang
+        else:
+            scale = self._alat_scale()
+        self.cell = parse_vector_block(block, scale=scale, width=CELL_FIELDS)
+
+    def _read_forces(self, lines: LineSource):
+        block = self._take(lines, self.natoms, marker=b"force =")
+        if block and self._complete(block):
+            self.forces = parse_vector_block(block, scale=ryau2evang, width=FORCE_FIELDS)
+
+    def _read_stress(self, header: bytes, lines: LineSource):
+        block = self._take(lines, 3)
+        if not block:
+            return
+        # the last three columns are the kbar copy of the Ry/bohr**3 tensor
+        self.stress = parse_vector_block(block, scale=kbar2bar, width=STRESS_FIELDS)
+        if b"P=" in header:
+            self.pressure = float(header.split(b"P=")[1].split()[0]) * kbar2bar
+
+
+def iter_frames(source: Union[str, BinaryIO]) -> Iterator[Frame]:
+    """
+    Stream the ionic steps of a pw.x output one frame at a time.
+
+    Args:
+        source: Path to the output (plain or compressed, see ``compression``),
+            or a file object opened in binary mode.
+
+    Yields:
+        Frame: One frame per converged ionic step, in file order.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        with open_binary(source) as fh:
+            yield from iter_frames(fh)
+        return
+    scanner = FrameScanner()
+    lines = LineSource(source)
+    yield from scanner.scan(lines)
+    yield from scanner.finish(lines.offset)
+    stats.count("scan", bytes=lines.offset, lines=lines.lines, frames=scanner.count)
@@ -1,126 +1,222 @@
 ###### note - not sure if this correctly works, numbers are close but slightly off #########
+import argparse
+import json
 import numpy as np
 import os
 import sys
-
-bohr2ang = 0.529177249
-ry2ev = 13.6056980659
-rad2deg = 57.295779513
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import stats
+from .blocks import (AXIS_FIELDS, FORCE_FIELDS, SITE_FIELDS, parse_symbol_column,
+                     parse_vector_block, tokenize_block)
+from .compression import has_suffix, is_compressed, open_text, count_occurrences
+from .cache import cached_trajectory, load_trajectory
+from .discovery import discover
+from .cell import reduce_cells, wrap_positions
+from .dedup import HashIndex, frame_hashes
+from .frame_index import read_frames
+from .follow import Follower
+from .frames import iter_frames
+from .pipeline import prefetch, run_pipeline
+from .qeio import ANCHORS, MappedOutput
+from .species import SpeciesRegistry, assign_types
+from .trajectory import Trajectory
+from .units import bohr2ang, ry2ev, ryau2evang
+from .shards import ShardedDump, parse_size
+from .writer import COLUMNS, DEFAULT_COLUMNS, FORCE_COLUMNS, DumpWriter, rewrite_nsims
 
 
 class QExpresso:
-    def __init__(self, inFile):
+    def __init__(self, inFile, registry=None):
         self.inFile = inFile
+        # shared SpeciesRegistry; without one, types are numbered over this file's symbols
+        self.registry = registry
 
     def read(self):
-        fileHandler = open(self.inFile, "r")
-        self.lines = fileHandler.readlines()
-        fileHandler.close()
-
-        self.readLattice()
-        self.readCellMat()
-        self.readCoord()
-        self.readEnergy()
-        #self.readMagMoment()
+        with stats.stage("read") as stage:
+            if is_compressed(self.inFile):
+                self.readStream()
+                stage.add(frames=1)
+                return
+            # memory-map the output; each reader below only decodes the lines it needs
+            self.mapped = MappedOutput(self.inFile)
+            try:
+                self.readLattice()
+                self.readCellMat()
+                self.readCoord()
+                self.readForces()
+                self.readEnergy()
+                #self.readMagMoment()
+                stage.add(bytes=self.mapped.size, frames=1)
+            finally:
+                self.mapped.close()
+                self.mapped = None
 
     def readLattice(self):
 
-        for line in self.lines:
-
-            if "lattice parameter (alat)  =" in line:
-                self.latParam = float(line.split("=")[1].split()[0])
+        offset = self.mapped.rfind(b"lattice parameter (alat)  =")
+        if offset != -1:
+            line = self.mapped.line_at(offset)
+            self.latParam = float(line.split("=")[1].split()[0])
 
     def readCellMat(self):
 
-        self.cellMat = np.zeros((3, 3), dtype=np.double)
+        offset = self.mapped.rfind(b"crystal axes: (cart. coord. in units of alat)")
+        if offset == -1:
+            raise RuntimeError("Parsing failed during cell matrix read")
 
-        for lineID, line in enumerate(self.lines):
-            if "crystal axes: (cart. coord. in units of alat)" in line:
-                line1 = self.lines[lineID + 1]
-                line2 = self.lines[lineID + 2]
-                line3 = self.lines[lineID + 3]
-
-        rowID = 0
-        for line in [line1, line2, line3]:
-            ll = line.split("=")[1].replace("(", "").replace(")", "").split()
-            vec = [float(Str) for Str in ll]
-            self.cellMat[rowID, :] = vec
-            rowID += 1
-
-        self.cellMat *= self.latParam
-        self.cellMat *= bohr2ang
+        self.cellMat = parse_vector_block(
+            self.mapped.lines_after(offset, 3), scale=self.latParam * bohr2ang, width=AXIS_FIELDS
+        )
         # print(self.cellMat)
 
     def readCoord(self):
 
-        sIDx = None
-        for lineID, line in enumerate(self.lines):
-            # if "site n.     atom                  positions (cryst. coord.)" in line:
-            #     sIDx = lineID + 1
-            #     self.crystal = True
-            # else:
-            self.crystal = False
-
-            if self.crystal == False:
-                if "site n.     atom                  positions (alat units)" in line:
-                    sIDx = lineID+1
-
-            if sIDx and not line.strip():
-                eIDx = lineID
-                break
-
-        self.nAtoms = eIDx - sIDx
-
-        self.crystalCoords = np.zeros((self.nAtoms, 3), dtype=np.double)
-        self.symbols = []
+        # if "site n.     atom                  positions (cryst. coord.)" in line:
+        #     self.crystal = True
+        # else:
+        self.crystal = False
 
-        iatom = 0
-        for line in self.lines[sIDx:eIDx]:
+        offset = self.mapped.find(b"site n.     atom                  positions (alat units)")
+        if offset == -1:
+            raise RuntimeError("Parsing failed during coordinate read")
+        self.parseCoord(self.mapped.block_after(offset))
 
-            ll = line.split("=")[1].replace("(", "").replace(")", "").split()
-            xi, yi, zi = [float(Str) for Str in ll]
+    def readForces(self):
 
-            if self.crystal == True:
+        # the first force block belongs to the site n. geometry read by readCoord;
+        # the whole (N,3) block is converted and scaled Ry/Bohr -> eV/Angstrom in one call
+        self.forces = None
+        offset = self.mapped.find(ANCHORS['forces'])
+        if offset != -1:
+            self.parseForces(self.mapped.block_after(offset, skip_blank=True))
 
-                self.crystalCoords[iatom, 0] = xi
-                self.crystalCoords[iatom, 1] = yi
-                self.crystalCoords[iatom, 2] = zi
+    def parseForces(self, block):
 
-            if self.crystal == False:
-                self.crystalCoords[iatom, 0] = xi
-                self.crystalCoords[iatom, 0] *= (bohr2ang * self.latParam)
-                self.crystalCoords[iatom, 1] = yi
-                self.crystalCoords[iatom, 1] *= (bohr2ang * self.latParam)
-                self.crystalCoords[iatom, 2] = zi
-                self.crystalCoords[iatom, 2] *= (bohr2ang * self.latParam)
+        # QE may print the non-local contribution right below the total forces, keep the first N rows
+        block = [line for line in block[:self.nAtoms] if "force =" in line]
+        if len(block) == self.nAtoms:
+            self.forces = parse_vector_block(block, scale=ryau2evang, width=FORCE_FIELDS)
 
-            # get symbols
-            isymbol = line.split()[1]
-            for digit in range(10):
-                digit = str(digit)
-                isymbol = isymbol.replace(digit, "")
-            self.symbols.append(isymbol)
+    def parseCoord(self, block):
 
-            iatom += 1
+        self.nAtoms = len(block)
 
-        # type assiging
-        unique_symbols = list(set(self.symbols))
-        unique_symbols.sort()
-
-        self.types = []
-
-        for symbol in self.symbols:
-
-            typeID = unique_symbols.index(symbol) + 1
-            self.types.append(typeID)
+        # the whole block goes through one tokenize/convert, no per-atom loop
+        table = tokenize_block(block, SITE_FIELDS)
+        if self.crystal == True:
+            self.crystalCoords = parse_vector_block(table)
+        else:
+            self.crystalCoords = parse_vector_block(table, scale=bohr2ang * self.latParam)
+
+        # get symbols
+        self.symbols = parse_symbol_column(table, 1)
+
+        self.assignTypes()
+
+    def readStream(self):
+
+        # compressed outputs cannot be mapped: pick up the same lines as readLattice,
+        # readCellMat, readCoord and readEnergy in one streaming pass, keeping only those
+        latLine = cellBlock = coordBlock = forceBlock = enrLine = None
+        with open_text(self.inFile) as fh:
+            for line in fh:
+                if "lattice parameter (alat)  =" in line:
+                    latLine = line
+                elif "crystal axes: (cart. coord. in units of alat)" in line:
+                    cellBlock = [next(fh, "") for _ in range(3)]
+                elif coordBlock is None and "site n.     atom                  positions (alat units)" in line:
+                    coordBlock = []
+                    for line in fh:
+                        if not line.strip():
+                            break
+                        coordBlock.append(line)
+                elif forceBlock is None and "Forces acting on atoms" in line:
+                    forceBlock = []
+                    for line in fh:
+                        if "force =" in line:
+                            forceBlock.append(line)
+                        elif line.strip() or forceBlock:
+                            break
+                elif "!    total energy" in line:
+                    enrLine = line
+
+        if latLine is not None:
+            self.latParam = float(latLine.split("=")[1].split()[0])
+        if cellBlock is None:
+            raise RuntimeError("Parsing failed during cell matrix read")
+        self.cellMat = parse_vector_block(cellBlock, scale=self.latParam * bohr2ang, width=AXIS_FIELDS)
+        self.crystal = False
+        if coordBlock is None:
+            raise RuntimeError("Parsing failed during coordinate read")
+        self.parseCoord(coordBlock)
+        self.forces = None
+        if forceBlock is not None:
+            self.parseForces(forceBlock)
+        if enrLine is not None:
+            self.totEnr = float(enrLine.split("=")[1].split()[0]) * ry2ev
+
+    def assignTypes(self):
+
+        # type assigning, one np.unique over the whole atom list
+        if self.registry is not None:
+            self.types = self.registry.types(self.symbols).tolist()
+        else:
+            self.types = assign_types(self.symbols)[1].tolist()
+
+    def loadFrame(self, frame):
+
+        # take geometry and energy from a streamed frame (frames.Frame) instead of read()
+        self.crystal = False
+        self.cellMat = frame.cell
+        self.crystalCoords = frame.positions
+        self.nAtoms = frame.natoms
+        self.symbols = frame.species
+        self.totEnr = frame.energy
+        self.forces = frame.forces
+        self.assignTypes()
+
+    def iterFrames(self, start=None, stop=None):
+
+        # one ionic step at a time, memory stays bounded by a single frame;
+        # a frame range seeks through the <inFile>.idx offset sidecar instead,
+        # and an already cached trajectory is read from its memory maps
+        cached = load_trajectory(self.inFile)
+        if cached is not None:
+            frames = cached[start:stop]
+        elif start is None and stop is None:
+            frames = iter_frames(self.inFile)
+        else:
+            frames = read_frames(self.inFile, start or 0, stop)
+        for frame in frames:
+            self.loadFrame(frame)
+            yield self
+
+    def readTrajectory(self, start=None, stop=None):
+
+        # every ionic step stacked into one columnar Trajectory (cheap to pickle between processes);
+        # parsed once, later runs memory-map it from the on-disk cache (see cache.py)
+        with stats.stage("read") as stage:
+            if start is None and stop is None:
+                traj = cached_trajectory(self.inFile,
+                                         lambda: Trajectory.from_frames(iter_frames(self.inFile)))
+            else:
+                cached = load_trajectory(self.inFile)
+                if cached is not None:
+                    traj = cached[start:stop]
+                else:
+                    traj = Trajectory.from_frames(read_frames(self.inFile, start or 0, stop))
+            stage.add(frames=len(traj))
+        return traj
 
     def readEnergy(self):
 
-        for line in self.lines:
-
-            if "!    total energy" in line:
-                self.totEnr = float(line.split("=")[1].split()[0])
-                self.totEnr *= ry2ev
+        offset = self.mapped.rfind(b"!    total energy")
+        if offset != -1:
+            line = self.mapped.line_at(offset)
+            self.totEnr = float(line.split("=")[1].split()[0])
+            self.totEnr *= ry2ev
 
 #     def readMagMoment(self):
 # 
@@ -148,80 +244,43 @@ class QExpresso:
 # 
 #             self.magMoment.append(m)
 
-    def fixCellMat(self):
-
-        a = self.cellMat[0, :]
-        b = self.cellMat[1, :]
-        c = self.cellMat[2, :]
-        
-        la = np.linalg.norm(a)
-        lb = np.linalg.norm(b)
-        lc = np.linalg.norm(c)
-        alpha = self.vec2angle(b, c)
-        beta = self.vec2angle(a, c)
-        gamma = self.vec2angle(a, b)
-        
-        self.la = la
-        self.lb = lb
-        self.lc = lc
-        self.alpha = alpha
-        self.beta = beta
-        self.gamma = gamma
-
-        self.cellMat_fixed = np.zeros((3, 3), dtype=np.double)
-
-        self.cellMat_fixed[0, 0] = la
-        self.cellMat_fixed[0, 1] = 0.0
-        self.cellMat_fixed[0, 2] = 0.0
-
-        self.cellMat_fixed[1, 0] = lb * np.cos(gamma)
-        self.cellMat_fixed[1, 1] = lb * np.sin(gamma)
-        self.cellMat_fixed[1, 2] = 0.0
-
-        self.cellMat_fixed[2, 0] = lc * np.cos(beta)
-        self.cellMat_fixed[2, 1] = (
-            lc * (np.cos(alpha) - np.cos(beta) * np.cos(gamma)) / np.sin(gamma)
-        )
-        self.cellMat_fixed[2, 2] = (
-            lc
-            * np.sqrt(
-                1
-                + 2 * np.cos(alpha) * np.cos(beta) * np.cos(gamma)
-                - np.cos(alpha) ** 2
-                - np.cos(beta) ** 2
-                - np.cos(gamma) ** 2
-            )
-            / np.sin(gamma)
-        )
-        
-        # print('#########\n')
-        # print(self.cellMat_fixed)
-        # convert t ocart coordinates
+    def fixCellMat(self, wrap=False):
+
+        # LAMMPS restricted cell for this one frame, through the batched code in cell.py
+        # (writeTrajectory reduces every frame of a trajectory in a single call)
+        with stats.stage("cell") as stage:
+            self._reduceCell(wrap)
+            stage.add(frames=1)
+
+    def _reduceCell(self, wrap):
+
+        forces = getattr(self, "forces", None)
         if self.crystal == True:
-            self.cartCoords = np.matmul(self.crystalCoords, self.cellMat_fixed)
+            reduced = reduce_cells(self.cellMat, forces=None if forces is None else forces[None])
+            # crystal coordinates land in the restricted frame directly
+            self.cartCoords = np.matmul(self.crystalCoords, reduced.cells[0])
+            if wrap:
+                self.cartCoords = wrap_positions(reduced.cells, self.cartCoords[None])[0]
         else:
-            self.cartCoords = self.crystalCoords
-            # print(self.cartCoords)
-            # self.alat_mat = np.identity(3, dtype=np.double)
-            # self.alat_mat *= self.latParam
-            # self.alat_mat *= bohr2ang
-            # self.cartCoords = np.matmul(self.crystalCoords, self.alat_mat)
-        # get bounds
-        self.xy = self.cellMat_fixed[1, 0]
-        self.yz = self.cellMat_fixed[2, 1]
-        self.xz = self.cellMat_fixed[2, 0]
-        
+            # Cartesian coordinates are in the frame of cellMat and have to be rotated with it
+            reduced = reduce_cells(self.cellMat, self.crystalCoords[None],
+                                   None if forces is None else forces[None], wrap=wrap)
+            self.cartCoords = reduced.positions[0]
+        # forces keep their original frame in self.forces, rotated copies are written
+        self.cartForces = None if forces is None else reduced.forces[0]
+
+        self.cellMat_fixed = reduced.cells[0]
+        (self.xlo_bound, self.xhi_bound, self.ylo_bound, self.yhi_bound,
+         self.zlo_bound, self.zhi_bound, self.xy, self.xz, self.yz) = reduced.bounds[0].tolist()
+
         self.aa = self.cellMat_fixed[0, 0]
         self.bb = self.cellMat_fixed[1, 1]
         self.cc = self.cellMat_fixed[2, 2]
-
-        self.xlo_bound = 0.0+ min(0.0, self.xy, self.xz, self.xy + self.xz)
-        self.xhi_bound = self.aa + max(0.0, self.xy, self.xz, self.xy + self.xz)
-        self.ylo_bound = min(0.0, self.yz)
-        self.yhi_bound = self.bb + max(0.0, self.yz)
-        
-        self.zlo_bound = 0.0
-        self.zhi_bound = self.cc
+        self.la = self.aa
+        self.lb, self.lc = np.linalg.norm(self.cellMat_fixed[1:], axis=1)
+        self.alpha = self.vec2angle(self.cellMat[1], self.cellMat[2])
+        self.beta = self.vec2angle(self.cellMat[0], self.cellMat[2])
+        self.gamma = self.vec2angle(self.cellMat[0], self.cellMat[1])
 
     @staticmethod
     def vec2angle(vec1, vec2):
@@ -230,59 +289,466 @@ class QExpresso:
         angle = np.arccos(angle)
         return angle
 
-    def write(self, outFH, nFrames, iFrame):
-        outFH.write("ITEM: TIMESTEP energy, energy_weight, force_weight, nsims\n")
-
-        outFH.write("%-5d    %-.16f    1    1   %d\n" % (iFrame, self.totEnr, nFrames))
-        outFH.write("ITEM: NUMBER OF ATOMS\n")
-        outFH.write("%-10d\n" % self.nAtoms)
+    def boxBounds(self):
 
-        outFH.write("ITEM: BOX BOUNDS xy xz yz pp pp pp\n")
-        outFH.write(
-            "%22.16f  %22.16f  %22.16f\n" % (self.xlo_bound, self.xhi_bound, self.xy)
+        return (
+            self.xlo_bound, self.xhi_bound,
+            self.ylo_bound, self.yhi_bound,
+            self.zlo_bound, self.zhi_bound,
+            self.xy, self.xz, self.yz,
         )
-        outFH.write(
-            "%22.16f  %22.16f  %22.16f\n" % (self.ylo_bound, self.yhi_bound, self.xz)
-        )
-        outFH.write(
-            "%22.16f  %22.16f  %22.16f\n" % (self.zlo_bound, self.zhi_bound, self.yz)
+
+    def write(self, outFH, nFrames, iFrame, writer=None):
+
+        # the whole frame is formatted at once and written in one call;
+        # pass the same DumpWriter for every frame so its buffers get reused
+        if writer is None:
+            writer = DumpWriter(outFH, columns=DEFAULT_COLUMNS + FORCE_COLUMNS)
+        writer.write_frame(
+            iFrame,
+            nFrames,
+            self.totEnr,
+            self.boxBounds(),
+            self.types,
+            self.cartCoords,
+            getattr(self, "cartForces", None),
         )
 
-        outFH.write("ITEM: ATOMS id type x y z\n")
-        for i in range(self.nAtoms):
-
-            outFH.write(
-                "%-5d  %-5d  %22.16f %22.16f %22.16f\n"
-                % (
-                    i + 1,
-                    self.types[i],
-                    self.cartCoords[i, 0],
-                    self.cartCoords[i, 1],
-                    self.cartCoords[i, 2],
-                )
+    def writeTrajectory(self, outFH, traj, nFrames, firstFrame, writer=None, wrap=False):
+
+        # every cell, box and coordinate rotation of the trajectory in one batched call,
+        # then one formatted write per frame
+        if writer is None:
+            writer = DumpWriter(outFH, columns=DEFAULT_COLUMNS + FORCE_COLUMNS)
+        if len(traj) == 0:
+            return
+        with stats.stage("cell") as stage:
+            reduced = reduce_cells(traj.cells, traj.positions, traj.forces, wrap=wrap)
+            stage.add(frames=len(traj))
+        hasForces = ~np.isnan(traj.forces).all(axis=(1, 2))
+        types = traj.types
+        if self.registry is not None:
+            types = self.registry.remap(traj.type_names, traj.types)
+        for iFrame in range(len(traj)):
+            writer.write_frame(
+                firstFrame + iFrame,
+                nFrames,
+                float(traj.energies[iFrame]),
+                tuple(reduced.bounds[iFrame]),
+                types,
+                reduced.positions[iFrame],
+                reduced.forces[iFrame] if hasForces[iFrame] else None,
             )
 
 
-def main():
+def convertFile(inFile, trajectory=False, wrap=False):
 
-    outFile = sys.argv[1]
-    outFH = open(outFile, "w")
+    # parse one output; this is what the pool workers run. A single frame comes back
+    # as a LAMMPS-ready QExpresso, a trajectory as one columnar Trajectory
+    qe = QExpresso(inFile=inFile)
+    if not trajectory:
+        qe.read()
+        qe.fixCellMat(wrap)
+        return [qe]
+    return qe.readTrajectory()
 
-    files = []
-    for file in os.listdir("./"):
-        if file.endswith(".out"):
-            files.append(file)
 
-    files.sort()
-    nFiles = len(files)
-    
-    for iFile, file in enumerate(files):
-        qe = QExpresso(inFile=file)
-        qe.read()
-        qe.fixCellMat()
-        qe.write(outFH, nFiles, iFile + 1)
+def _convertTask(task):
+
+    # never raise inside a worker, a bad file must not abort the whole batch
+    inFile, trajectory, wrap = task
+    try:
+        return inFile, convertFile(inFile, trajectory, wrap), None
+    except Exception as err:
+        return inFile, None, "%s: %s" % (type(err).__name__, err)
+
+
+def _convertTaskWithStats(task):
+
+    # pool workers have no collector of their own, their stage totals travel back with the result
+    with stats.collect() as collector:
+        result = _convertTask(task)
+    return result, collector.to_dict()
+
+
+def convertBatch(files, jobs=1, trajectory=False, wrap=False):
+
+    # yields (file, frames, error) in the order of files, whatever order the workers finish in
+    tasks = [(inFile, trajectory, wrap) for inFile in files]
+    if jobs == 1:
+        for task in tasks:
+            yield _convertTask(task)
+        return
+
+    chunksize = max(1, len(tasks) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        if not stats.enabled():
+            for result in pool.map(_convertTask, tasks, chunksize=chunksize):
+                yield result
+            return
+        for result, workerStats in pool.map(_convertTaskWithStats, tasks, chunksize=chunksize):
+            stats.merge(workerStats)
+            yield result
+
+
+def _prefetchTask(task):
+
+    with stats.stage("prefetch") as stage:
+        stage.add(bytes=prefetch(task[0]))
+
+
+def pipelineBatch(files, jobs=1, trajectory=False, wrap=False, readers=4, depth=8):
+
+    # same results as convertBatch, but reader threads fetch the next files while the current
+    # ones are parsed (in a thread, or in `jobs` processes) and the caller writes them;
+    # at most `depth` files are in flight, so memory stays bounded on any batch size
+    tasks = [(inFile, trajectory, wrap) for inFile in files]
+    workerStats = jobs > 1 and stats.enabled()
+    parse = _convertTaskWithStats if workerStats else _convertTask
+    for result in run_pipeline(tasks, parse, _prefetchTask, jobs, readers, depth):
+        if workerStats:
+            result, collected = result
+            stats.merge(collected)
+        yield result
+
+
+def countFrames(inFile):
+
+    # frames a trajectory conversion of inFile will produce, without parsing it
+    try:
+        cached = load_trajectory(inFile)
+        if cached is not None:
+            return len(cached)
+        return count_occurrences(inFile, ANCHORS['energy'])
+    except OSError:
+        # the conversion reports the file, fixFrameCount corrects nsims afterwards
+        return 0
+
+
+def fixFrameCount(outFile, nFrames):
+
+    # rewrite the nsims field (last value after each ITEM: TIMESTEP header) of a finished dump
+    rewrite_nsims(outFile, nFrames)
+
+
+def followFiles(files, outFile, columns, precision, interval=5.0, statePath=None, wrap=False,
+                idle=None):
+
+    # tail-follow running jobs: append each newly completed ionic step to outFile.
+    # Progress is kept in <outFile>.follow so a restarted mash carries on where it stopped.
+    # A job whose output has not changed for idle seconds counts as killed: its last
+    # step is written without waiting for 'JOB DONE.'
+    statePath = statePath or outFile + ".follow"
+    # compressed outputs are finished archives, there is nothing to follow
+    for file in files:
+        if is_compressed(file):
+            sys.stderr.write("mash: not following compressed %s\n" % file)
+    files = [file for file in files if not is_compressed(file)]
+    state = {}
+    if os.path.exists(statePath) and os.path.exists(outFile):
+        with open(statePath) as fh:
+            state = json.load(fh)
+    followers = [Follower(file, state.get("files", {}).get(file)) for file in files]
+    iFrame = state.get("frames", 0)
+
+    outFH = open(outFile, "a" if state else "w")
+    writer = DumpWriter(outFH, columns=columns, precision=precision)
+    # one type table for every followed job, read from their headers up front
+    qe = QExpresso(inFile=None, registry=SpeciesRegistry.from_files(files))
+    try:
+        while True:
+            wrote = 0
+            for follower in followers:
+                final = idle is not None and isStale(follower.file_path, idle)
+                for frame in follower.poll(final=final):
+                    iFrame += 1
+                    writeFollowed(qe, frame, outFH, iFrame, writer, wrap)
+                    wrote += 1
+            if wrote:
+                saveFollowState(statePath, outFH, iFrame, followers)
+            if all(follower.done for follower in followers):
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        # a running job's step in progress may be half written: leave it for the next
+        # run, which carries on from the saved state; only killed jobs are finished
+        for follower in followers:
+            if not follower.done and idle is not None and isStale(follower.file_path, idle):
+                for frame in follower.poll(final=True):
+                    iFrame += 1
+                    writeFollowed(qe, frame, outFH, iFrame, writer, wrap)
+        saveFollowState(statePath, outFH, iFrame, followers)
+    finally:
+        outFH.close()
+    return 0
+
+
+def isStale(file, idle):
+
+    # True if file has not been modified for the last idle seconds
+    try:
+        return time.time() - os.stat(file).st_mtime > idle
+    except OSError:
+        return False
+
+
+def writeFollowed(qe, frame, outFH, iFrame, writer, wrap):
+
+    # the total is unknown while jobs run, nsims is the count written so far
+    qe.loadFrame(frame)
+    qe.fixCellMat(wrap)
+    qe.write(outFH, iFrame, iFrame, writer)
+
+
+def saveFollowState(statePath, outFH, iFrame, followers):
+
+    # the state only ever describes frames that are already in the dump
+    outFH.flush()
+    state = {"frames": iFrame, "files": {f.file_path: f.state() for f in followers}}
+    with open(statePath + ".tmp", "w") as fh:
+        json.dump(state, fh)
+    os.replace(statePath + ".tmp", statePath)
+
+
+def dropDuplicates(frames, index):
+
+    # keep the frames whose canonical hash is not in the index yet (and add them to it);
+    # a Trajectory comes back masked, single frames as a shorter list
+    with stats.stage("dedup") as stage:
+        stage.add(frames=len(frames))
+        if isinstance(frames, Trajectory):
+            keep = index.filter(frame_hashes(frames.species, frames.cells, frames.positions,
+                                             index.tol))
+            return frames if keep.all() else frames[np.flatnonzero(keep)]
+        return [qe for qe in frames
+                if index.add(frame_hashes(qe.symbols, qe.cellMat_fixed, qe.cartCoords,
+                                          index.tol)[0])]
+
+
+def convertDirectory(args):
+
+    # the conversion itself, on the options parsed by main()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    if args.recursive:
+        # scandir walk with concurrent header sniffing; unchanged directories come from the manifest
+        files = discover(".", ".out", "qe", manifest=args.manifest, jobs=max(16, jobs))
+    else:
+        files = []
+        for file in os.listdir("./"):
+            # compressed outputs (.out.gz, .out.xz, .out.bz2, .out.zst) are streamed as they are
+            if has_suffix(file, ".out"):
+                files.append(file)
+
+        files.sort()
+
+    if args.follow:
+        return followFiles(files, args.outFile, args.columns.split(","), args.precision,
+                           args.interval, wrap=args.wrap, idle=args.idle_timeout)
+
+    if args.trajectory:
+        # nsims has to be known before the first frame is written: count the frames up front
+        # (from the cache, or with a byte search), several files at a time
+        with ThreadPoolExecutor(max_workers=max(1, args.readers)) as pool:
+            nFrames = sum(pool.map(countFrames, files))
+    else:
+        nFrames = len(files)
+
+    sharded = args.shards is not None or args.shard_frames is not None or args.shard_size is not None
+    if sharded:
+        # frames go to <outFile stem>.NNNN.dump shards, each written by its own thread,
+        # and <outFile stem>.shards.json lists the global frame range of every shard
+        outFH = None
+        writer = ShardedDump(args.outFile, nFrames, args.shards, args.shard_frames,
+                             None if args.shard_size is None else parse_size(args.shard_size),
+                             columns=args.columns.split(","), precision=args.precision)
+    else:
+        # with --dedup the dump only replaces outFile once it holds a frame, so a batch
+        # of nothing but duplicates leaves an earlier dump in place
+        dumpFile = args.outFile + ".partial" if args.dedup else args.outFile
+        outFH = open(dumpFile, "w")
+        writer = DumpWriter(outFH, columns=args.columns.split(","), precision=args.precision)
+
+    # one type table for the whole dump, from the species tables of the file headers;
+    # workers type atoms per file, the writer maps them onto the shared table
+    registry = SpeciesRegistry.from_files(files, max(1, args.readers))
+
+    # digests of the frames written so far, and of earlier batches with --dedup-index
+    index = HashIndex(args.dedup_index or None, args.dedup_tol) if args.dedup else None
+    dropped = 0
+
+    # the next files are read and parsed while the current one is written, in sorted file order
+    failed = 0
+    iFrame = 1
+    writeQe = QExpresso(inFile=None, registry=registry)
+    for file, frames, error in pipelineBatch(files, jobs, args.trajectory, args.wrap,
+                                             args.readers, args.prefetch):
+        if error is not None:
+            failed += 1
+            sys.stderr.write("mash: skipping %s (%s)\n" % (file, error))
+            continue
+        if index is not None:
+            nRead = len(frames)
+            frames = dropDuplicates(frames, index)
+            dropped += nRead - len(frames)
+            if len(frames) == 0:
+                continue
+        if isinstance(frames, Trajectory):
+            writeQe.writeTrajectory(outFH, frames, nFrames, iFrame, writer, args.wrap)
+        else:
+            for qe in frames:
+                qe.registry = registry
+                qe.assignTypes()
+                qe.write(outFH, nFrames, iFrame, writer)
+        iFrame += len(frames)
+
+    # frames stay numbered consecutively over the files that converted; if that
+    # differs from the count written into nsims, patch the TIMESTEP lines
+    if sharded:
+        if index is None or iFrame > 1:
+            writer.close(iFrame - 1)
+    else:
+        outFH.close()
+        if dumpFile != args.outFile and iFrame == 1:
+            os.remove(dumpFile)
+        else:
+            if iFrame - 1 != nFrames:
+                fixFrameCount(dumpFile, iFrame - 1)
+            if dumpFile != args.outFile:
+                os.replace(dumpFile, args.outFile)
+
+    if index is not None:
+        index.save()
+        sys.stderr.write("mash: dropped %d duplicate frames\n" % dropped)
+        if iFrame == 1 and dropped:
+            sys.stderr.write("mash: every frame was a duplicate, %s left unchanged\n" % args.outFile)
+            return 1
 
-    outFH.close()
+    if failed:
+        sys.stderr.write("mash: %d of %d files failed\n" % (failed, len(files)))
+        return 1
+    return 0
 
 
-main()
\ No newline at end of file
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Convert every *.out pw.x output (optionally .gz/.xz/.bz2/.zst compressed) "
+        "in the current directory (or tree, with --recursive) into one LAMMPS dump"
+    )
+    parser.add_argument("outFile", help="LAMMPS dump file to write")
+    parser.add_argument(
+        "--trajectory",
+        action="store_true",
+        help="write every ionic step of each output instead of one frame per file",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes parsing files in parallel (0 = all cores)",
+    )
+    parser.add_argument(
+        "--columns",
+        default=",".join(DEFAULT_COLUMNS + FORCE_COLUMNS),
+        help="comma separated atom columns to write, from: %s" % ",".join(COLUMNS),
+    )
+    parser.add_argument(
+        "--precision",
+        type=int,
+        default=16,
+        help="digits after the decimal point for positions, forces and box bounds",
+    )
+    parser.add_argument(
+        "--wrap",
+        action="store_true",
+        help="wrap atoms back into the periodic box so none lie outside it",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="keep running and append ionic steps of still running jobs as they complete",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="seconds between polls in --follow mode",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=3600.0,
+        help="in --follow mode, seconds without output after which a job counts as killed "
+        "and its last step is written without 'JOB DONE.'",
+    )
+    parser.add_argument(
+        "--readers",
+        type=int,
+        default=4,
+        help="threads reading ahead the next files while the current ones are parsed and written",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=8,
+        help="maximum number of files read ahead of the writer (bounds memory use)",
+    )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="also convert pw.x outputs in every subdirectory (other *.out files are skipped)",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=".dftbridge-manifest.json",
+        help="directory listing cache used by --recursive, so repeat scans only list changed directories",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="split the dump into this many shard files of consecutive frames, plus a JSON manifest",
+    )
+    parser.add_argument(
+        "--shard-frames",
+        type=int,
+        help="start a new shard after this many frames",
+    )
+    parser.add_argument(
+        "--shard-size",
+        help="start a new shard before one would exceed this size (e.g. 512M, 2G)",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="drop frames whose species, cell and positions match an earlier frame "
+        "(of this batch, or of earlier batches through --dedup-index)",
+    )
+    parser.add_argument(
+        "--dedup-index",
+        help="file keeping the frame hashes across runs for --dedup "
+        "(by default frames are only checked against this run)",
+    )
+    parser.add_argument(
+        "--dedup-tol",
+        type=float,
+        default=1.0e-4,
+        help="length in Angstrom positions and cells are rounded to before hashing for --dedup",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        help="write per-stage timings and counters (read, scan, parse, cell, write) to FILE as JSON",
+    )
+    args = parser.parse_args()
+
+    if not args.stats:
+        return convertDirectory(args)
+    with stats.collect() as collector:
+        status = convertDirectory(args)
+    collector.dump(args.stats)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
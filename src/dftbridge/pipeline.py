@@ -0,0 +1,115 @@
+"""
+Ordered read -> parse -> write pipeline with bounded look-ahead.
+
+Three stages run concurrently:
+
+    read   a thread pool streams the next files through a small reused buffer,
+           so their pages are in the OS cache (or the network filesystem's
+           client cache) by the time they are parsed
+    parse  one background thread, or a process pool for jobs > 1; a file is
+           handed to it as soon as its read finished
+    write  the caller, consuming results strictly in input order
+
+At most ``depth`` files are in flight (being read, parsed, or parsed and
+waiting to be written). When the writer falls behind, nothing new is read,
+so memory stays bounded by ``depth`` parsed results whatever the number of
+files.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from .compression import CHUNK_SIZE
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_END = object()
+
+
+def prefetch(file_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Read a file front to back and discard the data, leaving it in the page cache.
+
+    Args:
+        file_path: File to read.
+        chunk_size: Size of the reused read buffer.
+
+    Returns:
+        Number of bytes read (0 if the file cannot be opened; the parse stage reports that).
+    """
+    buffer = bytearray(chunk_size)
+    total = 0
+    try:
+        with open(file_path, "rb", buffering=0) as fh:
+            while True:
+                n = fh.readinto(buffer)
+                if not n:
+                    break
+                total += n
+    except OSError:
+        pass
+    return total
+
+
+def _chain(first: Future, executor, fn: Callable, arg) -> Future:
+    """A future for ``fn(arg)`` run on ``executor`` once ``first`` has finished."""
+    result: Future = Future()
+
+    def forward(inner: Future):
+        if result.cancelled():
+            return
+        error = inner.exception()
+        if error is not None:
+            result.set_exception(error)
+        else:
+            result.set_result(inner.result())
+
+    def submit(_):
+        if result.cancelled():
+            return
+        try:
+            executor.submit(fn, arg).add_done_callback(forward)
+        except RuntimeError as err:  # executor already shut down
+            result.set_exception(err)
+
+    first.add_done_callback(submit)
+    return result
+
+
+def run_pipeline(items: Iterable[T], parse: Callable[[T], R], read: Callable[[T], object] = prefetch,
+                 jobs: int = 1, readers: int = 4, depth: int = 8) -> Iterator[R]:
+    """
+    Read, parse and yield every item, overlapping the stages.
+
+    Args:
+        items: Inputs, usually file paths.
+        parse: Picklable function turning one item into a result; it should not raise.
+        read: Function run on each item by the reader threads before it is parsed.
+        jobs: Parse in one background thread (1) or in that many worker processes.
+        readers: Reader threads.
+        depth: Maximum number of items in flight between reading and writing.
+
+    Yields:
+        ``parse(item)`` for every item, in the order of ``items``.
+    """
+    depth = max(1, depth)
+    source = iter(items)
+    pending: deque = deque()
+    parser = ThreadPoolExecutor(max_workers=1) if jobs == 1 else ProcessPoolExecutor(max_workers=jobs)
+    with ThreadPoolExecutor(max_workers=max(1, readers)) as reader, parser:
+        try:
+            while True:
+                while len(pending) < depth:
+                    item = next(source, _END)
+                    if item is _END:
+                        break
+                    pending.append(_chain(reader.submit(read, item), parser, parse, item))
+                if not pending:
+                    return
+                # backpressure: the next item is only read once the oldest one is handed over
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
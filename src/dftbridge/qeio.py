@@ -0,0 +1,217 @@
+"""
+Memory-mapped, byte-level access to Quantum Espresso output files.
+
+The whole output is never decoded into Python strings. Anchors are located
+with ``mmap.find`` on raw bytes and only the handful of lines that belong to
+a block that actually gets parsed are decoded.
+"""
+
+import mmap
+import os
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from .compression import is_compressed, open_text
+
+
+# Byte patterns that open the blocks the parsers care about
+ANCHORS: Dict[str, bytes] = {
+    'energy': b"!    total energy",
+    'positions': b"ATOMIC_POSITIONS",
+    'cell': b"crystal axes:",
+    'forces': b"Forces acting on atoms",
+    'sites': b"site n.",
+    'alat': b"lattice parameter (alat)",
+    'natoms': b"number of atoms/cell",
+}
+
+
+# Pattern syntax whose matches on raw text can differ from matches on the
+# stripped lines find_section reports: anchors, whitespace and the escapes
+# or negated classes that also match a newline
+_LINE_ONLY_SYNTAX = re.compile(r"[\^$\s]|\\[AZDWsntrfvx0-7]")
+
+
+class MappedOutput:
+    """
+    Read-only memory map over a QE output with anchor search helpers.
+
+    Offsets returned by the search methods are byte offsets into the file,
+    so they can be stored and handed back to the decoding methods later.
+    """
+
+    def __init__(self, file_path: str, encoding: str = 'utf-8'):
+        """
+        Map the file into memory.
+
+        Args:
+            file_path: Path to the QE output file.
+            encoding: Encoding used when decoding blocks.
+        """
+        self.file_path = file_path
+        self.encoding = encoding
+        self._fh = open(file_path, 'rb')
+        self.size = os.fstat(self._fh.fileno()).st_size
+        # mmap cannot map an empty file; an empty bytes object has the same find API
+        if self.size:
+            self.data: Union[mmap.mmap, bytes] = mmap.mmap(
+                self._fh.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        else:
+            self.data = b""
+
+    def close(self):
+        """Release the mapping and the underlying file handle."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+        self._fh.close()
+
+    def __enter__(self) -> "MappedOutput":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _anchor(anchor: Union[str, bytes]) -> bytes:
+        """Resolve a named anchor from ANCHORS, or encode a literal pattern."""
+        if isinstance(anchor, bytes):
+            return anchor
+        return ANCHORS.get(anchor, anchor.encode())
+
+    def find(self, anchor: Union[str, bytes], start: int = 0, end: Optional[int] = None) -> int:
+        """Byte offset of the first occurrence of ``anchor``, or -1."""
+        end = self.size if end is None else end
+        return self.data.find(self._anchor(anchor), start, end)
+
+    def rfind(self, anchor: Union[str, bytes], start: int = 0, end: Optional[int] = None) -> int:
+        """Byte offset of the last occurrence of ``anchor``, or -1."""
+        end = self.size if end is None else end
+        return self.data.rfind(self._anchor(anchor), start, end)
+
+    def iter_find(self, anchor: Union[str, bytes], start: int = 0,
+                  end: Optional[int] = None) -> Iterator[int]:
+        """Yield the byte offset of every occurrence of ``anchor`` in order."""
+        needle = self._anchor(anchor)
+        end = self.size if end is None else end
+        pos = self.data.find(needle, start, end)
+        while pos != -1:
+            yield pos
+            pos = self.data.find(needle, pos + len(needle), end)
+
+    def find_all(self, anchor: Union[str, bytes], start: int = 0,
+                 end: Optional[int] = None) -> List[int]:
+        """Byte offsets of every occurrence of ``anchor``."""
+        return list(self.iter_find(anchor, start, end))
+
+    def line_start(self, offset: int) -> int:
+        """Offset of the first byte of the line containing ``offset``."""
+        return self.data.rfind(b"\n", 0, offset) + 1
+
+    def line_end(self, offset: int) -> int:
+        """Offset just past the newline that ends the line containing ``offset``."""
+        pos = self.data.find(b"\n", offset)
+        return self.size if pos == -1 else pos + 1
+
+    def decode(self, start: int, end: int) -> str:
+        """Decode the byte range [start, end)."""
+        return self.data[start:end].decode(self.encoding, errors='replace')
+
+    def line_at(self, offset: int) -> str:
+        """Decoded line containing ``offset``, without its newline."""
+        return self.decode(self.line_start(offset), self.line_end(offset)).rstrip("\r\n")
+
+    def lines_after(self, offset: int, count: int) -> List[str]:
+        """Decode the ``count`` lines that follow the line containing ``offset``."""
+        start = self.line_end(offset)
+        end = start
+        for _ in range(count):
+            if end >= self.size:
+                break
+            end = self.line_end(end)
+        return self.decode(start, end).splitlines()
+
+    def block_after(self, offset: int, skip_blank: bool = False) -> List[str]:
+        """
+        Decode the lines following the line containing ``offset`` up to the next blank line.
+
+        Args:
+            offset: Any byte offset inside the header line of the block.
+            skip_blank: Skip blank lines directly after the header before the block starts.
+
+        Returns:
+            List of decoded lines in the block.
+        """
+        start = self.line_end(offset)
+        if skip_blank:
+            while start < self.size:
+                end = self.line_end(start)
+                if self.data[start:end].strip():
+                    break
+                start = end
+        end = start
+        while end < self.size:
+            nxt = self.line_end(end)
+            if not self.data[end:nxt].strip():
+                break
+            end = nxt
+        return self.decode(start, end).splitlines()
+
+    def grep(self, pattern: Union[str, bytes]) -> List[str]:
+        """
+        Decoded lines matching a regular expression, searched directly on the bytes.
+
+        Args:
+            pattern: Regular expression (str or bytes).
+
+        Returns:
+            List of matching lines, each line reported once.
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.encode()
+        matches = []
+        last_line = -1
+        for match in re.finditer(pattern, self.data):
+            start = self.line_start(match.start())
+            if start == last_line:
+                continue
+            last_line = start
+            matches.append(self.line_at(start))
+        return matches
+
+    def lines(self) -> List[str]:
+        """Decode the whole file line by line; only for callers that really need it."""
+        return self.decode(0, self.size).splitlines()
+
+
+def grep_stripped(pattern: str, mapped: Optional[MappedOutput], path: str,
+                  clean: Callable[[List[str]], List[str]]) -> Optional[List[str]]:
+    """
+    Stripped, cleaned lines matching a pattern, without decoding the whole output.
+
+    The raw text (the map, or the decompressed stream) is searched first and
+    only the lines that hit are stripped, cleaned and matched again, so the
+    result is what matching every cleaned line would give.
+
+    Args:
+        pattern: Regular expression, matched against each cleaned line.
+        mapped: Map over the output, or None if it is not mapped.
+        path: Path to the output, streamed when it is compressed.
+        clean: Turns the stripped lines into the lines the pattern is matched against.
+
+    Returns:
+        The matching lines, or None if the pattern has to be matched line by
+        line (anchors, whitespace) or the output is neither mapped nor compressed.
+    """
+    if _LINE_ONLY_SYNTAX.search(pattern) is not None:
+        return None
+    regex = re.compile(pattern)
+    if mapped is not None:
+        candidates = clean([line.strip() for line in mapped.grep(pattern)])
+    elif is_compressed(path):
+        with open_text(path) as fh:
+            candidates = clean([line.strip() for line in fh if regex.search(line)])
+    else:
+        return None
+    return [line for line in candidates if regex.search(line)]
@@ -0,0 +1,244 @@
+"""
+One-pass index of the named sections of a QE input or output.
+
+All section headers are found with a single combined, precompiled regex
+over the memory-mapped bytes. Every occurrence is recorded as a span, so
+block parsers slice the bytes they need instead of rescanning lines.
+
+Compressed outputs cannot be mapped; ``SectionIndex.from_stream`` builds the
+same index from a decompressing stream. It keeps the spans of every
+occurrence but only the last block of each section; earlier blocks are read
+again from a fresh stream when they are asked for.
+"""
+
+import re
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .qeio import MappedOutput
+
+
+# Header of every indexed section, matched at the start of a line
+SECTIONS: Dict[str, bytes] = {
+    'atomic_positions': rb"ATOMIC_POSITIONS",
+    'cell_parameters': rb"CELL_PARAMETERS",
+    'crystal_axes': rb"crystal axes:",
+    'forces': rb"Forces acting on atoms",
+    # pw.x prints 'total   stress  (Ry/bohr**3)  (kbar)  P= ...'
+    'stress': rb"[Tt]otal +stress",
+}
+
+_PATTERN = re.compile(
+    rb"^[ \t]*(?:" + rb"|".join(b"(?P<%s>%s)" % (name.encode(), header)
+                                for name, header in SECTIONS.items()) + rb")",
+    re.MULTILINE,
+)
+
+# Input cards and namelists also end a block when no blank line separates them
+_CARD = re.compile(
+    rb"[ \t]*(?:ATOMIC_SPECIES|ATOMIC_POSITIONS|K_POINTS|CELL_PARAMETERS|OCCUPATIONS"
+    rb"|CONSTRAINTS|ATOMIC_FORCES|ADDITIONAL_K_POINTS|SOLVENTS|HUBBARD|&|/[ \t]*\r?$)"
+)
+
+
+class Section(NamedTuple):
+    """
+    One occurrence of a named section.
+
+    Attributes:
+        name: Key of the section in SECTIONS.
+        header: Byte offset of the header line.
+        start: Byte offset of the first line of the block after the header.
+        end: Byte offset just past the last line of the block.
+    """
+    name: str
+    header: int
+    start: int
+    end: int
+
+
+class SectionIndex:
+    """
+    Spans of every section occurrence in a mapped file, built in one pass.
+
+    A block starts after its header line (leading blank lines skipped, as in
+    the 'Forces acting on atoms' block) and ends at the next blank line, input
+    card or indexed header, whichever comes first.
+    """
+
+    def __init__(self, mapped: Optional[MappedOutput]):
+        """
+        Index the file.
+
+        Args:
+            mapped: The mapped QE input or output (None for an empty index,
+                as used by ``from_stream``).
+        """
+        self.mapped: Optional[MappedOutput] = mapped
+        self.sections: Dict[str, List[Section]] = {name: [] for name in SECTIONS}
+        # streamed files: raw (header line, block lines) of the last occurrence of each
+        # section, and how to open the stream again for the earlier ones
+        self._last: Dict[str, Tuple[bytes, List[bytes]]] = {}
+        self._reopen: Optional[Callable[[], BinaryIO]] = None
+        self._encoding = 'utf-8'
+        if mapped is not None:
+            self._build()
+
+    @classmethod
+    def from_stream(cls, fh: BinaryIO, encoding: str = 'utf-8',
+                    reopen: Optional[Callable[[], BinaryIO]] = None) -> "SectionIndex":
+        """
+        Index a file that can only be read front to back (e.g. a compressed output).
+
+        Spans are offsets into the decompressed stream. Only the last block of
+        each section is kept in memory, so a long MD run is never held whole.
+
+        Args:
+            fh: Binary file object positioned at the start of the file.
+            encoding: Encoding used to decode the blocks.
+            reopen: Returns a new stream of the same file, positioned at its start;
+                used to read occurrences before the last one.
+
+        Returns:
+            SectionIndex: The index, with blocks available through ``block``.
+        """
+        index = cls(None)
+        index._reopen = reopen
+        index._encoding = encoding
+        # the open section: [name, header offset, header line, block start, block lines]
+        current: Optional[list] = None
+        offset = 0
+
+        def close(end: int):
+            name, header, header_line, start, block = current
+            start = end if start is None else start
+            index.sections[name].append(Section(name, header, start, end))
+            index._last[name] = (header_line, block)
+
+        for line in fh:
+            match = _PATTERN.match(line)
+            if match:
+                if current is not None:
+                    close(offset)
+                current = [match.lastgroup, offset, line, None, []]
+            elif current is not None:
+                blank = not line.strip()
+                if current[3] is None and blank:
+                    pass  # blank lines between the header and the block
+                elif blank or _CARD.match(line):
+                    close(offset)
+                    current = None
+                else:
+                    if current[3] is None:
+                        current[3] = offset
+                    current[4].append(line)
+            offset += len(line)
+        if current is not None:
+            close(offset)
+        return index
+
+    def _streamed(self, name: str, k: int) -> Tuple[str, List[str]]:
+        """Decoded header line and block lines of occurrence ``k`` of a streamed file."""
+        occurrences = self.sections[name]
+        if occurrences[k] is occurrences[-1]:
+            header_line, block = self._last[name]
+        else:
+            if self._reopen is None:
+                raise ValueError(f"Only the last '{name}' block of a streamed file is kept; "
+                                 "pass reopen to from_stream to read earlier ones")
+            header_line, block = self._read_again(occurrences[k])
+        return (header_line.decode(self._encoding, errors='replace').rstrip("\r\n"),
+                [line.decode(self._encoding, errors='replace').rstrip("\r\n") for line in block])
+
+    def _read_again(self, section: Section) -> Tuple[bytes, List[bytes]]:
+        # decompress up to the header again, then take just the header line and the block
+        with self._reopen() as fh:
+            remaining = section.header
+            while remaining > 0:
+                skipped = len(fh.read(min(remaining, 1 << 20)))
+                if not skipped:
+                    break
+                remaining -= skipped
+            header_line = fh.readline()
+            fh.read(section.start - section.header - len(header_line))
+            block = fh.read(section.end - section.start).splitlines(keepends=True)
+        return header_line, block
+
+    def _build(self):
+        mapped = self.mapped
+        matches = list(_PATTERN.finditer(mapped.data))
+        headers = [match.start() for match in matches] + [mapped.size]
+        for i, match in enumerate(matches):
+            header = match.start()
+            start, end = self._block(mapped.line_end(header), headers[i + 1])
+            self.sections[match.lastgroup].append(Section(match.lastgroup, header, start, end))
+
+    def _block(self, start: int, limit: int):
+        data = self.mapped.data
+        # skip blank lines between the header and the block
+        while start < limit:
+            nxt = self.mapped.line_end(start)
+            if data[start:nxt].strip():
+                break
+            start = nxt
+        end = start
+        while end < limit:
+            nxt = self.mapped.line_end(end)
+            line = data[end:nxt]
+            if not line.strip() or _CARD.match(line):
+                break
+            end = nxt
+        return start, min(end, limit)
+
+    def __contains__(self, name: str) -> bool:
+        return bool(self.sections.get(name))
+
+    def count(self, name: str) -> int:
+        """Number of occurrences of a section."""
+        return len(self.sections[name])
+
+    def spans(self, name: str) -> List[tuple]:
+        """
+        Block spans of every occurrence of a section.
+
+        Args:
+            name: Key of the section in SECTIONS.
+
+        Returns:
+            List of (start, end) byte offsets, in file order.
+        """
+        return [(section.start, section.end) for section in self.sections[name]]
+
+    def get(self, name: str, k: int = -1) -> Optional[Section]:
+        """Occurrence ``k`` of a section (the last one by default), or None if there is none."""
+        occurrences = self.sections[name]
+        try:
+            return occurrences[k]
+        except IndexError:
+            return None
+
+    def header_line(self, name: str, k: int = -1) -> Optional[str]:
+        """Decoded header line of occurrence ``k`` of a section, or None."""
+        section = self.get(name, k)
+        if section is None:
+            return None
+        if self.mapped is None:
+            return self._streamed(name, k)[0]
+        return self.mapped.line_at(section.header)
+
+    def block(self, name: str, k: int = -1) -> List[str]:
+        """
+        Decoded lines of the block of occurrence ``k`` of a section.
+
+        Args:
+            name: Key of the section in SECTIONS.
+            k: Occurrence number, negative values count from the end.
+
+        Returns:
+            List of lines; empty if the section does not occur.
+        """
+        section = self.get(name, k)
+        if section is None:
+            return []
+        if self.mapped is None:
+            return self._streamed(name, k)[1]
+        return self.mapped.decode(section.start, section.end).splitlines()
@@ -0,0 +1,228 @@
+"""
+Sharded LAMMPS dump output.
+
+Instead of one file, the frames of a conversion are split into shards of
+consecutive frames, ``all.0000.dump``, ``all.0001.dump``, ... next to a
+small JSON manifest (``all.shards.json``) listing the global frame range of
+every shard. Frames keep their global numbering and ``nsims`` in every
+TIMESTEP line, so concatenating the shards gives the single-file dump, and
+ranks of a training job can each read their own shards in parallel.
+
+A shard is closed once it holds its share of N shards, ``max_frames``
+frames, or ``max_bytes`` of text. Frames are formatted in order by the
+caller; every shard has its own writer thread with its own file handle and
+a bounded queue, so file writes (which release the GIL) overlap with the
+parsing and formatting of the next frames, and a slow filesystem holds up
+one shard's queue rather than the whole conversion.
+"""
+
+import json
+import math
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import stats
+from .writer import DEFAULT_COLUMNS, Box, DumpWriter, rewrite_nsims
+
+MANIFEST_VERSION = 1
+
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """
+    Byte count of a size such as '4096', '512K', '64M' or '2G'.
+
+    Raises:
+        ValueError: If the size cannot be parsed or is not positive.
+    """
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    value = float(text[:len(text) - len(unit)]) * _SIZE_UNITS[unit]
+    if value <= 0:
+        raise ValueError(f"Size must be positive: {text!r}")
+    return int(value)
+
+
+def shard_paths(out_file: str) -> str:
+    """Template of the shard file names for ``out_file``, e.g. 'all.dump' -> 'all.{:04d}.dump'."""
+    stem, suffix = os.path.splitext(out_file)
+    return stem.replace("{", "{{").replace("}", "}}") + ".{:04d}" + suffix
+
+
+def manifest_path(out_file: str) -> str:
+    """Manifest written next to the shards of ``out_file``, e.g. 'all.dump' -> 'all.shards.json'."""
+    return os.path.splitext(out_file)[0] + ".shards.json"
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """
+    Read a shard manifest, with the shard paths made relative to the current directory.
+
+    Args:
+        path: The manifest file.
+
+    Returns:
+        Dictionary with 'nsims', 'columns' and 'shards' (each with 'path',
+        'first_frame', 'last_frame', 'frames' and 'bytes').
+    """
+    with open(path) as fh:
+        manifest = json.load(fh)
+    base = os.path.dirname(path)
+    for shard in manifest['shards']:
+        shard['path'] = os.path.join(base, shard['file'])
+    return manifest
+
+
+class _ShardWriter(threading.Thread):
+    """Writes the frames of one shard, handed over through a bounded queue."""
+
+    def __init__(self, path: str, depth: int):
+        super().__init__(daemon=True)
+        self.path = path
+        self.queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max(1, depth))
+        self.error: Optional[BaseException] = None
+        self.fh = open(path, "w")
+        self.start()
+
+    def run(self):
+        try:
+            while True:
+                text = self.queue.get()
+                if text is None:
+                    break
+                if self.error is not None:
+                    # keep draining so the producer never blocks on a dead writer
+                    continue
+                try:
+                    self.fh.write(text)
+                except BaseException as err:  # reported by ShardedDump
+                    self.error = err
+        finally:
+            self.fh.close()
+
+    def stop(self):
+        """Let the thread finish the queued frames, close the file and exit."""
+        self.queue.put(None)
+
+    def wait(self):
+        """Wait for the thread to exit; re-raise what went wrong while writing."""
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
+class ShardedDump:
+    """
+    Drop-in replacement for DumpWriter that spreads frames over shard files.
+
+    ``write_frame`` takes the same arguments as ``DumpWriter.write_frame``,
+    so QExpresso.write / writeTrajectory can write to it unchanged.
+    """
+
+    def __init__(self, out_file: str, nframes: int, shards: Optional[int] = None,
+                 max_frames: Optional[int] = None, max_bytes: Optional[int] = None,
+                 columns: Sequence[str] = DEFAULT_COLUMNS, precision: int = 16, depth: int = 64):
+        """
+        Set up the shards; files are only created once frames arrive.
+
+        Args:
+            out_file: Name the shard and manifest names are derived from.
+            nframes: Expected total number of frames, written as nsims.
+            shards: Split into this many shards of (nearly) equal frame counts.
+            max_frames: Cap on the frames per shard.
+            max_bytes: Cap on the text per shard; a shard always holds at least one frame.
+            columns: Atom columns, see DumpWriter.
+            precision: Digits after the decimal point, see DumpWriter.
+            depth: Frames queued per shard writer before the caller waits.
+
+        Raises:
+            ValueError: If no or a non-positive limit is given.
+        """
+        if shards is None and max_frames is None and max_bytes is None:
+            raise ValueError("Give the number of shards, max_frames or max_bytes")
+        if any(limit is not None and limit <= 0 for limit in (shards, max_frames, max_bytes)):
+            raise ValueError("Shard limits must be positive")
+        if shards is not None:
+            per_shard = max(1, math.ceil(nframes / shards))
+            max_frames = per_shard if max_frames is None else min(max_frames, per_shard)
+        self.out_file = out_file
+        self.nframes = nframes
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.depth = depth
+        self.template = shard_paths(out_file)
+        self.formatter = DumpWriter(None, columns=columns, precision=precision)
+        self.shards: List[Dict[str, Any]] = []
+        self._current: Optional[_ShardWriter] = None
+        self._closing: List[_ShardWriter] = []
+
+    def _full(self, shard: Dict[str, Any], size: int) -> bool:
+        if self.max_frames is not None and shard['frames'] >= self.max_frames:
+            return True
+        return self.max_bytes is not None and shard['bytes'] + size > self.max_bytes
+
+    def _open_shard(self, iframe: int):
+        if self._current is not None:
+            # the previous shard drains its queue in the background while the next one fills
+            self._current.stop()
+            self._closing.append(self._current)
+        path = self.template.format(len(self.shards))
+        self.shards.append({'file': os.path.basename(path), 'first_frame': iframe,
+                            'last_frame': iframe, 'frames': 0, 'bytes': 0})
+        self._current = _ShardWriter(path, self.depth)
+
+    def write_frame(self, iframe: int, nframes: int, energy: float, box: Box,
+                    types: Sequence[int], positions: np.ndarray,
+                    forces: Optional[np.ndarray] = None):
+        """Format one frame and queue it on its shard's writer (see ``DumpWriter.write_frame``)."""
+        with stats.stage("write") as stage:
+            text = self.formatter.format_frame(iframe, nframes, energy, box, types,
+                                               positions, forces)
+            if not self.shards or (self.shards[-1]['frames']
+                                   and self._full(self.shards[-1], len(text))):
+                self._open_shard(iframe)
+            shard = self.shards[-1]
+            shard['frames'] += 1
+            shard['bytes'] += len(text)
+            shard['last_frame'] = iframe
+            if self._current.error is not None:
+                raise self._current.error
+            self._current.queue.put(text)
+            stage.add(bytes=len(text), lines=len(positions) + 9, frames=1)
+
+    def close(self, nframes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Wait for every shard writer and write the manifest.
+
+        Args:
+            nframes: Number of frames actually written, if it differs from the
+                expected count; nsims is then rewritten in every shard.
+
+        Returns:
+            The manifest (also written to ``manifest_path(out_file)``).
+        """
+        if self._current is not None:
+            self._current.stop()
+            self._closing.append(self._current)
+        writers, self._closing, self._current = self._closing, [], None
+        for writer in writers:
+            writer.wait()
+
+        base = os.path.dirname(self.out_file)
+        if nframes is not None and nframes != self.nframes:
+            for shard in self.shards:
+                rewrite_nsims(os.path.join(base, shard['file']), nframes)
+            self.nframes = nframes
+        for shard in self.shards:
+            shard['bytes'] = os.path.getsize(os.path.join(base, shard['file']))
+
+        manifest = {'version': MANIFEST_VERSION, 'nsims': self.nframes,
+                    'columns': list(self.formatter.columns), 'shards': self.shards}
+        with open(manifest_path(self.out_file), "w") as fh:
+            json.dump(manifest, fh, indent=1)
+        return manifest
@@ -0,0 +1,228 @@
+"""
+Element data and LAMMPS type tables shared across a batch.
+
+``SYMBOLS`` / ``MASSES`` hold the whole periodic table as arrays indexed by
+atomic number. A ``SpeciesRegistry`` interns element symbols into a single
+type table: symbols are mapped to types with one ``np.unique`` over the atom
+list (only the distinct symbols are looked up in Python), and the table is
+only ever appended to, so a type id never changes once handed out.
+
+Built with ``SpeciesRegistry.from_files`` from a pre-pass over the
+``atomic species`` tables in the output headers, one registry gives every
+frame of a multi-file dump the same element -> type mapping.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .compression import open_binary
+
+# Element symbols by atomic number; index 0 is a placeholder for unknown labels
+SYMBOLS = (
+    "X",
+    "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne",
+    "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar", "K", "Ca",
+    "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn",
+    "Ga", "Ge", "As", "Se", "Br", "Kr", "Rb", "Sr", "Y", "Zr",
+    "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn",
+    "Sb", "Te", "I", "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd",
+    "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb",
+    "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg",
+    "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra", "Ac", "Th",
+    "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm",
+    "Md", "No", "Lr", "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds",
+    "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og",
+)
+
+# Standard atomic weights (g/mol), mass number of the longest-lived isotope for radioactive elements
+MASSES = np.array([
+    0.0,
+    1.008, 4.0026, 6.94, 9.0122, 10.81, 12.011, 14.007, 15.999, 18.998, 20.180,
+    22.990, 24.305, 26.982, 28.085, 30.974, 32.06, 35.45, 39.948, 39.098, 40.078,
+    44.956, 47.867, 50.942, 51.996, 54.938, 55.845, 58.933, 58.693, 63.546, 65.38,
+    69.723, 72.630, 74.922, 78.971, 79.904, 83.798, 85.468, 87.62, 88.906, 91.224,
+    92.906, 95.95, 98.0, 101.07, 102.91, 106.42, 107.87, 112.41, 114.82, 118.71,
+    121.76, 127.60, 126.90, 131.29, 132.91, 137.33, 138.91, 140.12, 140.91, 144.24,
+    145.0, 150.36, 151.96, 157.25, 158.93, 162.50, 164.93, 167.26, 168.93, 173.05,
+    174.97, 178.49, 180.95, 183.84, 186.21, 190.23, 192.22, 195.08, 196.97, 200.59,
+    204.38, 207.2, 208.98, 209.0, 210.0, 222.0, 223.0, 226.0, 227.0, 232.04,
+    231.04, 238.03, 237.0, 244.0, 243.0, 247.0, 247.0, 251.0, 252.0, 257.0,
+    258.0, 259.0, 262.0, 267.0, 270.0, 269.0, 270.0, 270.0, 278.0, 281.0,
+    281.0, 285.0, 286.0, 289.0, 289.0, 293.0, 293.0, 294.0,
+])
+
+ATOMIC_NUMBERS: Dict[str, int] = {symbol: z for z, symbol in enumerate(SYMBOLS)}
+
+_SPECIES_HEADER = b"atomic species   valence    mass"
+_SPECIES_STOP = b"site n."
+
+
+def element_table() -> Dict[str, Dict[str, float]]:
+    """
+    The whole periodic table as ``{symbol: {'number': Z, 'mass': m}}``.
+
+    Returns:
+        Dictionary covering every element, the layout of the old ``common_elements`` tables.
+    """
+    return {symbol: {'number': z, 'mass': float(MASSES[z])}
+            for z, symbol in enumerate(SYMBOLS) if z}
+
+
+def element_of(label: str) -> str:
+    """
+    Element symbol of a QE species label ('Fe1' -> 'Fe', 'O_up' -> 'O', 'si' -> 'Si').
+
+    Labels that do not start with an element symbol are returned unchanged.
+    """
+    letters = label.rstrip("0123456789").split("_")[0].split("-")[0]
+    for size in (2, 1):
+        symbol = letters[:size].capitalize()
+        if len(letters) >= size and symbol in ATOMIC_NUMBERS and symbol != "X":
+            return symbol
+    return label
+
+
+def assign_types(symbols: Sequence[str], type_names: Optional[Sequence[str]] = None
+                 ) -> Tuple[List[str], np.ndarray]:
+    """
+    Map every atom's symbol to a 1-based type, vectorized over the atom list.
+
+    Args:
+        symbols: Symbol of every atom.
+        type_names: Fixed type table to map onto; by default the sorted distinct symbols.
+
+    Returns:
+        (type_names, types) with ``types`` an (N,) int16 array.
+
+    Raises:
+        KeyError: If a symbol is missing from ``type_names``.
+    """
+    unique, inverse = np.unique(np.asarray(symbols, dtype=object).astype(str), return_inverse=True)
+    if type_names is None:
+        type_names = unique.tolist()
+    lookup = {name: i + 1 for i, name in enumerate(type_names)}
+    ids = np.array([lookup[name] for name in unique.tolist()], dtype=np.int16)
+    return list(type_names), ids[inverse.reshape(-1)] if len(ids) else np.zeros(0, dtype=np.int16)
+
+
+def read_species(file_path: str, limit: int = 1 << 20) -> List[str]:
+    """
+    Species labels from the 'atomic species' table of a pw.x output header.
+
+    Only the header is read: the scan stops at the table's end, at the
+    'site n.' table, or after ``limit`` bytes.
+
+    Args:
+        file_path: Path to the output, plain or compressed.
+        limit: Maximum number of bytes to look through.
+
+    Returns:
+        The labels in the order of the table; empty if there is none (or the file is unreadable).
+    """
+    labels: List[str] = []
+    try:
+        with open_binary(file_path) as fh:
+            seen = 0
+            in_table = False
+            for line in fh:
+                seen += len(line)
+                if in_table:
+                    fields = line.split()
+                    if not fields:
+                        break
+                    labels.append(fields[0].decode(errors="replace"))
+                elif _SPECIES_HEADER in line:
+                    in_table = True
+                elif _SPECIES_STOP in line or seen > limit:
+                    break
+    except (OSError, EOFError, ValueError, ImportError):
+        return []
+    return labels
+
+
+class SpeciesRegistry:
+    """
+    One LAMMPS type table for a whole batch.
+
+    Attributes:
+        type_names: Element symbol of each type; type ``t`` is ``type_names[t - 1]``.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Start a table with ``names`` as types 1, 2, ... (sorted, duplicates dropped).
+
+        Args:
+            names: Element symbols known up front.
+        """
+        self.type_names: List[str] = sorted(set(names))
+        self._lookup: Dict[str, int] = {name: i + 1 for i, name in enumerate(self.type_names)}
+
+    @classmethod
+    def from_files(cls, files: Sequence[str], jobs: int = 8) -> "SpeciesRegistry":
+        """
+        Build the table from the header species tables of every file.
+
+        Numeric suffixes are dropped ('Fe1' and 'Fe2' are both 'Fe'), the same
+        way ``parse_symbol_column`` reads the atom labels of the coordinate blocks.
+
+        Args:
+            files: pw.x outputs of the batch.
+            jobs: Threads reading headers concurrently.
+
+        Returns:
+            SpeciesRegistry: Types numbered over the sorted elements of the whole batch.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            tables = list(pool.map(read_species, files))
+        return cls(label.rstrip("0123456789") for labels in tables for label in labels)
+
+    def __len__(self) -> int:
+        return len(self.type_names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._lookup
+
+    def intern(self, name: str) -> int:
+        """Type of ``name``, appending it to the table if it is new."""
+        type_id = self._lookup.get(name)
+        if type_id is None:
+            self.type_names.append(name)
+            type_id = self._lookup[name] = len(self.type_names)
+        return type_id
+
+    def types(self, symbols: Sequence[str]) -> np.ndarray:
+        """
+        Types of every atom; unseen symbols are interned (in sorted order) first.
+
+        Args:
+            symbols: Symbol of every atom.
+
+        Returns:
+            np.ndarray: (N,) int16 array of 1-based types.
+        """
+        unique, inverse = np.unique(np.asarray(symbols, dtype=object).astype(str),
+                                    return_inverse=True)
+        ids = np.array([self.intern(name) for name in unique.tolist()], dtype=np.int16)
+        return ids[inverse.reshape(-1)] if len(ids) else np.zeros(0, dtype=np.int16)
+
+    def remap(self, type_names: Sequence[str], types: np.ndarray) -> np.ndarray:
+        """
+        Translate types numbered over another table (e.g. a Trajectory's) into this one.
+
+        Args:
+            type_names: The other table.
+            types: Types in the other table.
+
+        Returns:
+            np.ndarray: The same atoms' types in this table.
+        """
+        table = np.array([0] + [self.intern(name) for name in type_names], dtype=np.int16)
+        return table[np.asarray(types)]
+
+    def masses(self) -> np.ndarray:
+        """(T,) mass of every type, 0 for labels that are not elements."""
+        return np.array([MASSES[ATOMIC_NUMBERS.get(element_of(name), 0)]
+                         for name in self.type_names])
@@ -0,0 +1,241 @@
+"""
+Opt-in per-stage timing and counters.
+
+The parsers and writers wrap their work in ``stage(name)`` blocks. Nothing
+is recorded unless a collector is active; while none is, ``stage`` hands
+back one shared no-op object, so the instrumentation costs a function call
+and a global lookup per stage.
+
+    with stats.collect() as run:
+        qe = QExpresso("run.out")
+        qe.read()
+        qe.fixCellMat()
+    run.dump("stats.json")
+
+Stages recorded by the package:
+
+    prefetch     reading files ahead of the parser (mash pipeline)
+    read         mapping or streaming an output (QExpresso, extract_all, extractdata)
+    scan         line-by-line passes over an output (frames.iter_frames, grep.scan_all)
+    parse        numeric block conversion (blocks.parse_vector_block)
+    cell         LAMMPS cell reduction and coordinate rotation
+    write        formatting and writing dump frames
+    coordinates, lattice, energies, system_info, convert
+                 the extraction steps of extract_all / extractdata
+
+Stage times are inclusive, e.g. 'parse' runs inside 'read'. Each stage
+keeps its call count, wall time, bytes, lines and frames, and the process
+peak RSS (high-water mark) seen when one of its calls ended.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# (stage name, counters of the call that just ended) -> None
+Callback = Callable[[str, Dict[str, float]], None]
+
+_FIELDS = ("calls", "seconds", "bytes", "lines", "frames")
+
+_active: Optional["Collector"] = None
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes, 0 where it cannot be read."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Stage:
+    """One timed call of a stage; counters are added with ``add``."""
+
+    __slots__ = ("collector", "name", "bytes", "lines", "frames", "start")
+
+    def __init__(self, collector: "Collector", name: str):
+        self.collector = collector
+        self.name = name
+        self.bytes = 0
+        self.lines = 0
+        self.frames = 0
+        self.start = 0.0
+
+    def add(self, bytes: int = 0, lines: int = 0, frames: int = 0):
+        self.bytes += bytes
+        self.lines += lines
+        self.frames += frames
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.collector.record(self.name, {
+            'calls': 1,
+            'seconds': time.perf_counter() - self.start,
+            'bytes': self.bytes,
+            'lines': self.lines,
+            'frames': self.frames,
+        })
+        return False
+
+
+class _NullStage:
+    """Stand-in returned while no collector is active."""
+
+    __slots__ = ()
+
+    def add(self, bytes: int = 0, lines: int = 0, frames: int = 0):
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL = _NullStage()
+
+
+class Collector:
+    """
+    Totals per stage for one instrumented run.
+
+    Stages may be recorded from several threads at once (pipeline readers,
+    the parse thread, shard writers); the totals are updated under a lock.
+
+    Attributes:
+        stages: Stage name -> counters (calls, seconds, bytes, lines, frames, peak_rss).
+        callback: Called with (stage name, counters of that call) after every call.
+    """
+
+    def __init__(self, callback: Optional[Callback] = None):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.callback = callback
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.elapsed: Optional[float] = None
+
+    def record(self, name: str, counts: Dict[str, float], peak: Optional[int] = None):
+        """
+        Add the counters of one or more calls of a stage.
+
+        Args:
+            name: Stage name.
+            counts: Any of 'calls', 'seconds', 'bytes', 'lines', 'frames'.
+            peak: Peak RSS to record; the current process peak when None.
+        """
+        peak = peak_rss() if peak is None else peak
+        with self._lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = dict.fromkeys(_FIELDS, 0)
+                totals['peak_rss'] = 0
+            for field, value in counts.items():
+                totals[field] += value
+            totals['peak_rss'] = max(totals['peak_rss'], peak)
+        if self.callback is not None:
+            self.callback(name, counts)
+
+    def merge(self, other: Dict[str, Any]):
+        """
+        Fold in the ``to_dict()`` output of another collector (e.g. from a worker process).
+
+        Args:
+            other: Result of ``Collector.to_dict()``.
+        """
+        for name, totals in other['stages'].items():
+            counts = {field: totals[field] for field in _FIELDS}
+            self.record(name, counts, peak=totals['peak_rss'])
+
+    def stop(self):
+        """Freeze the run's wall time."""
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-ready summary.
+
+        Returns:
+            Dictionary with the run's 'wall_seconds', its 'peak_rss' in bytes and the per-stage 'stages'.
+        """
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in self.stages.items()}
+        return {'wall_seconds': elapsed, 'peak_rss': peak_rss(), 'stages': stages}
+
+    def dump(self, path: str):
+        """Write ``to_dict()`` to ``path`` as JSON."""
+        with open(path, "w") as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+
+
+def enabled() -> bool:
+    """True while a collector is active."""
+    return _active is not None
+
+
+def stage(name: str):
+    """
+    Context manager timing one call of a stage.
+
+    Args:
+        name: Stage name.
+
+    Returns:
+        Object whose ``add(bytes=, lines=, frames=)`` attaches counters to the call;
+        a shared no-op when no collector is active.
+    """
+    collector = _active
+    if collector is None:
+        return _NULL
+    return _Stage(collector, name)
+
+
+def count(name: str, bytes: int = 0, lines: int = 0, frames: int = 0):
+    """Add counters to a stage without timing anything (no-op when disabled)."""
+    collector = _active
+    if collector is None:
+        return
+    collector.record(name, {'bytes': bytes, 'lines': lines, 'frames': frames})
+
+
+def merge(other: Dict[str, Any]):
+    """Fold a worker's ``Collector.to_dict()`` into the active collector, if any."""
+    if _active is not None:
+        _active.merge(other)
+
+
+@contextmanager
+def collect(callback: Optional[Callback] = None) -> Iterator[Collector]:
+    """
+    Record every instrumented stage run inside the block.
+
+    Args:
+        callback: Optional function called with (stage name, counters) after every stage call.
+
+    Yields:
+        Collector: The totals, complete once the block exits.
+    """
+    global _active
+    previous = _active
+    collector = Collector(callback)
+    _active = collector
+    try:
+        yield collector
+    finally:
+        collector.stop()
+        _active = previous
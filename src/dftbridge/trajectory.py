@@ -0,0 +1,249 @@
+"""
+Columnar (struct-of-arrays) container for many frames of one system.
+
+All frames share one atom list, so species are stored once as compact
+integer type ids and every per-frame quantity lives in one contiguous
+array with the frame as the leading axis.
+"""
+
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .frames import Frame
+from .species import assign_types
+
+
+class Trajectory:
+    """
+    Frames of one system stored as contiguous arrays.
+
+    Attributes:
+        type_names: Element symbol of each type; type ``t`` is ``type_names[t - 1]``.
+        types: (N,) LAMMPS type id of every atom (1-based, int16).
+        positions: (F, N, 3) Cartesian positions in Angstrom.
+        forces: (F, N, 3) forces in eV/Angstrom, NaN for frames without forces.
+        energies: (F,) total energies in eV.
+        cells: (F, 3, 3) cell matrices, one lattice vector per row.
+        source_index: (F,) index of each frame in the file it came from.
+
+    Slicing a trajectory by frame (``traj[10:20]``) returns a view that shares
+    these arrays; nothing is copied.
+    """
+
+    def __init__(self, species: Sequence[str], capacity: int = 0):
+        """
+        Create an empty trajectory for a fixed atom list.
+
+        Args:
+            species: Element symbol of every atom.
+            capacity: Number of frames to allocate up front.
+        """
+        self.type_names, self.types = assign_types(species)
+        self._nframes = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        natoms = len(self.types)
+        positions = np.empty((capacity, natoms, 3), dtype=np.float64)
+        forces = np.full((capacity, natoms, 3), np.nan, dtype=np.float64)
+        energies = np.empty(capacity, dtype=np.float64)
+        cells = np.empty((capacity, 3, 3), dtype=np.float64)
+        source_index = np.empty(capacity, dtype=np.int64)
+        if self._nframes:
+            n = self._nframes
+            positions[:n] = self._positions[:n]
+            forces[:n] = self._forces[:n]
+            energies[:n] = self._energies[:n]
+            cells[:n] = self._cells[:n]
+            source_index[:n] = self._source_index[:n]
+        self._positions = positions
+        self._forces = forces
+        self._energies = energies
+        self._cells = cells
+        self._source_index = source_index
+
+    @property
+    def natoms(self) -> int:
+        """Number of atoms in every frame."""
+        return len(self.types)
+
+    @property
+    def species(self) -> List[str]:
+        """Element symbol of every atom."""
+        return [self.type_names[t - 1] for t in self.types]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions[:self._nframes]
+
+    @property
+    def forces(self) -> np.ndarray:
+        return self._forces[:self._nframes]
+
+    @property
+    def energies(self) -> np.ndarray:
+        return self._energies[:self._nframes]
+
+    @property
+    def cells(self) -> np.ndarray:
+        return self._cells[:self._nframes]
+
+    @property
+    def source_index(self) -> np.ndarray:
+        return self._source_index[:self._nframes]
+
+    def __len__(self) -> int:
+        return self._nframes
+
+    def _reserve(self, extra: int, chunk_size: int):
+        needed = self._nframes + extra
+        if needed > len(self._energies):
+            # grow in chunks (at least doubling) so appends stay amortized O(1)
+            self._allocate(max(needed, 2 * len(self._energies), chunk_size))
+
+    def append(self, frame: Frame, chunk_size: int = 256):
+        """
+        Add one frame at the end.
+
+        Args:
+            frame: The frame to add; its species must match the trajectory's.
+            chunk_size: Minimum number of frames to allocate when growing.
+
+        Raises:
+            ValueError: If the frame has a different atom list, or positions or
+                forces that are not one row per atom.
+        """
+        if list(frame.species) != self.species:
+            raise ValueError("Frame species do not match the trajectory atom list")
+        natoms = len(self.species)
+        if np.shape(frame.positions) != (natoms, 3) or (
+                frame.forces is not None and np.shape(frame.forces) != (natoms, 3)):
+            raise ValueError(f"Frame {frame.index} does not have one position and force "
+                             f"row per atom ({natoms})")
+        self._reserve(1, chunk_size)
+        k = self._nframes
+        self._positions[k] = frame.positions
+        if frame.forces is not None:
+            self._forces[k] = frame.forces
+        self._energies[k] = frame.energy
+        self._cells[k] = np.nan if frame.cell is None else frame.cell
+        self._source_index[k] = frame.index
+        self._nframes += 1
+
+    def extend(self, frames: Iterable[Frame], chunk_size: int = 256):
+        """Append every frame of an iterable, growing storage ``chunk_size`` frames at a time."""
+        for frame in frames:
+            self.append(frame, chunk_size)
+
+    @classmethod
+    def from_frames(cls, frames: Iterable[Frame], chunk_size: int = 256) -> "Trajectory":
+        """
+        Build a trajectory from a stream of frames.
+
+        Args:
+            frames: Frames of one system, e.g. ``iter_frames(path)``.
+            chunk_size: Number of frames allocated per growth step.
+
+        Returns:
+            Trajectory: The collected frames; empty (with no atoms) if there were none.
+        """
+        iterator = iter(frames)
+        first = next(iterator, None)
+        if first is None:
+            return cls([])
+        traj = cls(first.species, capacity=chunk_size)
+        traj.append(first, chunk_size)
+        traj.extend(iterator, chunk_size)
+        return traj
+
+    @classmethod
+    def from_arrays(cls, type_names: Sequence[str], types: np.ndarray, positions: np.ndarray,
+                    forces: np.ndarray, energies: np.ndarray, cells: np.ndarray,
+                    source_index: np.ndarray) -> "Trajectory":
+        """
+        Wrap existing arrays (e.g. memory-mapped ones) without copying them.
+
+        Args:
+            type_names: Element symbol of each type.
+            types: (N,) 1-based type id of every atom.
+            positions: (F, N, 3) positions.
+            forces: (F, N, 3) forces, NaN where a frame had none.
+            energies: (F,) energies.
+            cells: (F, 3, 3) cell matrices.
+            source_index: (F,) index of each frame in its source file.
+
+        Returns:
+            Trajectory: A trajectory backed by the given arrays; appending to it
+            copies them into fresh storage first.
+        """
+        traj = cls.__new__(cls)
+        traj.type_names = list(type_names)
+        traj.types = types
+        traj._positions = positions
+        traj._forces = forces
+        traj._energies = energies
+        traj._cells = cells
+        traj._source_index = source_index
+        traj._nframes = len(energies)
+        return traj
+
+    def frame(self, k: int) -> Frame:
+        """
+        One frame as a Frame whose arrays are views into the trajectory.
+
+        Args:
+            k: Frame number, negative values count from the end.
+
+        Returns:
+            Frame: The frame; forces are None when the frame had none.
+        """
+        forces = self.forces[k]
+        return Frame(int(self.source_index[k]), float(self.energies[k]), self.cells[k],
+                     self.species, self.positions[k],
+                     None if np.isnan(forces).all() else forces)
+
+    def __iter__(self) -> Iterator[Frame]:
+        for k in range(len(self)):
+            yield self.frame(k)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray]) -> Union[Frame, "Trajectory"]:
+        if isinstance(key, (slice, np.ndarray, list)):
+            # slices, index arrays and boolean masks select a sub-trajectory
+            return Trajectory.from_arrays(self.type_names, self.types, self.positions[key],
+                                          self.forces[key], self.energies[key],
+                                          self.cells[key], self.source_index[key])
+        return self.frame(key)
+
+    def to_dataframe(self, k: Optional[int] = None):
+        """
+        Long-format pandas view, built only when asked for.
+
+        Args:
+            k: Single frame to convert; all frames when None.
+
+        Returns:
+            pd.DataFrame: One row per atom (per frame), with a 'frame' column.
+        """
+        import pandas as pd
+
+        if k is None:
+            index = np.arange(len(self), dtype=np.int64)
+        else:
+            index = np.array([range(len(self))[k]], dtype=np.int64)
+        nframes = len(index)
+        positions = self.positions[index].reshape(-1, 3)
+        forces = self.forces[index].reshape(-1, 3)
+        names = np.array(self.type_names, dtype=object)
+        return pd.DataFrame({
+            'frame': np.repeat(index, self.natoms),
+            'id': np.tile(np.arange(1, self.natoms + 1), nframes),
+            'type': np.tile(self.types, nframes),
+            'element': np.tile(names[self.types - 1], nframes),
+            'x': positions[:, 0],
+            'y': positions[:, 1],
+            'z': positions[:, 2],
+            'fx': forces[:, 0],
+            'fy': forces[:, 1],
+            'fz': forces[:, 2],
+        })
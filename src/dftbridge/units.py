@@ -0,0 +1,13 @@
+"""
+Unit conversion constants shared by the QE parsers and the LAMMPS writers.
+"""
+
+bohr2ang = 0.529177249
+ry2ev = 13.6056980659
+rad2deg = 57.295779513
+
+# Ry/Bohr -> eV/Angstrom
+ryau2evang = ry2ev / bohr2ang
+
+# kbar (QE stress output) -> bar (LAMMPS metal pressure)
+kbar2bar = 1.0e3
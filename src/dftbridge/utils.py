@@ -2,12 +2,18 @@
 Utility functions for psuedo-lammps package.
 """
 
+from __future__ import annotations
+
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Union, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Union, Optional
 import numpy as np
 
+from .discovery import is_lammps_dump, sniff_files
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def validate_lammps_file(file_path: Union[str, Path]) -> bool:
     """
@@ -61,13 +67,20 @@ def ensure_directory(path: Union[str, Path]) -> Path:
     return path_obj
 
 
-def list_lammps_files(directory: Union[str, Path], pattern: str = "*.dump") -> List[Path]:
+def list_lammps_files(directory: Union[str, Path], pattern: str = "*.dump",
+                      recursive: bool = False, jobs: int = 16) -> List[Path]:
     """
     List LAMMPS dump files in a directory.
+
+    The first line of every candidate is checked concurrently, see
+    ``discovery.sniff_files``; use ``discovery.discover`` for whole trees
+    that are scanned repeatedly.
     
     Args:
         directory: The directory to search in.
         pattern: The file pattern to match.
+        recursive: Also search every subdirectory.
+        jobs: Threads used to check the candidates.
         
     Returns:
         List of Path objects for matching LAMMPS dump files.
@@ -76,8 +89,9 @@ def list_lammps_files(directory: Union[str, Path], pattern: str = "*.dump") -> L
     if not directory_path.exists():
         return []
     
-    files = list(directory_path.glob(pattern))
-    return [f for f in files if validate_lammps_file(f)]
+    files = list(directory_path.rglob(pattern) if recursive else directory_path.glob(pattern))
+    valid = sniff_files([str(f) for f in files], is_lammps_dump, jobs)
+    return [f for f, ok in zip(files, valid) if ok]
 
 
 def extract_box_bounds(data: pd.DataFrame) -> Dict[str, List[float]]:
@@ -0,0 +1,326 @@
+"""
+Vectorized LAMMPS dump writer.
+
+The atom rows of a frame are rendered straight into a fixed-width byte
+buffer with NumPy: every float is rounded to ``precision`` decimals with
+exact integer arithmetic on its mantissa (round half to even on the binary
+value, as ``%f`` does), so the text is byte for byte what ``%22.16f`` gives.
+Small frames, values too large for that, or a layout without fixed-width
+rows fall back to a single ``%`` operation over one flat value tuple, which
+has less fixed cost per frame. Either way a frame is
+written with a single ``write`` call, and the per-frame tables are kept
+between frames and only rebuilt when the atom count changes.
+"""
+
+import os
+from typing import Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from . import stats
+
+COLUMNS = ("id", "type", "x", "y", "z", "fx", "fy", "fz")
+DEFAULT_COLUMNS = ("id", "type", "x", "y", "z")
+FORCE_COLUMNS = ("fx", "fy", "fz")
+_INT_COLUMNS = ("id", "type")
+
+# (xlo_bound, xhi_bound, ylo_bound, yhi_bound, zlo_bound, zhi_bound, xy, xz, yz)
+Box = Tuple[float, float, float, float, float, float, float, float, float]
+
+# ids and types are written as '%-5d', a fixed five characters below this
+_INT_LIMIT = 100000
+# below this many floats per frame the fixed cost of the array path outweighs its speed
+_FIXED_MIN_VALUES = 384
+_SPACE, _NEWLINE, _POINT = b" \n."
+# '0000' .. '9999', four ASCII digits packed in one 32-bit word each
+_DIGIT_GROUPS = np.frombuffer("".join("%04d" % i for i in range(10000)).encode("ascii"),
+                              dtype=np.uint32)
+_INTEGER_TABLES: dict = {}
+
+
+def format_fixed(values: np.ndarray, width: int, precision: int) -> Optional[np.ndarray]:
+    """
+    Render floats as '%{width}.{precision}f' fields in one pass of array operations.
+
+    Each value ``m * 2**-k`` is scaled exactly to ``m * 5**p / 2**(k - p)`` in
+    two 64-bit limbs and rounded half to even, so the digits match ``%``.
+    Values outside the exact range (or not finite) are formatted with ``%``.
+
+    Args:
+        values: Floats to format, any shape.
+        width: Field width.
+        precision: Digits after the decimal point, 1 to 16.
+
+    Returns:
+        np.ndarray: (values.size, width) uint8 array of ASCII characters, or
+        None if some value does not fit in ``width`` characters.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64).ravel()
+    # digits before the point rendered from the table, one character is kept for the sign
+    int_digits = min(width - precision - 2, 4)
+    if not 1 <= precision <= 16 or int_digits < 1:
+        raise ValueError("format_fixed supports 1 to 16 decimals in a field wider than them")
+    scale = 10 ** precision
+    magnitude = np.abs(values)
+    exact = magnitude < min(10.0 ** int_digits, 2.0 ** 63 / scale)
+    magnitude = np.where(exact, magnitude, 0.0)
+
+    # magnitude = mant * 2**(exponent - 53); times 10**p that is (mant * 5**p) >> s
+    fraction, exponent = np.frexp(magnitude)
+    mant = (fraction * 2.0 ** 53).astype(np.uint64)
+    shift = np.clip(53 - exponent.astype(np.int64) - precision, 1, 127).astype(np.uint64)
+    five = 5 ** precision
+    m0, m1 = mant & np.uint64(0xFFFFFFFF), mant >> np.uint64(32)
+    c0, c1 = np.uint64(five & 0xFFFFFFFF), np.uint64(five >> 32)
+    low = m0 * c0
+    middle = m0 * c1 + m1 * c0
+    lo = low + (middle << np.uint64(32))
+    hi = (middle >> np.uint64(32)) + m1 * c1 + (lo < low).astype(np.uint64)
+
+    one = np.uint64(1)
+    small = shift < 64
+    below = np.minimum(shift, 63)
+    above = np.clip(shift.astype(np.int64) - 64, 0, 63).astype(np.uint64)
+    quotient = np.where(small, (lo >> below) | (hi << (np.uint64(64) - below)), hi >> above)
+    quotient[shift > 100] = 0
+    # the first dropped bit, and whether any bit below it is set
+    bit = shift - one
+    bit_lo = np.minimum(bit, 63)
+    bit_hi = np.clip(bit.astype(np.int64) - 64, 0, 63).astype(np.uint64)
+    round_bit = np.where(bit < 64, (lo >> bit_lo) & one, (hi >> bit_hi) & one)
+    sticky = np.where(bit < 64, (lo & ((one << bit_lo) - one)) != 0,
+                      (lo != 0) | ((hi & ((one << bit_hi) - one)) != 0))
+    round_bit[shift > 100] = 0
+    scaled = quotient + (round_bit & (sticky.astype(np.uint64) | (quotient & one)))
+    whole = scaled // np.uint64(scale)
+    # rounding can carry e.g. 9999.9999996 up to 10000.000000, past the table's digits
+    exact &= whole < np.uint64(10 ** int_digits)
+    scaled = np.where(exact, scaled, np.uint64(0))
+    whole = np.where(exact, whole, np.uint64(0))
+
+    # fraction digits in groups of four from a table, the integer part and sign from another
+    out = np.full((len(values), width), _SPACE, dtype=np.uint8)
+    digits = (scaled - whole * np.uint64(scale)) * np.uint64(10 ** (16 - precision))
+    groups = np.empty((len(values), 4), dtype=np.uint32)
+    upper, lower = np.divmod(digits, np.uint64(10 ** 8))
+    groups[:, 0], groups[:, 1] = np.divmod(upper.astype(np.uint32), np.uint32(10000))
+    groups[:, 2], groups[:, 3] = np.divmod(lower.astype(np.uint32), np.uint32(10000))
+    # table rows are gathered as whole 4- and 8-byte words, then viewed as characters
+    start = width - precision
+    out[:, start:] = _DIGIT_GROUPS[groups].view(np.uint8).reshape(-1, 16)[:, :precision]
+    out[:, start - 1] = _POINT
+    index = whole.astype(np.intp) + np.signbit(values) * 10 ** int_digits
+    lead = _integer_table(int_digits)[index].view(np.uint8).reshape(-1, 8)
+    out[:, start - 2 - int_digits:start - 1] = lead[:, 8 - int_digits - 1:]
+
+    for i in np.flatnonzero(~exact):
+        text = ("%*.*f" % (width, precision, values[i])).encode()
+        if len(text) != width:
+            return None
+        out[i] = np.frombuffer(text, dtype=np.uint8)
+    return out
+
+
+class DumpWriter:
+    """
+    Writes frames to a LAMMPS dump file, one ``write`` call per frame.
+
+    The default columns and precision reproduce the layout QExpresso.write
+    has always produced.
+    """
+
+    def __init__(self, fh: TextIO, columns: Sequence[str] = DEFAULT_COLUMNS,
+                 precision: int = 16):
+        """
+        Set up the writer.
+
+        Args:
+            fh: Text file handle the frames are written to.
+            columns: Atom columns to write, any of COLUMNS.
+            precision: Digits after the decimal point for float columns.
+
+        Raises:
+            ValueError: If an unknown column is requested.
+        """
+        unknown = [col for col in columns if col not in COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown dump columns: {', '.join(unknown)}")
+        self.fh = fh
+        self.columns = tuple(columns)
+        self.precision = precision
+
+        # integer columns are pre-formatted strings, only floats are formatted per frame
+        ints = ["%s" for col in self.columns if col in _INT_COLUMNS]
+        floats = ["%%%d.%df" % (precision + 6, precision)
+                  for col in self.columns if col not in _INT_COLUMNS]
+        row = "  ".join(ints)
+        if ints and floats:
+            row += "  "
+        self._row = row + " ".join(floats) + "\n"
+        self._box_row = "%%%d.%df  %%%d.%df  %%%d.%df\n" % ((precision + 6, precision) * 3)
+
+        # rows are rendered as bytes when every field has a fixed width: integer
+        # columns first, then at least one float column, 1 to 16 decimals
+        nints = sum(col in _INT_COLUMNS for col in self.columns)
+        self._fixed = (0 < nints < len(self.columns) and 1 <= precision <= 16
+                       and all(col in _INT_COLUMNS for col in self.columns[:nints]))
+        self._nints = nints
+
+        # reused between frames, rebuilt only when the number of atoms changes
+        self._natoms = -1
+        self._table = np.empty((0, len(self.columns)), dtype=object)
+        self._body = ""
+        self._ids = np.zeros((0, 7), dtype=np.uint8)
+        self._type_labels = np.array(["%-5d" % t for t in range(128)], dtype=object)
+        self._type_bytes = _label_bytes(128)
+
+    def _prepare(self, natoms: int):
+        if natoms == self._natoms:
+            return
+        self._natoms = natoms
+        self._table = np.empty((natoms, len(self.columns)), dtype=object)
+        if "id" in self.columns:
+            self._table[:, self.columns.index("id")] = ["%-5d" % i for i in range(1, natoms + 1)]
+        self._body = self._row * natoms
+        self._ids = _label_bytes(natoms + 1)[1:] if natoms < _INT_LIMIT else self._ids[:0]
+
+    def _format_rows(self, types: Sequence[int], positions: np.ndarray,
+                     forces: Optional[np.ndarray]) -> Optional[str]:
+        """Atom rows rendered as fixed-width bytes, or None if they need the ``%`` path."""
+        natoms = len(positions)
+        types = np.asarray(types, dtype=np.int64)
+        floats = self.columns[self._nints:]
+        if (natoms * len(floats) < _FIXED_MIN_VALUES or natoms >= _INT_LIMIT
+                or int(types.max()) >= _INT_LIMIT):
+            return None
+        blocks = []
+        for col in self.columns[:self._nints]:
+            if col == "id":
+                blocks.append(self._ids)
+            else:
+                top = int(types.max())
+                if top >= len(self._type_bytes):
+                    self._type_bytes = _label_bytes(top + 1)
+                blocks.append(self._type_bytes[types])
+
+        values = np.empty((natoms, len(floats)), dtype=np.float64)
+        for icol, col in enumerate(floats):
+            if col in FORCE_COLUMNS:
+                values[:, icol] = 0.0 if forces is None else forces[:, "xyz".index(col[1])]
+            else:
+                values[:, icol] = positions[:, "xyz".index(col)]
+        width = self.precision + 6
+        fields = format_fixed(values, width, self.precision)
+        if fields is None:
+            return None
+        # every float is followed by a space, the last one of a row by the newline
+        cells = np.full((natoms, len(floats), width + 1), _SPACE, dtype=np.uint8)
+        cells[:, :, :width] = fields.reshape(natoms, len(floats), width)
+        cells[:, -1, width] = _NEWLINE
+        blocks.append(cells.reshape(natoms, -1))
+        return np.concatenate(blocks, axis=1).tobytes().decode("ascii")
+
+    def _type_column(self, types: Sequence[int]) -> np.ndarray:
+        types = np.asarray(types, dtype=np.int64)
+        top = int(types.max()) if len(types) else 0
+        if top >= len(self._type_labels):
+            self._type_labels = np.array(["%-5d" % t for t in range(top + 1)], dtype=object)
+        return self._type_labels[types]
+
+    def format_frame(self, iframe: int, nframes: int, energy: float, box: Box,
+                     types: Sequence[int], positions: np.ndarray,
+                     forces: Optional[np.ndarray] = None) -> str:
+        """
+        Format one frame as dump text.
+
+        Args:
+            iframe: Frame number written in the TIMESTEP line.
+            nframes: Total number of frames (the nsims field).
+            energy: Total energy of the frame.
+            box: Box bounds and tilt factors, see ``Box``.
+            types: LAMMPS type of every atom.
+            positions: (N, 3) Cartesian positions.
+            forces: (N, 3) forces. A frame without them gets zeros in the force
+                columns and a force_weight of 0, so fitting codes ignore them.
+
+        Returns:
+            str: The complete text of the frame.
+        """
+        natoms = len(positions)
+        self._prepare(natoms)
+        force_weight = 0 if forces is None and any(col in FORCE_COLUMNS for col in self.columns) else 1
+        header = self._header(iframe, nframes, energy, box, natoms, force_weight)
+        if self._fixed:
+            body = self._format_rows(types, positions, forces)
+            if body is not None:
+                return header + body
+
+        table = self._table
+        for icol, col in enumerate(self.columns):
+            if col == "type":
+                table[:, icol] = self._type_column(types)
+            elif col in ("x", "y", "z"):
+                table[:, icol] = positions[:, "xyz".index(col)]
+            elif col in FORCE_COLUMNS:
+                table[:, icol] = 0.0 if forces is None else forces[:, "xyz".index(col[1])]
+        return header + self._body % tuple(table.ravel())
+
+    def _header(self, iframe: int, nframes: int, energy: float, box: Box, natoms: int,
+                force_weight: int) -> str:
+        xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = box
+        return (
+            "ITEM: TIMESTEP energy, energy_weight, force_weight, nsims\n"
+            + "%-5d    %-.16f    1    %d   %d\n" % (iframe, energy, force_weight, nframes)
+            + "ITEM: NUMBER OF ATOMS\n"
+            + "%-10d\n" % natoms
+            + "ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+            + self._box_row % (xlo, xhi, xy)
+            + self._box_row % (ylo, yhi, xz)
+            + self._box_row % (zlo, zhi, yz)
+            + "ITEM: ATOMS " + " ".join(self.columns) + "\n"
+        )
+
+    def write_frame(self, iframe: int, nframes: int, energy: float, box: Box,
+                    types: Sequence[int], positions: np.ndarray,
+                    forces: Optional[np.ndarray] = None):
+        """Format one frame (see ``format_frame``) and write it in a single call."""
+        with stats.stage("write") as stage:
+            text = self.format_frame(iframe, nframes, energy, box, types, positions, forces)
+            self.fh.write(text)
+            stage.add(bytes=len(text), lines=len(positions) + 9, frames=1)
+
+
+def _integer_table(digits: int) -> np.ndarray:
+    """
+    Integer part with its sign, right-aligned in 8 characters packed in one 64-bit word,
+    for 0 .. 10**digits - 1 and then their negatives.
+    """
+    table = _INTEGER_TABLES.get(digits)
+    if table is None:
+        text = "".join("%8d" % i for i in range(10 ** digits))
+        text += "".join("%8s" % ("-%d" % i) for i in range(10 ** digits))
+        table = _INTEGER_TABLES[digits] = np.frombuffer(text.encode("ascii"), dtype=np.uint64)
+    return table
+
+
+def _label_bytes(count: int) -> np.ndarray:
+    """(count, 7) uint8 array of '%-5d' followed by two spaces, for 0 .. count - 1."""
+    text = "".join("%-5d  " % i for i in range(count))
+    return np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape(count, 7)
+
+
+def rewrite_nsims(file_path: str, nframes: int):
+    """
+    Rewrite the nsims field (last value after each ITEM: TIMESTEP header) of a finished dump.
+
+    Args:
+        file_path: The dump file, replaced atomically.
+        nframes: New nsims value.
+    """
+    with open(file_path) as src, open(file_path + ".tmp", "w") as dst:
+        for line in src:
+            dst.write(line)
+            if line.startswith("ITEM: TIMESTEP"):
+                values = next(src, "")
+                dst.write(values[:values.rstrip().rfind(" ") + 1] + "%d\n" % nframes)
+    os.replace(file_path + ".tmp", file_path)
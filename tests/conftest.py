@@ -0,0 +1,11 @@
+"""
+Shared test configuration.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_parse_cache(tmp_path, monkeypatch):
+    """Keep the on-disk parse cache out of the tests directory and fresh for every test."""
+    monkeypatch.setenv("DFTBRIDGE_CACHE_DIR", str(tmp_path / "parse-cache"))
@@ -0,0 +1,94 @@
+"""
+Tests for the memoized extraction layer of BaseExtractor.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from dftbridge.extractors.base_extractor import BaseExtractor
+
+
+class CountingExtractor(BaseExtractor):
+    """Minimal extractor that counts how often each quantity is really parsed."""
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.calls = {'coordinates': 0, 'lattice': 0}
+
+    def extract_coordinates(self):
+        self.calls['coordinates'] += 1
+        natoms = len(self.lines)
+        return pd.DataFrame({'element': ['H'] * natoms, 'x': np.arange(natoms, dtype=float)})
+
+    def extract_lattice(self):
+        self.calls['lattice'] += 1
+        return np.eye(3) * 2.0
+
+    def extract_energies(self):
+        return {'total_energy': -1.0}
+
+    def get_calculation_type(self):
+        return 'test'
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / "run.out"
+    path.write_text("atom 1\natom 2\n")
+    return path
+
+
+def test_extract_all_parses_once(output):
+    """Test extract_all and extract_system_info share one parse of each quantity."""
+    extractor = CountingExtractor(str(output))
+    result = extractor.extract_all()
+    extractor.extract_system_info()
+
+    assert extractor.calls == {'coordinates': 1, 'lattice': 1}
+    assert result['system_info']['number_of_atoms'] == 2
+    assert result['system_info']['lattice_volume'] == pytest.approx(8.0)
+    info = extractor.cache_info()
+    assert info['misses'] == 4
+    assert info['hits'] == 3
+
+
+def test_invalidated_when_file_changes(output):
+    """Test a changed file (size/mtime) drops the cached results."""
+    extractor = CountingExtractor(str(output))
+    extractor.read_file()
+    assert len(extractor.extract_coordinates()) == 2
+
+    output.write_text("atom 1\natom 2\natom 3\n")
+    assert len(extractor.extract_coordinates()) == 3
+    assert extractor.calls['coordinates'] == 2
+
+
+def test_clear_cache(output):
+    """Test clear_cache forces a recompute but keeps the counters."""
+    extractor = CountingExtractor(str(output))
+    extractor.read_file()
+    extractor.extract_lattice()
+    extractor.clear_cache()
+    extractor.extract_lattice()
+    assert extractor.calls['lattice'] == 2
+    assert extractor.cache_info() == {'hits': 0, 'misses': 2, 'size': 1}
+
+
+@pytest.mark.parametrize("pattern,expected", [
+    (r"^atom", ["atom 1", "atom 2", "atom 3 x"]),
+    (r"x$", ["atom 3 x"]),
+    (r"2\s+=", ["stress 2   = 0"]),
+    (r"atom\s", ["atom 1", "atom 2", "atom 3 x"]),
+    (r"stress", ["stress 2   = 0"]),
+])
+def test_find_section_matches_stripped_lines(tmp_path, pattern, expected):
+    """Test the mapped search reports the same lines as the per-line search on stripped lines."""
+    path = tmp_path / "run.out"
+    path.write_text("   atom 1\natom 2   \n  atom 3 x  \n# atom 4 x\n     stress 2   = 0\n")
+    mapped = CountingExtractor(str(path))
+    mapped.read_file()
+    decoded = CountingExtractor(str(path))
+    decoded.read_file()
+    decoded.lines
+
+    assert mapped.find_section(pattern) == decoded.find_section(pattern) == expected
@@ -0,0 +1,77 @@
+"""
+Tests for the vectorized block parser.
+"""
+
+import numpy as np
+import pytest
+from dftbridge.blocks import (CARD_FIELDS, FORCE_FIELDS, parse_symbol_column, parse_vector_block,
+                              position_card_rows, tokenize_block)
+
+
+SITES = """\
+         1           Si  tau(   1) = (   0.0000000   0.0000000   0.0000000  )
+         2           Si  tau(   2) = (  -0.2500000   0.2500000   0.2500000  )
+         3           O   tau(   3) = (  -0.1250000   0.1250000   0.1250000  )"""
+
+
+def test_parse_vector_block_sites():
+    """Test a site n. block becomes an (N, 3) float64 array."""
+    coords = parse_vector_block(SITES)
+    assert coords.shape == (3, 3)
+    assert coords.dtype == np.float64
+    np.testing.assert_allclose(coords[1], [-0.25, 0.25, 0.25])
+
+
+def test_parse_vector_block_scale_and_lines():
+    """Test scaling is applied to the whole array and a list of lines is accepted."""
+    coords = parse_vector_block(SITES.splitlines(), scale=2.0)
+    np.testing.assert_allclose(coords[2], [-0.25, 0.25, 0.25])
+
+
+def test_parse_vector_block_first_col():
+    """Test ATOMIC_POSITIONS card lines with trailing if_pos flags."""
+    card = ["Si  0.10  0.20  0.30  0 0 1", "O   0.40  0.50  0.60  1 1 1"]
+    coords = parse_vector_block(card, first_col=1)
+    np.testing.assert_allclose(coords, [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]])
+
+
+def test_fortran_exponents_and_overflow():
+    """Test 'D' exponents are read and '****' overflow fields become NaN."""
+    block = [
+        "atom    1 type  1   force =     1.0D-03   -2.5d+00    3.0E-01",
+        "atom    2 type  1   force =   **********-0.1234567-0.7654321",
+    ]
+    forces = parse_vector_block(block)
+    np.testing.assert_allclose(forces[0], [1.0e-3, -2.5, 0.3])
+    assert np.isnan(forces[1, 0])
+    np.testing.assert_allclose(forces[1, 1:], [-0.1234567, -0.7654321])
+
+
+def test_symbols_and_ragged_block():
+    """Test species labels lose their numeric suffix and ragged blocks are rejected."""
+    table = tokenize_block(["1 Si1 tau( 0.0 0.0 0.0 )", "2 Fe12 tau( 0.1 0.1 0.1 )"])
+    assert parse_symbol_column(table, 1) == ["Si", "Fe"]
+
+    with pytest.raises(ValueError):
+        tokenize_block(["Si 0.0 0.0 0.0", "O 0.1 0.1"])
+    # the field total divides evenly, but the lines still differ
+    with pytest.raises(ValueError):
+        tokenize_block(["Si 0.0 0.0 0.0 1", "O 0.1 0.1", "O 0.2 0.2 0.2"])
+
+
+def test_uniformly_glued_block():
+    """Test values glued on every line are split when the field count is not the expected one."""
+    block = [
+        "atom    1 type  1   force =     0.1234567-0.4567891-0.7891234",
+        "atom    2 type  1   force =    -0.2222222-0.3333333-0.4444444",
+    ]
+    forces = parse_vector_block(block, width=FORCE_FIELDS)
+    np.testing.assert_allclose(forces, [[0.1234567, -0.4567891, -0.7891234],
+                                        [-0.2222222, -0.3333333, -0.4444444]])
+    with pytest.raises(ValueError, match="8 fields"):
+        tokenize_block(["atom 1 type 1 force = 0.1 0.2"], FORCE_FIELDS)
+
+    rows = position_card_rows(["Si  1.0000000-2.0000000-3.0000000",
+                               "O   4.0000000-5.0000000 6.0000000  0 0 1"])
+    positions = parse_vector_block(tokenize_block(rows, CARD_FIELDS), first_col=1)
+    np.testing.assert_allclose(positions, [[1.0, -2.0, -3.0], [4.0, -5.0, 6.0]])
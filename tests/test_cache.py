@@ -0,0 +1,143 @@
+"""
+Tests for the on-disk parse cache.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge import cache
+from dftbridge.extractors.grep import dftbridge
+from dftbridge.frames import iter_frames
+from dftbridge.mash import QExpresso
+from dftbridge.trajectory import Trajectory
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+EXAMPLE = TESTS / "qe_dft_example.txt"
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / "run.out"
+    shutil.copy(RELAX, path)
+    return str(path)
+
+
+def test_trajectory_roundtrip(output):
+    """Test a cached trajectory reloads memory-mapped and equal to the parsed one."""
+    parsed = Trajectory.from_frames(iter_frames(output))
+    assert cache.save_trajectory(output, parsed)
+
+    loaded = cache.load_trajectory(output)
+    assert isinstance(loaded.positions.base, np.memmap) or isinstance(loaded.positions, np.memmap)
+    assert loaded.type_names == parsed.type_names
+    np.testing.assert_array_equal(loaded.types, parsed.types)
+    np.testing.assert_array_equal(loaded.positions, parsed.positions)
+    np.testing.assert_array_equal(loaded.energies, parsed.energies)
+    np.testing.assert_array_equal(loaded.forces, parsed.forces)
+
+
+def test_key_invalidation(output):
+    """Test a changed file or parser version is a miss."""
+    cache.save_trajectory(output, Trajectory.from_frames(iter_frames(output)))
+    assert cache.load_trajectory(output) is not None
+
+    stat = os.stat(output)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.load_trajectory(output) is None
+
+    cache.save_trajectory(output, Trajectory.from_frames(iter_frames(output)))
+    cache.PARSER_VERSION += 1
+    try:
+        assert cache.load_trajectory(output) is None
+    finally:
+        cache.PARSER_VERSION -= 1
+
+
+def test_cache_location(output, tmp_path, monkeypatch):
+    """Test entries go to the user cache directory unless DFTBRIDGE_CACHE=local."""
+    assert cache.cache_dir(output).startswith(str(tmp_path / "parse-cache"))
+    monkeypatch.delenv("DFTBRIDGE_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert cache.cache_dir(output).startswith(str(tmp_path / "xdg" / "dftbridge"))
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    assert cache.cache_dir(output).startswith(str(tmp_path / "home" / ".cache" / "dftbridge"))
+
+    monkeypatch.setenv("DFTBRIDGE_CACHE", "local")
+    assert cache.cache_dir(output) == output + ".dftbcache"
+    assert cache.save_trajectory(output, Trajectory.from_frames(iter_frames(output)))
+    assert cache.load_trajectory(output) is not None
+    assert os.path.isdir(output + ".dftbcache")
+
+
+def test_resave_keeps_mapped_arrays(output):
+    """Test re-caching a changed output leaves trajectories mapped from the old entry intact."""
+    cache.save_trajectory(output, Trajectory.from_frames(iter_frames(output)))
+    first = cache.load_trajectory(output)
+    before = np.array(first.positions)
+
+    text = Path(output).read_text()
+    Path(output).write_text(text[:text.index("!", text.index("!") + 1)])
+    second = cache.cached_trajectory(output, lambda: Trajectory.from_frames(iter_frames(output)))
+    assert len(second) < len(first)
+    np.testing.assert_array_equal(first.positions, before)
+    assert len(os.listdir(os.path.join(cache.cache_dir(output), "trajectory"))) == \
+        len(cache._TRAJECTORY_ARRAYS) + 1
+
+
+def test_eviction_keeps_recent_entries(tmp_path, monkeypatch):
+    """Test the user cache directory is trimmed to its size limit, oldest entries first."""
+    paths = []
+    for name in ("a.out", "b.out", "c.out"):
+        shutil.copy(RELAX, tmp_path / name)
+        paths.append(str(tmp_path / name))
+        assert cache.save_trajectory(paths[-1], Trajectory.from_frames(iter_frames(paths[-1])))
+    cache.load_trajectory(paths[0])
+    os.utime(os.path.join(cache.cache_dir(paths[1]), "trajectory", "meta.json"), (0, 0))
+    for item in os.scandir(os.path.join(cache.cache_dir(paths[1]), "trajectory")):
+        os.utime(item.path, (0, 0))
+
+    size = sum(entry[1] for entry in cache._entries(cache.cache_root()))
+    assert cache.evict(size - 1) == 1
+    assert cache.load_trajectory(paths[1]) is None
+    assert cache.load_trajectory(paths[0]) is not None
+    assert cache.load_trajectory(paths[2]) is not None
+    assert cache.evict(0) == 2
+    assert not os.listdir(cache.cache_root())
+
+
+def test_disabled(output, monkeypatch):
+    """Test DFTBRIDGE_CACHE=0 turns the cache off."""
+    monkeypatch.setenv("DFTBRIDGE_CACHE", "0")
+    assert not cache.save_trajectory(output, Trajectory.from_frames(iter_frames(output)))
+    assert cache.load_trajectory(output) is None
+
+
+def test_qexpresso_uses_cache(output, monkeypatch):
+    """Test QExpresso.readTrajectory fills the cache and then skips parsing."""
+    first = QExpresso(inFile=output).readTrajectory()
+    assert cache.load_trajectory(output) is not None
+
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed although cached")
+
+    monkeypatch.setattr("dftbridge.mash.iter_frames", fail)
+    again = QExpresso(inFile=output).readTrajectory()
+    np.testing.assert_array_equal(again.positions, first.positions)
+    assert [qe.totEnr for qe in QExpresso(inFile=output).iterFrames(1)] == list(first.energies[1:])
+
+
+def test_grep_scan_all_cached(tmp_path):
+    """Test the grep extractor returns the same result from the cache."""
+    path = tmp_path / "scf.out"
+    shutil.copy(EXAMPLE, path)
+    extractor = dftbridge(str(path))
+    first = extractor.scan_all()
+    assert cache.load(str(path), "grep") is not None
+    second = dftbridge(str(path)).scan_all()
+    assert second == first
@@ -0,0 +1,89 @@
+"""
+Tests for the batched LAMMPS cell reduction.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.cell import box_bounds, reduce_cells, restrict_cells, wrap_positions
+from dftbridge.mash import QExpresso
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+
+
+@pytest.fixture
+def cells():
+    """A stack of random right-handed triclinic cells."""
+    rng = np.random.default_rng(7)
+    stack = np.eye(3) * 5.0 + rng.uniform(-1.0, 1.0, size=(6, 3, 3))
+    return stack
+
+
+def test_restricted_form(cells):
+    """Test restricted cells are lower triangular and keep lengths and angles."""
+    restricted = restrict_cells(cells)
+    assert restricted.shape == (6, 3, 3)
+    np.testing.assert_allclose(restricted[:, 0, 1:], 0.0)
+    np.testing.assert_allclose(restricted[:, 1, 2], 0.0)
+    np.testing.assert_allclose(restricted @ restricted.transpose(0, 2, 1),
+                               cells @ cells.transpose(0, 2, 1), atol=1e-12)
+
+
+def test_batch_matches_single_frames(cells):
+    """Test one batched call equals reducing each frame on its own."""
+    batched = restrict_cells(cells)
+    for k, cell in enumerate(cells):
+        np.testing.assert_allclose(restrict_cells(cell)[0], batched[k])
+
+
+def test_box_bounds():
+    """Test bounds of a hexagonal cell, where xy is negative."""
+    a = 3.0
+    cell = np.array([[a, 0, 0], [-a / 2, a * np.sqrt(3) / 2, 0], [0, 0, 5.0]])
+    xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = box_bounds(restrict_cells(cell))[0]
+    assert xy == pytest.approx(-a / 2)
+    assert xlo == pytest.approx(-a / 2)
+    assert xhi == pytest.approx(a)
+    assert (ylo, zlo) == (0.0, 0.0)
+    assert yhi == pytest.approx(a * np.sqrt(3) / 2)
+    assert zhi == pytest.approx(5.0)
+    assert xz == pytest.approx(0.0) and yz == pytest.approx(0.0)
+
+
+def test_positions_and_forces_rotated(cells):
+    """Test fractional coordinates and force magnitudes survive the change of frame."""
+    rng = np.random.default_rng(3)
+    fractional = rng.uniform(0.0, 1.0, size=(6, 4, 3))
+    positions = fractional @ cells
+    forces = rng.normal(size=(6, 4, 3))
+    forces[2] = np.nan
+
+    reduced = reduce_cells(cells, positions, forces)
+    np.testing.assert_allclose(reduced.positions @ np.linalg.inv(reduced.cells), fractional,
+                               atol=1e-12)
+    np.testing.assert_allclose(np.linalg.norm(reduced.forces[0], axis=1),
+                               np.linalg.norm(forces[0], axis=1))
+    assert np.isnan(reduced.forces[2]).all()
+    np.testing.assert_array_equal(reduced.tilts, reduced.bounds[:, 6:9])
+
+
+def test_wrap(cells):
+    """Test wrapped atoms lie inside the cell."""
+    restricted = restrict_cells(cells)
+    fractional = np.array([[[-0.25, 1.5, 0.5], [2.0, -1e-17, 0.999]]]).repeat(6, axis=0)
+    wrapped = wrap_positions(restricted, fractional @ restricted)
+    inside = wrapped @ np.linalg.inv(restricted)
+    assert (inside >= -1e-12).all() and (inside < 1.0 + 1e-12).all()
+    np.testing.assert_allclose(inside[:, 0], [[0.75, 0.5, 0.5]] * 6, atol=1e-12)
+
+
+def test_mash_coordinates_follow_the_cell():
+    """Test QExpresso writes coordinates in the same frame as its box."""
+    qe = QExpresso(inFile=str(RELAX))
+    qe.read()
+    qe.fixCellMat()
+    np.testing.assert_allclose(qe.cartCoords @ np.linalg.inv(qe.cellMat_fixed),
+                               qe.crystalCoords @ np.linalg.inv(qe.cellMat), atol=1e-12)
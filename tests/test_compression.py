@@ -0,0 +1,126 @@
+"""
+Tests for transparent reading of compressed QE outputs.
+"""
+
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.compression import count_occurrences, has_suffix, is_compressed, open_text
+from dftbridge.extractors.grep import dftbridge
+from dftbridge.frame_index import FrameIndex, read_frames
+from dftbridge.frames import iter_frames
+from dftbridge.mash import QExpresso
+from dftbridge.qeio import MappedOutput
+from dftbridge.sections import SectionIndex
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+EXAMPLE = TESTS / "qe_dft_example.txt"
+
+COMPRESSORS = {".gz": gzip.compress, ".xz": lzma.compress, ".bz2": bz2.compress}
+
+
+@pytest.fixture(params=sorted(COMPRESSORS))
+def compressed(request, tmp_path):
+    """The relax example compressed with each standard library codec."""
+    path = tmp_path / ("run.out" + request.param)
+    path.write_bytes(COMPRESSORS[request.param](RELAX.read_bytes()))
+    return str(path)
+
+
+def test_suffixes():
+    """Test compressed outputs are recognised by their suffixes."""
+    assert is_compressed("a.out.gz") and is_compressed("a.out.zst")
+    assert not is_compressed("a.out")
+    assert has_suffix("a.out.xz", ".out") and has_suffix("a.out", ".out")
+    assert not has_suffix("a.in.gz", ".out")
+
+
+def test_open_text(compressed):
+    """Test decompressed text matches the original file."""
+    with open_text(compressed) as fh:
+        assert fh.read() == RELAX.read_text()
+
+
+def test_iter_frames(compressed):
+    """Test frames streamed from a compressed file equal those of the plain file."""
+    plain = list(iter_frames(str(RELAX)))
+    frames = list(iter_frames(compressed))
+    assert len(frames) == len(plain)
+    for got, want in zip(frames, plain):
+        assert got.energy == want.energy
+        np.testing.assert_allclose(got.positions, want.positions)
+
+
+def test_read_frames_range(compressed):
+    """Test frame ranges of compressed files are streamed, not indexed."""
+    assert [f.index for f in read_frames(compressed, 1)] == [1, 2]
+    assert [f.index for f in read_frames(compressed, -1)] == [2]
+    with pytest.raises(ValueError):
+        FrameIndex.open(compressed)
+
+
+def test_qexpresso_read(compressed):
+    """Test QExpresso.read streams a compressed output to the same result."""
+    plain = QExpresso(inFile=str(RELAX))
+    plain.read()
+    qe = QExpresso(inFile=compressed)
+    qe.read()
+    assert qe.symbols == plain.symbols
+    assert qe.totEnr == plain.totEnr
+    np.testing.assert_allclose(qe.cellMat, plain.cellMat)
+    np.testing.assert_allclose(qe.crystalCoords, plain.crystalCoords)
+
+
+def test_grep_scan_all(compressed):
+    """Test the grep extractor reads compressed outputs."""
+    assert dftbridge(compressed).scan_all()["energies"] == dftbridge(str(RELAX)).scan_all()["energies"]
+
+
+def test_section_index_from_stream(tmp_path):
+    """Test the streamed section index has the same spans and blocks as the mapped one."""
+    path = tmp_path / "scf.out.gz"
+    path.write_bytes(gzip.compress(EXAMPLE.read_bytes()))
+    with gzip.open(str(path), "rb") as fh:
+        streamed = SectionIndex.from_stream(fh, reopen=lambda: gzip.open(str(path), "rb"))
+    with MappedOutput(str(EXAMPLE)) as mapped:
+        index = SectionIndex(mapped)
+        for name in ("atomic_positions", "crystal_axes", "forces", "stress"):
+            assert streamed.spans(name) == index.spans(name)
+            for k in range(index.count(name)):
+                assert streamed.block(name, k) == index.block(name, k)
+        assert streamed.header_line("forces", 0) == index.header_line("forces", 0)
+
+
+def test_streamed_index_keeps_last_blocks(tmp_path):
+    """Test only the last block of each section is held; earlier ones need reopen."""
+    path = tmp_path / "scf.out.gz"
+    path.write_bytes(gzip.compress(EXAMPLE.read_bytes()))
+    with gzip.open(str(path), "rb") as fh:
+        streamed = SectionIndex.from_stream(fh)
+    with MappedOutput(str(EXAMPLE)) as mapped:
+        index = SectionIndex(mapped)
+        assert index.count("forces") > 1
+        assert streamed.block("forces") == index.block("forces")
+        assert streamed.block("forces", index.count("forces") - 1) == index.block("forces")
+    with pytest.raises(ValueError):
+        streamed.block("forces", 0)
+
+
+def test_count_occurrences_across_chunks(compressed):
+    """Test a needle split over a chunk boundary is still counted once."""
+    for chunk_size in (7, 64, 1 << 20):
+        assert count_occurrences(compressed, b"!    total energy", chunk_size) == 3
+
+
+def test_zstd(tmp_path):
+    """Test .zst outputs when the optional zstandard package is installed."""
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "run.out.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(RELAX.read_bytes()))
+    assert len(list(iter_frames(str(path)))) == 3
@@ -4,7 +4,8 @@ Tests for the core module.
 
 import pytest
 import pandas as pd
-from dftbridge.core import parse_lammps_dump, LAMMPSDumpParser
+from dftbridge.core import parse_lammps_dump, LAMMPSDumpParser, qe2lammps
+from dftbridge.qeio import MappedOutput
 
 
 def test_parse_lammps_dump():
@@ -39,4 +40,65 @@ def test_lammps_dump_parser_get_atoms_at_timestep():
     """Test LAMMPSDumpParser get_atoms_at_timestep method returns a DataFrame."""
     parser = LAMMPSDumpParser("test.dump")
     atoms_data = parser.get_atoms_at_timestep(1000)
-    assert isinstance(atoms_data, pd.DataFrame) 
\ No newline at end of file
+    assert isinstance(atoms_data, pd.DataFrame) 
+
+@pytest.fixture
+def dump_file(tmp_path):
+    """Three frames written with DumpWriter, timesteps 1..3."""
+    import numpy as np
+    from dftbridge.writer import DumpWriter
+
+    path = tmp_path / "frames.dump"
+    box = (0.0, 5.0, 0.0, 5.0, 0.0, 5.0, 0.0, 0.0, 0.0)
+    with open(path, "w") as fh:
+        writer = DumpWriter(fh, columns=("id", "type", "x", "y", "z", "fx", "fy", "fz"))
+        for iframe in range(1, 4):
+            positions = np.full((4, 3), float(iframe))
+            writer.write_frame(iframe, 3, -10.0 * iframe, box, [1, 1, 2, 2], positions, -positions)
+    return str(path)
+
+
+def test_lammps_dump_parser_indexes_timesteps(dump_file):
+    """Test the timestep index is built on open."""
+    parser = LAMMPSDumpParser(dump_file)
+    assert parser.get_timesteps() == [1, 2, 3]
+    assert len(parser) == 3
+
+
+def test_lammps_dump_parser_reads_one_timestep(dump_file):
+    """Test get_atoms_at_timestep returns only that frame's atoms and metadata."""
+    atoms = LAMMPSDumpParser(dump_file).get_atoms_at_timestep(2)
+    assert list(atoms.columns) == ["id", "type", "x", "y", "z", "fx", "fy", "fz"]
+    assert len(atoms) == 4
+    assert (atoms["x"] == 2.0).all()
+    assert (atoms["fz"] == -2.0).all()
+    assert atoms.attrs["timestep"] == 2
+    assert atoms.attrs["energy"] == pytest.approx(-20.0)
+    assert atoms.attrs["box_bounds"].shape == (3, 3)
+
+
+def test_lammps_dump_parser_missing_timestep(dump_file):
+    """Test an unknown timestep gives an empty DataFrame."""
+    assert LAMMPSDumpParser(dump_file).get_atoms_at_timestep(1000).empty
+
+
+def test_parse_lammps_dump_all_frames(dump_file):
+    """Test parse_lammps_dump stacks every frame with a timestep column."""
+    data = parse_lammps_dump(dump_file)
+    assert len(data) == 12
+    assert sorted(data["timestep"].unique()) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("pattern", [r"^atom", r"x$", r"2\s+=", r"stress"])
+def test_qe2lammps_find_section_matches_stripped_lines(tmp_path, pattern):
+    """Test the mapped search finds the same lines as the per-line search, anchors included."""
+    path = tmp_path / "run.out"
+    path.write_text("   atom 1\natom 2   \n  atom 3 x  \n# atom 4 x\n     stress 2   = 0\n")
+    mapped = qe2lammps(str(path), "atomic")
+    mapped.mapped = MappedOutput(str(path))
+    decoded = qe2lammps(str(path), "atomic")
+    decoded.mapped = MappedOutput(str(path))
+    decoded.lines
+
+    assert mapped.find_section(pattern) == decoded.find_section(pattern)
+    assert mapped.find_section(pattern)
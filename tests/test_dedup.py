@@ -0,0 +1,102 @@
+"""
+Tests for hash-indexed deduplication of configurations.
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge import mash
+from dftbridge.dedup import HashIndex, frame_hashes
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+SPECIES = ["Si", "O", "O", "Si"]
+
+CELL = np.array([[5.0, 0.0, 0.0], [1.0, 6.0, 0.0], [0.5, 0.3, 7.0]])
+
+
+def _positions(seed=0):
+    return np.random.default_rng(seed).random((len(SPECIES), 3)) @ CELL
+
+
+def _rotation(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+def _count_frames(path):
+    return sum(line.startswith("ITEM: TIMESTEP") for line in Path(path).read_text().splitlines())
+
+
+def test_hash_invariances():
+    """Test rotated, wrapped and reordered copies hash alike, other frames do not."""
+    positions = _positions()
+    rotation = _rotation(0.7)
+    order = [3, 1, 0, 2]
+    shifted = positions + np.array([1, -2, 1]) @ CELL
+    cells = np.stack([CELL, CELL @ rotation, CELL, CELL, CELL])
+    stack = np.stack([positions, positions @ rotation, shifted, positions, _positions(1)])
+    digests = frame_hashes(SPECIES, cells, stack)
+    reordered = frame_hashes([SPECIES[i] for i in order], CELL[None], positions[order][None])[0]
+
+    assert digests[0] == digests[1] == digests[2] == digests[3] == reordered
+    assert digests[4] != digests[0]
+    assert frame_hashes(["Si", "O", "Si", "O"], CELL[None], positions[None])[0] != digests[0]
+
+
+def test_hash_tolerance():
+    """Test displacements well below tol are merged and ones above it are not."""
+    positions = _positions()
+    base, close, far = frame_hashes(SPECIES, np.stack([CELL] * 3),
+                                     np.stack([positions, positions + 1e-9, positions + 1e-2]))
+    assert base == close
+    assert base != far
+
+
+def test_index_persists(tmp_path):
+    """Test a saved index dedups a later run and rejects another tolerance."""
+    path = str(tmp_path / "hashes.idx")
+    digests = frame_hashes(SPECIES, np.stack([CELL] * 3),
+                           np.stack([_positions(0), _positions(1), _positions(0)]))
+    first = HashIndex(path)
+    assert first.filter(digests).tolist() == [True, True, False]
+    first.save()
+
+    second = HashIndex(path)
+    assert len(second) == 2
+    assert not second.add(digests[1])
+    assert second.add(frame_hashes(SPECIES, CELL[None], _positions(2)[None])[0])
+    second.save()
+    assert len(HashIndex(path)) == 3
+    with pytest.raises(ValueError):
+        HashIndex(path, tol=1e-3)
+
+
+def test_mash_dedup(tmp_path, monkeypatch):
+    """Test mash --dedup drops repeated files within a batch and against a saved index."""
+    for name in ("a.out", "b.out"):
+        shutil.copy(RELAX, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["mash", "all.dump", "--trajectory", "--dedup"])
+    assert mash.main() == 0
+    single = _count_frames("all.dump")
+    lines = Path("all.dump").read_text().splitlines()
+    assert lines[1].split()[-1] == str(single)
+    # without --dedup-index nothing is kept across runs
+    assert not list(tmp_path.glob("*.idx"))
+    assert mash.main() == 0
+    assert _count_frames("all.dump") == single
+
+    monkeypatch.setattr(sys, "argv", ["mash", "all.dump", "--trajectory", "--dedup",
+                                      "--dedup-index", "hashes.idx"])
+    assert mash.main() == 0
+    assert _count_frames("all.dump") == single
+    # a batch of nothing but known frames fails and leaves the earlier dump alone
+    before = Path("all.dump").read_text()
+    assert mash.main() == 1
+    assert Path("all.dump").read_text() == before
+    assert not Path("all.dump.partial").exists()
@@ -0,0 +1,103 @@
+"""
+Tests for recursive output discovery.
+"""
+
+import gzip
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from dftbridge import discovery
+from dftbridge.discovery import discover, is_lammps_dump, is_qe_output
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "job1").mkdir()
+    (tmp_path / "job2" / "nested").mkdir(parents=True)
+    shutil.copy(RELAX, tmp_path / "top.out")
+    shutil.copy(RELAX, tmp_path / "job1" / "pw.out")
+    with gzip.open(tmp_path / "job2" / "nested" / "md.out.gz", "wb") as fh:
+        fh.write(RELAX.read_bytes())
+    (tmp_path / "job1" / "slurm-1234.out").write_text("srun: job started\n")
+    (tmp_path / "job1" / "notes.txt").write_text("Program PWSCF\n")
+    (tmp_path / "job1" / "pw.out.dftbcache").mkdir()
+    shutil.copy(RELAX, tmp_path / "job1" / "pw.out.dftbcache" / "stray.out")
+    return tmp_path
+
+
+def test_sniffers(tree):
+    """Test header sniffing tells pw.x outputs and dumps from other files."""
+    assert is_qe_output(str(tree / "top.out"))
+    assert is_qe_output(str(tree / "job2" / "nested" / "md.out.gz"))
+    assert not is_qe_output(str(tree / "job1" / "slurm-1234.out"))
+    assert not is_qe_output(str(tree / "missing.out"))
+    dump = tree / "a.dump"
+    dump.write_text("ITEM: TIMESTEP\n0\n")
+    assert is_lammps_dump(str(dump))
+    assert not is_lammps_dump(str(tree / "top.out"))
+
+
+def test_discover_recursive(tree):
+    """Test every pw.x output below the root is found, nothing else."""
+    found = discover(str(tree), jobs=4)
+    assert found == sorted([
+        str(tree / "job1" / "pw.out"),
+        str(tree / "job2" / "nested" / "md.out.gz"),
+        str(tree / "top.out"),
+    ])
+    unsniffed = discover(str(tree), sniffer=None, jobs=1)
+    assert str(tree / "job1" / "slurm-1234.out") in unsniffed
+
+
+def test_manifest_rescans_only_changed_directories(tree, monkeypatch):
+    """Test a repeat scan reuses the manifest and only sniffs new files."""
+    manifest = str(tree / "manifest.json")
+    first = discover(str(tree), manifest=manifest)
+
+    sniffed = []
+    monkeypatch.setitem(discovery.SNIFFERS, 'qe',
+                        lambda path: sniffed.append(path) or is_qe_output(path))
+    assert discover(str(tree), manifest=manifest) == first
+    assert sniffed == []
+
+    listed = []
+    real_list_dir = discovery._list_dir
+    monkeypatch.setattr(discovery, "_list_dir",
+                        lambda path, suffixes: listed.append(os.path.normpath(path))
+                        or real_list_dir(path, suffixes))
+    shutil.copy(RELAX, tree / "job2" / "new.out")
+    found = discover(str(tree), manifest=manifest)
+    assert str(tree / "job2" / "new.out") in found
+    assert sniffed == [os.path.join(str(tree / "job2"), "new.out")]
+    assert listed == [str(tree / "job2")]
+    assert json.loads(Path(manifest).read_text())['dirs']['job2']['files'] == ["new.out"]
+
+
+def test_manifest_ignored_when_settings_change(tree):
+    """Test a manifest written for other suffixes is not reused."""
+    manifest = str(tree / "manifest.json")
+    discover(str(tree), manifest=manifest)
+    (tree / "run.dump").write_text("ITEM: TIMESTEP\n0\n")
+    assert discover(str(tree), ".dump", "lammps", manifest=manifest) == [str(tree / "run.dump")]
+
+
+def test_manifest_rechecks_files_rejected_while_short(tree):
+    """Test an output that was empty when scanned is found once its header is written."""
+    manifest = str(tree / "manifest.json")
+    early = tree / "job1" / "early.out"
+    early.write_text("")
+    assert str(early) not in discover(str(tree), manifest=manifest)
+    assert json.loads(Path(manifest).read_text())['dirs']['job1']['pending'] == \
+        {"early.out": 0, "slurm-1234.out": len("srun: job started\n")}
+
+    mtime = os.stat(tree / "job1").st_mtime_ns
+    early.write_bytes(RELAX.read_bytes())
+    assert os.stat(tree / "job1").st_mtime_ns == mtime
+    assert discover(str(tree), manifest=manifest) == discover(str(tree))
+    assert str(early) in discover(str(tree), manifest=manifest)
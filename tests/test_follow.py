@@ -0,0 +1,150 @@
+"""
+Tests for tail-follow parsing of growing pw.x outputs.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from dftbridge import follow, mash
+from dftbridge.follow import Follower
+from dftbridge.frames import iter_frames
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+# the same run while still going: the last ionic step is not closed yet
+RUNNING = RELAX.read_bytes().split(b"Begin final coordinates")[0]
+
+
+def grow(path, data, sizes):
+    """Write ``data`` to ``path`` in the given cumulative sizes, polling after each one."""
+    follower = Follower(str(path))
+    frames = []
+    with open(path, "wb") as fh:
+        for size in sizes:
+            fh.seek(0, 2)
+            fh.write(data[fh.tell():size])
+            fh.flush()
+            frames.extend(follower.poll())
+    return follower, frames
+
+
+def test_follow_matches_full_parse(tmp_path):
+    """Test frames parsed piece by piece equal those of a full parse."""
+    data = RELAX.read_bytes()
+    expected = list(iter_frames(str(RELAX)))
+    # cut in the middle of lines and blocks on purpose
+    sizes = list(range(97, len(data), 211)) + [len(data)]
+    follower, frames = grow(tmp_path / "run.out", data, sizes)
+    # the last frame is only closed by the end of the job
+    frames.extend(follower.poll(final=True))
+
+    assert [f.index for f in frames] == [f.index for f in expected]
+    for got, want in zip(frames, expected):
+        assert got.energy == want.energy
+        np.testing.assert_allclose(got.positions, want.positions)
+        np.testing.assert_allclose(got.forces, want.forces)
+        np.testing.assert_allclose(got.cell, want.cell)
+    assert follower.done
+
+
+def test_tail_scanned_in_small_chunks(tmp_path, monkeypatch):
+    """Test the end of the last complete line is found when it lies several chunks back."""
+    monkeypatch.setattr(follow, "_TAIL_CHUNK", 7)
+    data = RELAX.read_bytes()
+    sizes = list(range(53, len(data), 389)) + [len(data)]
+    follower, frames = grow(tmp_path / "run.out", data, sizes)
+    frames.extend(follower.poll(final=True))
+    assert [f.energy for f in frames] == [f.energy for f in iter_frames(str(RELAX))]
+
+
+def test_poll_without_changes(tmp_path):
+    """Test a poll on an unchanged file returns nothing."""
+    path = tmp_path / "run.out"
+    path.write_bytes(RUNNING)
+    follower = Follower(str(path))
+    assert len(follower.poll()) == 2
+    assert follower.poll() == []
+    assert not follower.done
+
+
+def test_job_done_closes_last_frame(tmp_path):
+    """Test 'JOB DONE.' releases the final frame without a forced poll."""
+    path = tmp_path / "run.out"
+    path.write_bytes(RUNNING + b"\n   JOB DONE.\n")
+    follower = Follower(str(path))
+    assert len(follower.poll()) == 3
+    assert follower.done
+
+
+def test_resume_from_state(tmp_path):
+    """Test a new follower resumes from a saved state without repeating frames."""
+    data = RELAX.read_bytes()
+    path = tmp_path / "run.out"
+    path.write_bytes(data[: len(data) * 2 // 3])
+    first = Follower(str(path))
+    seen = first.poll()
+
+    path.write_bytes(data)
+    second = Follower(str(path), first.state())
+    rest = second.poll(final=True)
+    assert [f.index for f in seen + rest] == [0, 1, 2]
+
+
+def test_replaced_file_restarts(tmp_path):
+    """Test a truncated or replaced output is parsed again from the start."""
+    path = tmp_path / "run.out"
+    path.write_bytes(RUNNING)
+    follower = Follower(str(path))
+    follower.poll()
+    state = follower.state()
+
+    path.write_bytes(RUNNING[:2000])
+    assert Follower(str(path), state).offset == 0
+    follower.poll()
+    assert follower.offset <= 2000
+
+
+def _timesteps(path):
+    return sum(line.startswith("ITEM: TIMESTEP") for line in Path(path).read_text().splitlines())
+
+
+def test_idle_job_is_finished(tmp_path):
+    """Test followFiles writes the last step of a job that stopped without 'JOB DONE.'."""
+    path = tmp_path / "run.out"
+    path.write_bytes(RUNNING)
+    os.utime(path, (1.0e9, 1.0e9))
+    out = tmp_path / "all.dump"
+    mash.followFiles([str(path)], str(out), ["id", "type", "x", "y", "z"], 8, interval=0, idle=60)
+    assert _timesteps(out) == 3
+
+
+def test_interrupt_leaves_pending_step_for_rerun(tmp_path, monkeypatch):
+    """Test Ctrl-C mid forces block writes only complete steps and a rerun adds the rest."""
+    data = RELAX.read_bytes()
+    second = data.index(b"Forces acting", data.index(b"Forces acting") + 1)
+    cut = data.index(b"force =", data.index(b"force =", second) + 1) + 10
+    path = tmp_path / "run.out"
+    path.write_bytes(data[:cut])
+    out = tmp_path / "all.dump"
+    columns = ["id", "type", "x", "y", "z", "fx", "fy", "fz"]
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(mash.time, "sleep", interrupt)
+    mash.followFiles([str(path)], str(out), columns, 8, interval=1, idle=60)
+    assert _timesteps(out) == 1
+    state = json.loads(Path(str(out) + ".follow").read_text())
+    assert state["frames"] == 1
+    assert state["files"][str(path)]["done"] == 0
+
+    monkeypatch.setattr(mash.time, "sleep", lambda seconds: None)
+    path.write_bytes(data)
+    mash.followFiles([str(path)], str(out), columns, 8, interval=0, idle=60)
+    whole = tmp_path / "whole.out"
+    whole.write_bytes(data)
+    mash.followFiles([str(whole)], str(tmp_path / "whole.dump"), columns, 8, interval=0, idle=60)
+    assert out.read_text() == (tmp_path / "whole.dump").read_text()
@@ -0,0 +1,124 @@
+"""
+Tests for the persistent frame-offset index.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.extractors.qe_scf_extractor import QESCFExtractor
+from dftbridge.frame_index import FrameIndex
+from dftbridge.frames import iter_frames
+
+
+TESTS = Path(__file__).parent
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / "run.out"
+    shutil.copy(TESTS / "qe_dft_example.txt", path)
+    return str(path)
+
+
+def test_index_matches_streaming(output):
+    """Test every frame read through the index equals the streamed frame."""
+    index = FrameIndex.open(output)
+    streamed = list(iter_frames(output))
+    assert len(index) == len(streamed)
+
+    for k in (0, 4, len(streamed) - 1):
+        frame = index.read_frame(k)
+        assert frame.index == k
+        assert frame.energy == streamed[k].energy
+        assert frame.species == streamed[k].species
+        np.testing.assert_array_equal(frame.positions, streamed[k].positions)
+        np.testing.assert_array_equal(frame.forces, streamed[k].forces)
+
+
+def test_read_frames_range(output):
+    """Test a frame range only yields the requested frames."""
+    index = FrameIndex.open(output)
+    assert [f.index for f in index.read_frames(3, 6)] == [3, 4, 5]
+    assert index.read_frame(-1).index == len(index) - 1
+
+
+def test_sidecar_is_reused(output):
+    """Test the .idx sidecar is written and loaded back unchanged."""
+    FrameIndex.open(output)
+    assert os.path.exists(output + ".idx")
+    mtime = os.stat(output + ".idx").st_mtime_ns
+
+    again = FrameIndex.open(output)
+    assert os.stat(output + ".idx").st_mtime_ns == mtime
+    assert len(again) == 10
+
+
+def test_index_extends_when_file_grows(tmp_path):
+    """Test a grown output is indexed incrementally and matches a full rebuild."""
+    data = (TESTS / "qe_dft_example.txt").read_bytes()
+    cut = data.index(b"Forces acting", 3000)
+    path = tmp_path / "live.out"
+    path.write_bytes(data[:cut])
+
+    partial = FrameIndex.open(str(path))
+    with open(path, "ab") as fh:
+        fh.write(data[cut:])
+    grown = FrameIndex.open(str(path))
+
+    rebuilt = FrameIndex(str(path))
+    rebuilt.build()
+    assert len(grown) > len(partial)
+    np.testing.assert_array_equal(grown.offsets, rebuilt.offsets)
+
+
+def test_index_rebuilt_when_file_replaced(output):
+    """Test a replaced output does not reuse the stale sidecar."""
+    FrameIndex.open(output)
+    shutil.copy(TESTS / "qe_relax_example.txt", output)
+    assert len(FrameIndex.open(output)) == 3
+
+
+def test_ranged_vc_relax_frames_keep_stress(tmp_path):
+    """Test frames read through the index carry the stress and pressure of streamed ones."""
+    path = tmp_path / "vc.out"
+    shutil.copy(TESTS / "qe_vcrelax_example.txt", path)
+    streamed = list(iter_frames(str(path)))
+    ranged = list(FrameIndex.open(str(path)).read_frames(1))
+
+    assert len(ranged) == len(streamed) - 1
+    for frame, reference in zip(ranged, streamed[1:]):
+        assert reference.stress is not None
+        np.testing.assert_array_equal(frame.stress, reference.stress)
+        assert frame.pressure == reference.pressure
+        np.testing.assert_array_equal(frame.cell, reference.cell)
+
+
+def test_unwritable_sidecar_keeps_index_in_memory(output, tmp_path):
+    """Test an index whose sidecar cannot be written is still usable."""
+    index_path = str(tmp_path / "read-only" / "run.out.idx")
+    index = FrameIndex.open(output, index_path)
+    assert not os.path.exists(index_path)
+    assert len(index) == 10
+    assert index.read_frame(-1).index == 9
+    assert not index.save()
+
+
+def test_frame_out_of_range(output):
+    """Test an out-of-range frame raises IndexError rather than StopIteration."""
+    with pytest.raises(IndexError, match="frame 10 out of range"):
+        FrameIndex.open(output).read_frame(10)
+    with pytest.raises(IndexError, match="frame 10 out of range"):
+        QESCFExtractor(output).get_frame(10)
+
+
+def test_save_uses_private_temp_file(output):
+    """Test saving does not go through a shared '<idx>.tmp' another process may be writing."""
+    (Path(output + ".idx.tmp")).mkdir()
+    index = FrameIndex.open(output)
+    assert index.save()
+    assert FrameIndex.open(output).offsets.tolist() == index.offsets.tolist()
+    assert sorted(path.name for path in Path(output).parent.glob("run.out*")) == [
+        "run.out", "run.out.idx", "run.out.idx.tmp"]
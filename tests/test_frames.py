@@ -0,0 +1,95 @@
+"""
+Tests for the streaming frame iterator.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.frame_index import read_frames
+from dftbridge.frames import iter_frames
+from dftbridge.units import bohr2ang, ry2ev, ryau2evang
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+EXAMPLE = TESTS / "qe_dft_example.txt"
+
+
+def test_relax_frames():
+    """Test a relax run yields one frame per ionic step, not counting final coordinates."""
+    frames = list(iter_frames(str(RELAX)))
+    assert [f.index for f in frames] == [0, 1, 2]
+    assert frames[0].species == ["Si", "Si", "O"]
+    assert frames[2].energy == pytest.approx(-47.20391011 * ry2ev)
+
+
+def test_relax_units():
+    """Test positions, cells and forces are converted to Angstrom and eV/Angstrom."""
+    first, second = list(iter_frames(str(RELAX)))[:2]
+    alat = 10.2 * bohr2ang
+
+    np.testing.assert_allclose(first.cell[0], [-0.5 * alat, 0.0, 0.5 * alat])
+    np.testing.assert_allclose(first.positions[1], [-0.25 * alat, 0.25 * alat, 0.25 * alat])
+    np.testing.assert_allclose(second.positions[2], np.array([-0.124, 0.126, 0.1245]) * alat)
+    # only the total forces, not the non-local contribution printed after them
+    assert first.forces.shape == (3, 3)
+    np.testing.assert_allclose(first.forces[0], np.array([0.001, 0.002, -0.003]) * ryau2evang)
+
+
+def test_tau_style_positions():
+    """Test outputs whose ATOMIC_POSITIONS lines use the 'n  Si1  tau( x y z )' layout."""
+    frames = list(iter_frames(str(EXAMPLE)))
+    assert len(frames) == 10
+    assert all(f.natoms == 2 for f in frames)
+    assert frames[0].forces is not None
+
+
+def test_iter_frames_is_lazy():
+    """Test frames are produced one at a time from an open binary handle."""
+    with open(RELAX, "rb") as fh:
+        frames = iter_frames(fh)
+        assert next(frames).index == 0
+        assert next(frames).index == 1
+
+
+def test_positions_with_if_pos_flags(tmp_path):
+    """Test input cards where only some rows carry if_pos flags."""
+    text = RELAX.read_text().replace(
+        "Si            0.0000000000        0.0000000000        0.0000000000\n",
+        "Si            0.0000000000        0.0000000000        0.0000000000    0   0   0\n")
+    flagged = tmp_path / "flagged.out"
+    flagged.write_text(text)
+
+    frames = list(iter_frames(str(flagged)))
+    expected = list(iter_frames(str(RELAX)))
+    assert len(frames) == len(expected)
+    for frame, reference in zip(frames, expected):
+        assert frame.species == ["Si", "Si", "O"]
+        np.testing.assert_allclose(frame.positions, reference.positions)
+
+
+def test_truncated_forces_block_dropped(tmp_path):
+    """Test a killed job cut mid forces block keeps the step but not a short forces array."""
+    data = RELAX.read_bytes()
+    second = data.index(b"Forces acting", data.index(b"Forces acting") + 1)
+    path = tmp_path / "killed.out"
+    path.write_bytes(data[:data.index(b"force =", data.index(b"force =", second) + 1) + 10])
+    frames = list(iter_frames(str(path)))
+
+    assert len(frames) == 2
+    assert frames[0].forces.shape == (3, 3)
+    assert frames[1].forces is None
+    assert frames[1].positions.shape == (3, 3)
+
+
+def test_truncated_positions_block_dropped(tmp_path):
+    """Test a step whose positions block came up short of natoms rows is not emitted."""
+    data = RELAX.read_bytes()
+    card = data.index(b"ATOMIC_POSITIONS")
+    path = tmp_path / "short.out"
+    cut = data.index(b"\n", data.index(b"\n", card) + 1) + 1
+    path.write_bytes(data[:cut] + b"\n!    total energy              =     -47.2 Ry\n")
+    frames = list(iter_frames(str(path)))
+    assert [frame.positions.shape for frame in frames] == [(3, 3)]
+    assert [frame.index for frame in read_frames(str(path))] == [0]
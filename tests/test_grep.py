@@ -0,0 +1,64 @@
+"""
+Tests for the grep-style extractor.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.extractors.grep import dftbridge
+from dftbridge.units import ryau2evang
+
+
+EXAMPLE = Path(__file__).parent / "qe_dft_example.txt"
+
+
+@pytest.fixture
+def extractor():
+    return dftbridge(str(EXAMPLE))
+
+
+def test_scan_all_matches_separate_passes(extractor):
+    """Test scan_all returns the same quantities as the individual grep_* passes."""
+    result = extractor.scan_all()
+
+    assert result['numatoms'] == extractor.grep_numatoms()
+    assert result['positions'] == extractor.grep_atomic_positions()
+    assert result['energies'] == extractor.grep_totenergy()
+    assert result['forces'] == extractor.grep_forces()
+    assert result['atomic_forces'] == extractor.grep_atomic_forces()
+    assert result['lattice'] == extractor.grep_lattice()
+
+
+def test_scan_all_example_values(extractor):
+    """Test scan_all picks up every ionic step of the example output."""
+    result = extractor.scan_all()
+
+    assert result['numatoms'] == 2
+    assert extractor.numatoms == 2
+    assert len(result['energies']) == len(result['forces'])
+    assert len(result['positions']) == 2 * len(result['energies'])
+    assert result['energies'][0] == pytest.approx(-15.78901234)
+    assert result['positions'][1] == pytest.approx([0.25, 0.25, 0.25])
+    assert result['lattice'] == [pytest.approx(5.4321)]
+
+
+def test_scan_all_atomic_forces(extractor):
+    """Test per-atom forces of every step come out of the same pass in eV/Angstrom."""
+    result = extractor.scan_all()
+    forces = np.array(result['atomic_forces'])
+    assert forces.shape == (2 * len(result['energies']), 3)
+    np.testing.assert_allclose(forces[1], np.array([-1e-6, -2e-6, -3e-6]) * ryau2evang)
+    # served from the parse cache the second time
+    assert dftbridge(extractor.QEfile).scan_all()['atomic_forces'] == result['atomic_forces']
+
+
+def test_scan_all_missing_quantities(tmp_path):
+    """Test scan_all on a file with none of the patterns returns empty results."""
+    empty = tmp_path / "empty.out"
+    empty.write_text("nothing to see here\n")
+
+    result = dftbridge(str(empty)).scan_all()
+    assert result['numatoms'] == 0
+    assert result['positions'] == []
+    assert result['energies'] == []
@@ -0,0 +1,51 @@
+"""
+Tests for lazy, side-effect free package imports.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import dftbridge
+
+
+SRC = Path(dftbridge.__file__).resolve().parent.parent
+
+MODULES = sorted(
+    "dftbridge." + str(path.relative_to(SRC / "dftbridge").with_suffix("")).replace(os.sep, ".")
+    for path in (SRC / "dftbridge").rglob("*.py") if path.name != "__init__.py"
+)
+
+
+def _run(code, cwd):
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          cwd=str(cwd), env=env, check=True)
+
+
+def test_conversion_path_skips_pandas(tmp_path):
+    """Test importing the package and the NumPy-only converter leaves pandas unloaded."""
+    out = _run("import sys, dftbridge, dftbridge.mash, dftbridge.extractors.grep; "
+               "print('pandas' in sys.modules)", tmp_path)
+    assert out.stdout.split() == ["False"]
+
+
+def test_lazy_attributes(tmp_path):
+    """Test extractors and submodules resolve on first access."""
+    out = _run("import sys, dftbridge; before = 'pandas' in sys.modules; "
+               "from dftbridge import QERelaxedVCExtractor; "
+               "print(before, dftbridge.stats.__name__, 'QESCFExtractor' in dir(dftbridge))",
+               tmp_path)
+    assert out.stdout.split() == ["False", "dftbridge.stats", "True"]
+    with pytest.raises(AttributeError):
+        dftbridge.no_such_name
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_has_no_side_effects(tmp_path, module):
+    """Test importing a module prints nothing and creates no files."""
+    out = _run(f"import {module}", tmp_path)
+    assert out.stdout == "" and out.stderr == ""
+    assert list(tmp_path.iterdir()) == []
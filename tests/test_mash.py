@@ -0,0 +1,91 @@
+"""
+Tests for the mash.py QE -> LAMMPS converter.
+"""
+
+import gzip
+import io
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.mash import QExpresso, convertBatch
+from dftbridge.units import ryau2evang
+from dftbridge.species import SpeciesRegistry
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+
+
+@pytest.fixture
+def batch(tmp_path):
+    files = []
+    for name in ("a.out", "b.out", "c.out"):
+        shutil.copy(RELAX, tmp_path / name)
+        files.append(str(tmp_path / name))
+    bad = tmp_path / "bad.out"
+    bad.write_text("not a pw.x output\n")
+    files.insert(1, str(bad))
+    return files
+
+
+def test_read_single_frame():
+    """Test read() picks up the cell, coordinates and final energy."""
+    qe = QExpresso(inFile=str(RELAX))
+    qe.read()
+    qe.fixCellMat()
+    assert qe.nAtoms == 3
+    assert qe.symbols == ["Si", "Si", "O"]
+    assert qe.types == [2, 2, 1]
+    assert qe.cartCoords.shape == (3, 3)
+
+
+def test_read_forces(tmp_path):
+    """Test the first total force block is read (mapped and streamed) and written as fx fy fz."""
+    packed = tmp_path / "relax.out.gz"
+    with gzip.open(packed, "wb") as fh:
+        fh.write(RELAX.read_bytes())
+    for path in (RELAX, packed):
+        qe = QExpresso(inFile=str(path))
+        qe.read()
+        assert qe.forces.shape == (3, 3)
+        np.testing.assert_allclose(qe.forces[0], np.array([0.001, 0.002, -0.003]) * ryau2evang)
+
+    qe.fixCellMat()
+    out = io.StringIO()
+    qe.write(out, 1, 1)
+    lines = out.getvalue().splitlines()
+    assert lines[8] == "ITEM: ATOMS id type x y z fx fy fz"
+    np.testing.assert_allclose(np.linalg.norm([float(v) for v in lines[9].split()[5:]]),
+                               np.linalg.norm(qe.forces[0]))
+
+
+def test_shared_registry_types():
+    """Test a batch-wide registry types single frames and trajectories the same way."""
+    registry = SpeciesRegistry(["Al", "O", "Si"])
+    qe = QExpresso(inFile=str(RELAX), registry=registry)
+    qe.read()
+    assert qe.types == [3, 3, 2]
+    traj = QExpresso(inFile=str(RELAX)).readTrajectory()
+    assert registry.remap(traj.type_names, traj.types).tolist() == [3, 3, 2]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_convert_batch_order_and_failures(batch, jobs):
+    """Test results keep the input order and a bad file is reported, not raised."""
+    results = list(convertBatch(batch, jobs=jobs))
+    assert [r[0] for r in results] == batch
+
+    errors = {r[0]: r[2] for r in results}
+    assert errors[batch[1]] is not None
+    assert all(errors[f] is None for f in batch if f != batch[1])
+    assert all(len(r[1]) == 1 for r in results if r[2] is None)
+
+
+def test_convert_batch_trajectory(batch):
+    """Test trajectory mode returns every ionic step of each file."""
+    results = list(convertBatch([batch[0]], jobs=2, trajectory=True))
+    traj = results[0][1]
+    assert len(traj) == 3
+    assert traj.energies[0] != traj.energies[2]
@@ -0,0 +1,82 @@
+"""
+Tests for the pipelined read/parse/write conversion.
+"""
+
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+from dftbridge.mash import QExpresso, convertBatch, fixFrameCount, pipelineBatch
+from dftbridge.pipeline import prefetch, run_pipeline
+from dftbridge.writer import DumpWriter
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+
+def _square(x):
+    return x * x
+
+
+def test_run_pipeline_keeps_order():
+    """Test results come back in input order from the thread and the process parser."""
+    assert list(run_pipeline(range(20), _square, read=lambda x: None, depth=3)) == \
+        [x * x for x in range(20)]
+    assert list(run_pipeline(range(20), _square, read=lambda x: None, jobs=2, depth=5)) == \
+        [x * x for x in range(20)]
+
+
+def test_run_pipeline_bounded_lookahead():
+    """Test no more than depth items are read ahead of the consumer."""
+    lock = threading.Lock()
+    read = []
+
+    def record(x):
+        with lock:
+            read.append(x)
+
+    for consumed, _ in enumerate(run_pipeline(range(50), _square, read=record, depth=4), 1):
+        with lock:
+            assert len(read) <= consumed + 3
+    assert sorted(read) == list(range(50))
+
+
+def test_prefetch_reads_whole_file(tmp_path):
+    """Test prefetch reports the file size and tolerates missing files."""
+    assert prefetch(str(RELAX), chunk_size=64) == RELAX.stat().st_size
+    assert prefetch(str(tmp_path / "missing.out")) == 0
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_pipeline_batch_matches_convert_batch(tmp_path, jobs):
+    """Test pipelineBatch gives convertBatch's results, bad files included."""
+    files = []
+    for name in ("a.out", "b.out", "c.out"):
+        shutil.copy(RELAX, tmp_path / name)
+        files.append(str(tmp_path / name))
+    (tmp_path / "bad.out").write_text("not a pw.x output\n")
+    files.insert(1, str(tmp_path / "bad.out"))
+
+    expected = list(convertBatch(files, trajectory=True))
+    results = list(pipelineBatch(files, jobs, trajectory=True, depth=2))
+    assert [r[0] for r in results] == files
+    assert [r[2] for r in results] == [r[2] for r in expected]
+    assert [len(r[1]) for r in results] == [len(r[1]) for r in expected] == [3, 0, 3, 3]
+
+
+def test_fix_frame_count(tmp_path):
+    """Test the nsims field of every frame is rewritten."""
+    out = tmp_path / "all.dump"
+    qe = QExpresso(inFile=str(RELAX))
+    qe.read()
+    qe.fixCellMat()
+    with open(out, "w") as fh:
+        writer = DumpWriter(fh)
+        qe.write(fh, 10, 1, writer)
+        qe.write(fh, 10, 2, writer)
+    fixFrameCount(str(out), 2)
+    lines = out.read_text().splitlines()
+    headers = [lines[i + 1] for i, line in enumerate(lines) if line.startswith("ITEM: TIMESTEP")]
+    assert [h.split()[-1] for h in headers] == ["2", "2"]
+    assert [h.split()[0] for h in headers] == ["1", "2"]
@@ -0,0 +1,82 @@
+"""
+Tests for the concrete Quantum ESPRESSO extractors.
+"""
+
+import gzip
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge import QERelaxedExtractor, QERelaxedVCExtractor, QESCFExtractor
+from dftbridge.frames import iter_frames
+from dftbridge.units import kbar2bar
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+VCRELAX = TESTS / "qe_vcrelax_example.txt"
+
+
+def test_scf_and_relax_extractors():
+    """Test coordinates, cell and energies come from the last converged step."""
+    frames = list(iter_frames(str(RELAX)))
+    scf = QESCFExtractor(str(RELAX))
+    coordinates = scf.extract_coordinates()
+    assert list(coordinates['element']) == ["Si", "Si", "O"]
+    np.testing.assert_allclose(coordinates[['x', 'y', 'z']].to_numpy(), frames[-1].positions)
+    np.testing.assert_allclose(scf.extract_lattice(), frames[-1].cell)
+    assert scf.get_calculation_type() == 'scf'
+
+    energies = QERelaxedExtractor(str(RELAX)).extract_energies()
+    assert energies['ionic_steps'] == 3
+    assert energies['total_energy'] == pytest.approx(frames[-1].energy)
+    assert energies['relaxation_energy'] == pytest.approx(frames[-1].energy - frames[0].energy)
+
+
+def test_vc_relax_steps():
+    """Test every step's cell, stress, pressure, energy and positions are stacked."""
+    steps = QERelaxedVCExtractor(str(VCRELAX)).extract_steps()
+    assert steps['species'] == ["Si", "O", "Si", "O"]
+    assert steps['energies'].shape == (3,)
+    assert steps['cells'].shape == (3, 3, 3)
+    assert steps['positions'].shape == (3, 4, 3)
+    assert steps['stress'].shape == (3, 3, 3)
+    # the cell changes between steps and P= is the trace of the kbar tensor / 3
+    assert not np.allclose(steps['cells'][0], steps['cells'][1])
+    np.testing.assert_allclose(np.trace(steps['stress'], axis1=1, axis2=2) / 3,
+                               steps['pressure'], atol=0.01 * kbar2bar)
+
+    lines = VCRELAX.read_text().splitlines()
+    header = next(i for i, line in enumerate(lines) if "total   stress" in line)
+    assert steps['pressure'][0] == pytest.approx(float(lines[header].split("P=")[1]) * kbar2bar)
+    np.testing.assert_allclose(steps['stress'][0, 0],
+                               [float(v) * kbar2bar for v in lines[header + 1].split()[3:]])
+
+
+def test_vc_relax_compressed_and_cached(tmp_path):
+    """Test a compressed output gives the same arrays, and a second extractor hits the cache."""
+    packed = tmp_path / "vc.out.gz"
+    with gzip.open(packed, "wb") as fh:
+        fh.write(VCRELAX.read_bytes())
+    plain = QERelaxedVCExtractor(str(VCRELAX)).extract_steps()
+    streamed = QERelaxedVCExtractor(str(packed)).extract_steps()
+    again = QERelaxedVCExtractor(str(packed)).extract_steps()
+    for name in ("cells", "stress", "pressure", "positions"):
+        np.testing.assert_allclose(streamed[name], plain[name])
+        np.testing.assert_array_equal(again[name], streamed[name])
+
+    result = QERelaxedVCExtractor(str(packed)).extract_all()
+    np.testing.assert_allclose(result['lattice'], plain['cells'][-1])
+    assert result['energies']['pressure'] == pytest.approx(plain['pressure'][-1])
+    assert result['system_info']['calculation_type'] == 'vc-relax'
+
+
+def test_no_steps_raises(tmp_path):
+    """Test an output without a converged step is reported clearly."""
+    empty = tmp_path / "empty.out"
+    shutil.copy(RELAX, empty)
+    empty.write_text("\n".join(line for line in RELAX.read_text().splitlines()
+                               if "total energy" not in line))
+    with pytest.raises(ValueError, match="No converged ionic step"):
+        QERelaxedVCExtractor(str(empty)).extract_energies()
@@ -0,0 +1,52 @@
+"""
+Tests for the memory-mapped QE output layer.
+"""
+
+from pathlib import Path
+
+from dftbridge.qeio import MappedOutput
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+
+def test_find_all_energy_anchors():
+    """Test every '!    total energy' line is found at a byte offset."""
+    with MappedOutput(str(RELAX)) as mapped:
+        offsets = mapped.find_all('energy')
+        assert len(offsets) == 3
+        assert all(mapped.line_at(off).startswith("!    total energy") for off in offsets)
+
+
+def test_lines_after_and_block_after():
+    """Test decoding only the block that follows an anchor."""
+    with MappedOutput(str(RELAX)) as mapped:
+        cell = mapped.lines_after(mapped.find('cell'), 3)
+        assert len(cell) == 3
+        assert "a(1)" in cell[0] and "a(3)" in cell[2]
+
+        sites = mapped.block_after(mapped.find('sites'))
+        assert len(sites) == 3
+        assert "O" in sites[2]
+
+        forces = mapped.block_after(mapped.rfind('forces'), skip_blank=True)
+        assert len(forces) == 3
+        assert forces[0].split()[0] == "atom"
+
+
+def test_grep_returns_matching_lines():
+    """Test regex search on the raw bytes returns decoded matching lines."""
+    with MappedOutput(str(RELAX)) as mapped:
+        lines = mapped.grep(r"Total force")
+        assert len(lines) == 3
+        assert all("Total force" in line for line in lines)
+
+
+def test_empty_file(tmp_path):
+    """Test an empty file can be opened and searched."""
+    empty = tmp_path / "empty.out"
+    empty.write_bytes(b"")
+    with MappedOutput(str(empty)) as mapped:
+        assert mapped.find('energy') == -1
+        assert mapped.find_all('positions') == []
+        assert mapped.grep("anything") == []
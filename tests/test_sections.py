@@ -0,0 +1,81 @@
+"""
+Tests for the one-pass section span index.
+"""
+
+from pathlib import Path
+
+import pytest
+from dftbridge.core import qe2lammps
+from dftbridge.qeio import MappedOutput
+from dftbridge.sections import SectionIndex
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+EXAMPLE = TESTS / "qe_dft_example.txt"
+
+
+def test_all_sections_indexed():
+    """Test every occurrence of each named section gets a span."""
+    with MappedOutput(str(RELAX)) as mapped:
+        index = SectionIndex(mapped)
+        assert index.count('crystal_axes') == 1
+        assert index.count('forces') == 3
+        assert index.count('atomic_positions') == 3
+        assert 'cell_parameters' not in index
+        assert index.block('cell_parameters') == []
+
+
+def test_block_spans():
+    """Test blocks skip the blank line after a header and stop at the next blank line."""
+    with MappedOutput(str(EXAMPLE)) as mapped:
+        index = SectionIndex(mapped)
+        axes = index.block('crystal_axes', 0)
+        assert len(axes) == 3
+        assert axes[0].strip().startswith("a(1)")
+
+        forces = index.block('forces', 0)
+        assert len(forces) == 2
+        assert all("force =" in line for line in forces)
+
+        stress = index.block('stress', 0)
+        assert len(stress) == 3
+
+        start, end = index.spans('atomic_positions')[0]
+        assert mapped.decode(start, end).splitlines() == index.block('atomic_positions', 0)
+        assert index.header_line('atomic_positions', 0) == "ATOMIC_POSITIONS (alat units)"
+
+
+def test_card_ends_block(tmp_path):
+    """Test an input card directly after a block ends it."""
+    path = tmp_path / "pw.in"
+    path.write_text(
+        "CELL_PARAMETERS {angstrom}\n"
+        " 5.0 0.0 0.0\n 0.0 5.0 0.0\n 0.0 0.0 5.0\n"
+        "ATOMIC_POSITIONS {crystal}\n"
+        "Si 0.0 0.0 0.0\nSi 0.25 0.25 0.25 0 0 1\n"
+        "K_POINTS automatic\n 4 4 4 0 0 0\n"
+    )
+    with MappedOutput(str(path)) as mapped:
+        index = SectionIndex(mapped)
+        assert len(index.block('cell_parameters')) == 3
+        assert len(index.block('atomic_positions')) == 2
+
+
+def test_qe2lammps_slices_blocks(tmp_path):
+    """Test qe2lammps parses its coordinate and lattice blocks through the index."""
+    path = tmp_path / "pw.in"
+    path.write_text(
+        "CELL_PARAMETERS {angstrom}\n"
+        " 5.0 0.0 0.0\n 0.0 5.0 0.0\n 0.0 0.0 5.0\n\n"
+        "ATOMIC_POSITIONS {crystal}\n"
+        "Si 0.0 0.0 0.0\nO1 0.25 0.25 0.25 0 0 1\n\n"
+    )
+    converter = qe2lammps(str(path), "atomic")
+    converter.extractdata()
+    coords = converter.coordinates_data
+    assert coords['element'].tolist() == ["Si", "O"]
+    assert coords['z'].tolist() == pytest.approx([0.0, 0.25])
+    assert coords.attrs['units'] == "crystal"
+    assert converter.lattice_data[2, 2] == pytest.approx(5.0)
+    assert converter.lattice_units == "angstrom"
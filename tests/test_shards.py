@@ -0,0 +1,93 @@
+"""
+Tests for sharded dump output.
+"""
+
+import io
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge import mash
+from dftbridge.shards import ShardedDump, load_manifest, manifest_path, parse_size
+from dftbridge.writer import DumpWriter
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+BOX = (0.0, 5.0, 0.0, 5.0, 0.0, 5.0, 0.0, 0.0, 0.0)
+
+
+def _frames(n):
+    rng = np.random.default_rng(0)
+    return [(i + 1, -float(i), rng.random((2 + i % 3, 3))) for i in range(n)]
+
+
+def _write(writer, frames, nframes):
+    for iframe, energy, positions in frames:
+        writer.write_frame(iframe, nframes, energy, BOX, [1] * len(positions), positions)
+
+
+def test_parse_size():
+    """Test sizes with and without unit suffixes."""
+    assert parse_size("4096") == 4096
+    assert parse_size("512k") == 512 * 1024
+    assert parse_size("1.5GB") == 3 << 29
+    with pytest.raises(ValueError):
+        parse_size("0M")
+
+
+def test_shard_count_matches_single_file(tmp_path):
+    """Test N shards split the frames evenly and concatenate to the single-file dump."""
+    frames = _frames(7)
+    single = io.StringIO()
+    _write(DumpWriter(single), frames, 7)
+
+    out = str(tmp_path / "all.dump")
+    sharded = ShardedDump(out, 7, shards=3)
+    _write(sharded, frames, 7)
+    manifest = sharded.close()
+
+    assert [(s['first_frame'], s['last_frame'], s['frames']) for s in manifest['shards']] == \
+        [(1, 3, 3), (4, 6, 3), (7, 7, 1)]
+    loaded = load_manifest(manifest_path(out))
+    assert loaded['nsims'] == 7
+    text = "".join(Path(s['path']).read_text() for s in loaded['shards'])
+    assert text == single.getvalue()
+    assert [s['bytes'] for s in loaded['shards']] == \
+        [Path(s['path']).stat().st_size for s in loaded['shards']]
+
+
+def test_size_cap_and_nsims_fix(tmp_path):
+    """Test shards stay under the byte cap and nsims is rewritten on close."""
+    frames = _frames(10)
+    out = str(tmp_path / "all.dump")
+    sharded = ShardedDump(out, 99, max_bytes=1500, precision=4)
+    _write(sharded, frames, 99)
+    manifest = sharded.close(10)
+
+    assert len(manifest['shards']) > 1
+    assert all(s['bytes'] <= 1500 for s in manifest['shards'])
+    assert sum(s['frames'] for s in manifest['shards']) == 10
+    for shard in manifest['shards']:
+        lines = (tmp_path / shard['file']).read_text().splitlines()
+        headers = [lines[i + 1] for i, line in enumerate(lines) if line.startswith("ITEM: TIMESTEP")]
+        assert all(line.split()[-1] == "10" for line in headers)
+    assert json.loads(Path(manifest_path(out)).read_text())['nsims'] == 10
+
+
+def test_mash_shard_frames(tmp_path, monkeypatch):
+    """Test mash --trajectory --shard-frames writes shards with global numbering."""
+    for name in ("a.out", "b.out"):
+        shutil.copy(RELAX, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["mash", "all.dump", "--trajectory", "--shard-frames", "4"])
+    assert mash.main() == 0
+
+    manifest = load_manifest("all.shards.json")
+    assert [(s['first_frame'], s['last_frame']) for s in manifest['shards']] == [(1, 4), (5, 6)]
+    assert not Path("all.dump").exists()
+    second = Path(manifest['shards'][1]['path']).read_text().splitlines()
+    assert second[1].split()[0] == "5" and second[1].split()[-1] == "6"
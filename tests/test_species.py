@@ -0,0 +1,70 @@
+"""
+Tests for the element table and the batch-wide species registry.
+"""
+
+import gzip
+import shutil
+from pathlib import Path
+
+from dftbridge.frames import iter_frames
+from dftbridge.species import (MASSES, SYMBOLS, SpeciesRegistry, assign_types,
+                               element_of, element_table, read_species)
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+
+def test_periodic_table():
+    """Test the table covers every element with numbers matching their index."""
+    table = element_table()
+    assert len(SYMBOLS) == len(MASSES) == 119
+    assert table['Fe'] == {'number': 26, 'mass': 55.845}
+    assert table['Og']['number'] == 118
+    assert element_of("Fe1") == "Fe" and element_of("O_up") == "O" and element_of("si") == "Si"
+
+
+def test_assign_types_vectorized():
+    """Test types follow the sorted distinct symbols, or a given table."""
+    names, types = assign_types(["Si", "Si", "O"])
+    assert names == ["O", "Si"] and types.tolist() == [2, 2, 1]
+    assert assign_types(["O", "Si"], ["Si", "O"])[1].tolist() == [2, 1]
+    assert assign_types([])[1].tolist() == []
+
+
+def test_registry_ids_stay_stable():
+    """Test new symbols are appended, never renumbering existing types."""
+    registry = SpeciesRegistry(["Si", "O"])
+    assert registry.types(["Si", "O", "Si"]).tolist() == [2, 1, 2]
+    assert registry.types(["H", "Si"]).tolist() == [3, 2]
+    assert registry.type_names == ["O", "Si", "H"]
+    assert registry.remap(["H", "O"], [1, 2, 2]).tolist() == [3, 1, 1]
+    assert registry.masses().tolist() == [15.999, 28.085, 1.008]
+
+
+def test_registry_from_headers(tmp_path):
+    """Test one table is built over the species tables of every file."""
+    shutil.copy(RELAX, tmp_path / "a.out")
+    other = RELAX.read_text().replace("        O              6.00",
+                                      "        Al             3.00")
+    with gzip.open(tmp_path / "b.out.gz", "wt") as fh:
+        fh.write(other)
+    assert read_species(str(tmp_path / "a.out")) == ["Si", "O"]
+    assert read_species(str(tmp_path / "missing.out")) == []
+    registry = SpeciesRegistry.from_files([str(tmp_path / "a.out"), str(tmp_path / "b.out.gz")])
+    assert registry.type_names == ["Al", "O", "Si"]
+
+
+def test_registry_numbered_labels(tmp_path):
+    """Test numbered header labels ('Si1') type atoms the same as their element."""
+    numbered = RELAX.read_text().replace("        Si             4.00",
+                                         "        Si1            4.00")
+    numbered = numbered.replace("           Si  tau(", "           Si1 tau(")
+    numbered = numbered.replace("\nSi  ", "\nSi1 ")
+    (tmp_path / "a.out").write_text(numbered)
+    assert read_species(str(tmp_path / "a.out")) == ["Si1", "O"]
+
+    registry = SpeciesRegistry.from_files([str(tmp_path / "a.out")])
+    assert registry.type_names == ["O", "Si"]
+    species = next(iter_frames(str(tmp_path / "a.out"))).species
+    assert registry.types(species).tolist() == [2, 2, 1]
+    assert registry.type_names == ["O", "Si"]
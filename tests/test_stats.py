@@ -0,0 +1,98 @@
+"""
+Tests for the opt-in per-stage instrumentation.
+"""
+
+import io
+import json
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from dftbridge import stats
+from dftbridge.frames import iter_frames
+from dftbridge.mash import QExpresso, convertBatch
+from dftbridge.writer import DumpWriter
+
+
+RELAX = Path(__file__).parent / "qe_relax_example.txt"
+
+
+def test_disabled_records_nothing():
+    """Test stages outside a collect() block share the no-op stand-in."""
+    assert not stats.enabled()
+    with stats.stage("read") as stage:
+        stage.add(bytes=10)
+    assert stage is stats.stage("write")
+
+
+def test_mash_pipeline_stages():
+    """Test read, parse, cell and write are each recorded with their counters."""
+    with stats.collect() as collector:
+        qe = QExpresso(inFile=str(RELAX))
+        qe.read()
+        qe.fixCellMat()
+        qe.write(io.StringIO(), 1, 1)
+    stages = collector.to_dict()['stages']
+
+    assert set(stages) >= {'read', 'parse', 'cell', 'write'}
+    assert stages['read']['bytes'] == RELAX.stat().st_size
+    assert stages['read']['frames'] == 1
+    assert stages['cell']['calls'] == 1
+    assert stages['write']['lines'] == 3 + 9
+    assert all(s['seconds'] >= 0 and s['peak_rss'] >= 0 for s in stages.values())
+    assert not stats.enabled()
+
+
+def test_scan_counters_and_callback():
+    """Test iter_frames reports bytes, lines and frames, and the callback sees each call."""
+    calls = []
+    with stats.collect(callback=lambda name, counts: calls.append(name)) as collector:
+        frames = list(iter_frames(str(RELAX)))
+    scan = collector.stages['scan']
+    assert scan['frames'] == len(frames) == 3
+    assert scan['bytes'] == RELAX.stat().st_size
+    assert scan['lines'] == len(RELAX.read_text().splitlines())
+    assert 'scan' in calls and 'parse' in calls
+
+
+def test_worker_stats_merged(tmp_path):
+    """Test stage totals from pool workers end up in the parent's collector."""
+    files = []
+    for name in ("a.out", "b.out"):
+        shutil.copy(RELAX, tmp_path / name)
+        files.append(str(tmp_path / name))
+    with stats.collect() as collector:
+        results = list(convertBatch(files, jobs=2))
+    assert [r[0] for r in results] == files
+    assert collector.stages['read']['calls'] == 2
+    assert collector.stages['cell']['frames'] == 2
+
+
+def test_dump_json(tmp_path):
+    """Test the JSON dump round-trips the totals."""
+    with stats.collect() as collector:
+        DumpWriter(io.StringIO()).write_frame(1, 1, -1.0, (0, 1, 0, 1, 0, 1, 0, 0, 0),
+                                              [1], np.zeros((1, 3)))
+    path = tmp_path / "stats.json"
+    collector.dump(str(path))
+    data = json.loads(path.read_text())
+    assert data['stages']['write']['frames'] == 1
+    assert data['wall_seconds'] >= 0
+
+
+def test_record_from_threads():
+    """Test stages recorded from several threads at once lose no updates."""
+    collector = stats.Collector()
+
+    def work():
+        for _ in range(2000):
+            collector.record("read", {'calls': 1, 'bytes': 3}, peak=0)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert collector.to_dict()['stages']['read']['calls'] == 16000
+    assert collector.to_dict()['stages']['read']['bytes'] == 48000
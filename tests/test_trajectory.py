@@ -0,0 +1,80 @@
+"""
+Tests for the columnar Trajectory container.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from dftbridge.frames import Frame, iter_frames
+from dftbridge.trajectory import Trajectory
+
+
+TESTS = Path(__file__).parent
+RELAX = TESTS / "qe_relax_example.txt"
+
+
+def test_from_frames():
+    """Test frames are stacked frame-major with compact type ids."""
+    frames = list(iter_frames(str(RELAX)))
+    traj = Trajectory.from_frames(frames)
+
+    assert len(traj) == 3
+    assert traj.positions.shape == (3, 3, 3)
+    assert traj.cells.shape == (3, 3, 3)
+    assert traj.type_names == ["O", "Si"]
+    assert traj.types.tolist() == [2, 2, 1]
+    assert traj.species == ["Si", "Si", "O"]
+    np.testing.assert_allclose(traj.energies, [f.energy for f in frames])
+    np.testing.assert_allclose(traj.forces[1], frames[1].forces)
+
+
+def test_growth_in_chunks():
+    """Test appending past the allocated capacity keeps earlier frames."""
+    traj = Trajectory(["H", "H"], capacity=1)
+    for k in range(10):
+        traj.append(Frame(k, float(k), np.eye(3), ["H", "H"], np.full((2, 3), k, dtype=float)),
+                    chunk_size=2)
+    assert len(traj) == 10
+    assert traj.positions[:, 0, 0].tolist() == list(range(10))
+    assert np.isnan(traj.forces).all()
+    assert traj.frame(3).forces is None
+
+
+def test_slice_is_a_view():
+    """Test frame slicing shares memory with the parent trajectory."""
+    traj = Trajectory.from_frames(iter_frames(str(RELAX)))
+    view = traj[1:]
+    assert len(view) == 2
+    assert np.shares_memory(view.positions, traj.positions)
+    view.positions[0, 0, 0] = 123.0
+    assert traj.positions[1, 0, 0] == 123.0
+    assert view[0].index == 1
+
+
+def test_species_mismatch():
+    """Test a frame with another atom list is rejected."""
+    traj = Trajectory(["H", "O"])
+    with pytest.raises(ValueError):
+        traj.append(Frame(0, 0.0, np.eye(3), ["O", "H"], np.zeros((2, 3))))
+
+
+def test_short_forces_rejected():
+    """Test forces with fewer rows than atoms raise instead of being broadcast."""
+    traj = Trajectory(["H", "O", "H"])
+    with pytest.raises(ValueError, match="one position and force row per atom"):
+        traj.append(Frame(0, 0.0, np.eye(3), ["H", "O", "H"], np.zeros((3, 3)), np.ones((1, 3))))
+    assert len(traj) == 0
+
+
+def test_to_dataframe():
+    """Test the long-format DataFrame view."""
+    traj = Trajectory.from_frames(iter_frames(str(RELAX)))
+    df = traj.to_dataframe()
+    assert len(df) == 9
+    assert df["frame"].tolist() == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    assert df["element"].tolist()[:3] == ["Si", "Si", "O"]
+
+    last = traj.to_dataframe(-1)
+    assert last["frame"].unique().tolist() == [2]
+    np.testing.assert_allclose(last[["x", "y", "z"]].to_numpy(), traj.positions[2])
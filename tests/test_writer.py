@@ -0,0 +1,133 @@
+"""
+Tests for the vectorized LAMMPS dump writer.
+"""
+
+import io
+
+import numpy as np
+import pytest
+from dftbridge.writer import DumpWriter, format_fixed
+
+
+BOX = (0.0, 5.0, 0.0, 4.0, 0.0, 3.0, 0.5, 0.0, 0.25)
+POSITIONS = np.array([[0.0, 0.1, 0.2], [1.0, 1.1, 1.2], [2.0, 2.1, 2.2]])
+TYPES = [1, 2, 1]
+
+
+def test_default_layout_matches_legacy_rows():
+    """Test the default columns reproduce the historical per-atom row format."""
+    out = io.StringIO()
+    DumpWriter(out).write_frame(3, 10, -12.5, BOX, TYPES, POSITIONS)
+    lines = out.getvalue().splitlines()
+
+    assert lines[0] == "ITEM: TIMESTEP energy, energy_weight, force_weight, nsims"
+    assert lines[1] == "%-5d    %-.16f    1    1   %d" % (3, -12.5, 10)
+    assert lines[5] == "%22.16f  %22.16f  %22.16f" % (0.0, 5.0, 0.5)
+    assert lines[8] == "ITEM: ATOMS id type x y z"
+    assert lines[10] == "%-5d  %-5d  %22.16f %22.16f %22.16f" % (2, 2, 1.0, 1.1, 1.2)
+    assert len(lines) == 12
+
+
+def test_force_columns_and_precision():
+    """Test optional force columns and a reduced float precision."""
+    out = io.StringIO()
+    writer = DumpWriter(out, columns=("id", "type", "x", "y", "z", "fx", "fy", "fz"), precision=4)
+    writer.write_frame(1, 1, 0.0, BOX, TYPES, POSITIONS, forces=-POSITIONS)
+    lines = out.getvalue().splitlines()
+
+    assert lines[8] == "ITEM: ATOMS id type x y z fx fy fz"
+    assert lines[9].split() == ["1", "1", "0.0000", "0.1000", "0.2000", "-0.0000", "-0.1000", "-0.2000"]
+
+
+def test_buffers_follow_atom_count():
+    """Test consecutive frames with different atom counts are both written correctly."""
+    out = io.StringIO()
+    writer = DumpWriter(out)
+    writer.write_frame(1, 2, 0.0, BOX, TYPES, POSITIONS)
+    writer.write_frame(2, 2, 0.0, BOX, TYPES[:2], POSITIONS[:2])
+    text = out.getvalue()
+    assert text.count("ITEM: TIMESTEP") == 2
+    assert len(text.splitlines()) == 12 + 11
+
+
+def test_invalid_columns():
+    """Test unknown columns are rejected."""
+    with pytest.raises(ValueError, match="Unknown dump columns"):
+        DumpWriter(io.StringIO(), columns=("id", "vx"))
+
+
+def test_missing_forces_get_zero_weight():
+    """Test a frame without forces is written with zero forces and force_weight 0."""
+    fh = io.StringIO()
+    writer = DumpWriter(fh, columns=("id", "fx"), precision=2)
+    writer.write_frame(1, 1, 0.0, BOX, TYPES, POSITIONS)
+    writer.write_frame(2, 2, 0.0, BOX, TYPES, POSITIONS, np.ones_like(POSITIONS))
+    lines = fh.getvalue().splitlines()
+    assert lines[1].split()[2:] == ["1", "0", "1"]
+    assert lines[9].split() == ["1", "0.00"]
+    assert lines[1 + 9 + len(TYPES)].split()[2:] == ["1", "1", "2"]
+
+
+@pytest.mark.parametrize("width,precision", [(22, 16), (14, 8), (7, 1)])
+def test_format_fixed_matches_percent(width, precision):
+    """Test array formatting is byte-identical to % formatting, ties and signed zeros included."""
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.normal(scale=20.0, size=5000),
+        np.arange(-200, 201) / 8.0,  # exact binary ties
+        [0.0, -0.0, 1e-300, -1e-300, 0.5, -0.5, 9999.5, -1234.75, np.nan, np.inf, -np.inf],
+    ])
+    cells = format_fixed(values, width, precision)
+    expected = ["%*.*f" % (width, precision, v) for v in values.tolist()]
+    assert [row.tobytes().decode() for row in cells] == expected
+    assert format_fixed(np.array([1e40]), width, precision) is None
+
+
+@pytest.mark.parametrize("precision", range(1, 17))
+def test_format_fixed_round_trip(precision):
+    """Test every precision against %.*f on random bit patterns, scales and rounding carries."""
+    rng = np.random.default_rng(precision)
+    half = 0.5 * 10.0 ** -precision
+    carries = [sign * np.nextafter(10.0 ** k - half, direction)
+               for k in range(6) for sign in (1, -1) for direction in (0, np.inf)]
+    values = np.concatenate([
+        carries,
+        rng.integers(0, 2 ** 63, 4000, dtype=np.uint64).view(np.float64),
+        rng.normal(scale=10.0 ** rng.uniform(-precision - 2, 5, 4000)),
+        np.round(rng.normal(scale=100.0, size=2000), precision) + half,
+    ])
+    for width in (precision + 3, precision + 6, 30):
+        expected = ["%*.*f" % (width, precision, v) for v in values.tolist()]
+        fits = [i for i, text in enumerate(expected) if len(text) == width]
+        cells = format_fixed(values[fits], width, precision)
+        assert [row.tobytes().decode() for row in cells] == [expected[i] for i in fits]
+
+
+def test_rounding_carry_into_next_power_of_ten():
+    """Test values that round up to 10**k, past the digits the array path renders, are exact."""
+    natoms = 200
+    positions = np.zeros((natoms, 3))
+    positions[0] = [9999.9999996, -9999.9999996, 999.99999996]
+    out = io.StringIO()
+    DumpWriter(out, precision=6).write_frame(1, 1, 0.0, BOX, [1] * natoms, positions)
+    assert out.getvalue().splitlines()[9].split()[2:] == ["10000.000000", "-10000.000000",
+                                                        "1000.000000"]
+
+
+def test_large_frame_matches_percent_rows():
+    """Test frames rendered from arrays match the per-atom % rows."""
+    natoms = 500
+    rng = np.random.default_rng(1)
+    positions = rng.normal(scale=10.0, size=(natoms, 3))
+    positions[0] = [-0.0, 1e7, 0.125]
+    forces = rng.normal(size=(natoms, 3))
+    types = rng.integers(1, 4, size=natoms)
+    out = io.StringIO()
+    writer = DumpWriter(out, columns=("id", "type", "x", "y", "z", "fx", "fy", "fz"))
+    writer.write_frame(1, 1, -3.0, BOX, types, positions, forces)
+    rows = out.getvalue().splitlines()[9:]
+
+    assert len(rows) == natoms
+    for i in (0, 1, natoms - 1):
+        assert rows[i] == "%-5d  %-5d  " % (i + 1, types[i]) + " ".join(
+            "%22.16f" % v for v in (*positions[i], *forces[i]))